@@ -0,0 +1,418 @@
+import argparse
+import random
+
+
+UINT256_MAX = 2**256 - 1
+
+
+class Revert(Exception):
+    """
+    The call would revert in the EVM: failed require, checked arithmetic overflow or underflow
+    """
+
+
+def _sub(a, b):
+    if b > a:
+        raise Revert(f"underflow: {a} - {b}")
+    return a - b
+
+
+def _add(a, b):
+    if a + b > UINT256_MAX:
+        raise Revert(f"overflow: {a} + {b}")
+    return a + b
+
+
+def _div(a, b):
+    if b == 0:
+        raise Revert("division by zero")
+    return a // b
+
+
+def _sdiv(a, b):
+    """
+    int256 division, the quotient is truncated toward zero
+    """
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def _to_uint(x):
+    """
+    Explicit int256 -> uint256 conversion, negative values wrap without revert
+    """
+    return x % (UINT256_MAX + 1)
+
+
+class NimbusModel:
+    """
+    Pure Python model of the Nimbus stake accounting with the integer semantics of `contracts/Nimbus.sol`.
+    Ledgers are identified by any hashable key. Ledger side state which Nimbus reads during
+    `_softRebalanceStakes` (`transferDownwardBalance`) is set by the caller.
+    """
+
+    def __init__(self):
+        self.fund_raised_balance = 0
+        self.buffered_deposits = 0
+        self.buffered_redeems = 0
+        self.ledger_stake = {}
+        self.ledger_borrow = {}
+        self.enabled_ledgers = []
+        self.disabled_ledgers = []
+        self.paused_ledgers = set()
+        self.transfer_downward_balance = {}
+        self.deposit_cap = UINT256_MAX
+
+        # xcTOKEN balances of Nimbus and Withdrawal
+        self.xc_balance = 0
+        self.withdrawal_balance = 0
+
+        # what the last `soft_rebalance_stakes` did, for diagnostics
+        self.last_stake_excess = 0
+        self.last_disabled_redeems = 0
+        self.last_free_to_transfer = 0
+
+    def copy(self):
+        other = NimbusModel.__new__(NimbusModel)
+        other.__dict__.update(self.__dict__)
+        for name in ('ledger_stake', 'ledger_borrow', 'transfer_downward_balance'):
+            setattr(other, name, dict(getattr(self, name)))
+        other.enabled_ledgers = list(self.enabled_ledgers)
+        other.disabled_ledgers = list(self.disabled_ledgers)
+        other.paused_ledgers = set(self.paused_ledgers)
+        return other
+
+    def add_ledger(self, ledger):
+        assert ledger not in self.ledger_stake, "NIMBUS: STASH_ALREADY_EXISTS"
+        self.enabled_ledgers.append(ledger)
+        self.ledger_stake[ledger] = 0
+        self.ledger_borrow[ledger] = 0
+        self.transfer_downward_balance[ledger] = 0
+
+    def disable_ledger(self, ledger):
+        if ledger not in self.enabled_ledgers:
+            raise Revert("NIMBUS: LEDGER_NOT_ENABLED")
+        idx = self.enabled_ledgers.index(ledger)
+        self.enabled_ledgers[idx] = self.enabled_ledgers[-1]
+        self.enabled_ledgers.pop()
+        self.disabled_ledgers.append(ledger)
+
+    def emergency_pause_ledger(self, ledger):
+        self.disable_ledger(ledger)
+        self.paused_ledgers.add(ledger)
+
+    def resume_ledger(self, ledger):
+        if ledger not in self.paused_ledgers:
+            raise Revert("NIMBUS: LEDGER_NOT_PAUSED")
+        self.paused_ledgers.remove(ledger)
+
+    def remove_ledger(self, ledger):
+        if self.ledger_stake[ledger] != 0:
+            raise Revert("NIMBUS: LEDGER_HAS_NON_ZERO_STAKE")
+        if ledger not in self.disabled_ledgers:
+            raise Revert("NIMBUS: LEDGER_NOT_DISABLED")
+        idx = self.disabled_ledgers.index(ledger)
+        self.disabled_ledgers[idx] = self.disabled_ledgers[-1]
+        self.disabled_ledgers.pop()
+        self.paused_ledgers.discard(ledger)
+        del self.ledger_stake[ledger]
+        del self.ledger_borrow[ledger]
+        del self.transfer_downward_balance[ledger]
+
+    def deposit(self, amount):
+        if self.fund_raised_balance + amount >= self.deposit_cap:
+            raise Revert("NIMBUS: DEPOSITS_EXCEED_CAP")
+        if amount == 0:
+            raise Revert("NIMBUS: ZERO_DEPOSIT")
+        self.xc_balance += amount
+        self.fund_raised_balance += amount
+        self.buffered_deposits += amount
+
+    def redeem(self, token_amount):
+        """
+        @param token_amount - xcTOKEN amount of redeemed shares
+        """
+        if token_amount == 0:
+            raise Revert("NIMBUS: AMOUNT_TOO_LOW")
+        self.fund_raised_balance = _sub(self.fund_raised_balance, token_amount)
+        self.buffered_redeems += token_amount
+
+    def distribute_rewards(self, ledger, rewards):
+        self.fund_raised_balance += rewards
+        self.ledger_stake[ledger] += rewards
+        self.ledger_borrow[ledger] += rewards
+
+    def distribute_losses(self, ledger, losses, virtual_withdrawal_balance=0, batch_virtual_amount=0):
+        """
+        @param virtual_withdrawal_balance - part of Withdrawal balance which is still on the relay chain
+        @param batch_virtual_amount - `Withdrawal.batchVirtualXcTokenAmount`
+        """
+        nimbus_part = _div(losses * self.fund_raised_balance, self.fund_raised_balance + virtual_withdrawal_balance)
+        nimbus_part_ledger = _div(
+            losses * (self.fund_raised_balance + batch_virtual_amount),
+            self.fund_raised_balance + virtual_withdrawal_balance
+        )
+
+        self.fund_raised_balance = _sub(self.fund_raised_balance, nimbus_part)
+        if losses - nimbus_part > 0:
+            withdrawal_losses = losses - nimbus_part
+            self.buffered_redeems = _sub(
+                self.buffered_redeems,
+                _div(withdrawal_losses * self.buffered_redeems, virtual_withdrawal_balance)
+            )
+
+        stake = self.ledger_stake[ledger]
+        self.ledger_stake[ledger] = stake - (nimbus_part_ledger if stake >= nimbus_part_ledger else stake)
+        self.ledger_borrow[ledger] = _sub(self.ledger_borrow[ledger], losses)
+
+    def transfer_from_ledger(self, ledger, amount, excess=0):
+        if excess > 0:
+            self.fund_raised_balance += excess
+            self.buffered_deposits += excess
+            self.xc_balance += excess
+
+        self.ledger_borrow[ledger] = _sub(self.ledger_borrow[ledger], amount)
+        self.withdrawal_balance += amount
+
+    def transfer_to_ledger(self, ledger, amount):
+        if self.ledger_borrow[ledger] + amount > self.ledger_stake[ledger]:
+            raise Revert("NIMBUS: LEDGER_NOT_ENOUGH_STAKE")
+        self.ledger_borrow[ledger] += amount
+        self.xc_balance = _sub(self.xc_balance, amount)
+
+    def _transfer_to_withdrawal(self, amount):
+        self.xc_balance = _sub(self.xc_balance, amount)
+        self.withdrawal_balance += amount
+
+    def soft_rebalance_stakes(self):
+        """
+        `Nimbus._softRebalanceStakes`. On `Revert` the model is left half updated, use `copy` to roll back.
+        """
+        self.last_stake_excess = 0
+        self.last_disabled_redeems = 0
+        self.last_free_to_transfer = 0
+
+        total_stake_excess = 0
+        for ledger in self.enabled_ledgers + self.disabled_ledgers:
+            stake = self.ledger_stake[ledger]
+            borrow = self.ledger_borrow[ledger]
+            if stake > borrow:
+                ledger_stake_excess = stake - borrow
+
+                if total_stake_excess + ledger_stake_excess <= _sub(self.xc_balance, self.buffered_deposits):
+                    total_stake_excess += ledger_stake_excess
+                    self.ledger_stake[ledger] = stake - ledger_stake_excess
+
+        self.buffered_deposits += total_stake_excess
+        self.last_stake_excess = total_stake_excess
+
+        if self.buffered_deposits > 0 or self.buffered_redeems > 0:
+            if len(self.disabled_ledgers) > 0 and self.buffered_redeems > 0:
+                remaining_redeems = self._process_disabled_ledgers(self.buffered_redeems)
+                self.last_disabled_redeems = self.buffered_redeems - remaining_redeems
+                self.buffered_redeems = remaining_redeems
+
+            if self.buffered_deposits > 0 and self.buffered_redeems > 0:
+                max_immediate_transfer = min(self.buffered_deposits, self.buffered_redeems)
+                self.buffered_deposits -= max_immediate_transfer
+                self.buffered_redeems -= max_immediate_transfer
+                self._transfer_to_withdrawal(max_immediate_transfer)
+
+            if len(self.enabled_ledgers) > 0:
+                stake = self.buffered_deposits - self.buffered_redeems
+                if stake != 0:
+                    self._process_enabled(stake)
+                self.buffered_deposits = 0
+                self.buffered_redeems = 0
+
+    def _process_disabled_ledgers(self, redeems):
+        assert len(self.disabled_ledgers) > 0
+
+        stakes_sum = 0
+        actual_redeems = 0
+        for ledger in self.disabled_ledgers:
+            if ledger not in self.paused_ledgers:
+                stakes_sum += self.ledger_stake[ledger]
+
+        if stakes_sum == 0:
+            return redeems
+
+        for ledger in self.disabled_ledgers:
+            if ledger not in self.paused_ledgers:
+                current_stake = self.ledger_stake[ledger]
+                decrement = min(redeems * current_stake // stakes_sum, current_stake)
+                self.ledger_stake[ledger] = current_stake - decrement
+                actual_redeems += decrement
+
+        return redeems - actual_redeems
+
+    def _process_enabled(self, stake):
+        ledgers = list(self.enabled_ledgers)
+        assert len(ledgers) > 0
+
+        stakes_cache = [self.ledger_stake[ledger] for ledger in ledgers]
+        stakes_previous = list(stakes_cache)
+        diffs = [0] * len(ledgers)
+
+        active_diffs_sum = 0
+        total_change = 0
+        precise_diff_sum = 0
+
+        target_stake = self.fund_raised_balance // len(ledgers)
+        for i in range(len(ledgers)):
+            diff = target_stake - stakes_cache[i]
+            if stake * diff > 0:
+                active_diffs_sum += diff
+            diffs[i] = diff
+            precise_diff_sum += diff
+
+        if precise_diff_sum == 0 or active_diffs_sum == 0:
+            return
+
+        direction = 1
+        if active_diffs_sum < 0:
+            direction = -1
+            active_diffs_sum = -active_diffs_sum
+
+        for i in range(len(ledgers)):
+            diffs[i] *= direction
+            if diffs[i] > 0:
+                change = _sdiv(diffs[i] * stake, active_diffs_sum)
+                new_stake = stakes_cache[i] + change
+                self.ledger_stake[ledgers[i]] = _to_uint(new_stake)
+                stakes_cache[i] = new_stake
+                total_change += change
+
+        remaining = stake - total_change
+        if remaining > 0:
+            self.ledger_stake[ledgers[0]] = _add(self.ledger_stake[ledgers[0]], remaining)
+        elif remaining < 0:
+            for i in range(len(ledgers)):
+                if remaining >= 0:
+                    break
+                current = _to_uint(stakes_cache[i])
+                if current > 0:
+                    decrement = min(current, -remaining)
+                    self.ledger_stake[ledgers[i]] = _sub(self.ledger_stake[ledgers[i]], decrement)
+                    remaining += decrement
+
+        free_to_transfer_funds = 0
+        for i in range(len(ledgers)):
+            updated_ledger_borrow = _sub(self.ledger_borrow[ledgers[i]], self.transfer_downward_balance[ledgers[i]])
+            new_stake = self.ledger_stake[ledgers[i]]
+            if updated_ledger_borrow > stakes_previous[i] and new_stake > stakes_previous[i]:
+                if new_stake > updated_ledger_borrow:
+                    free_to_transfer_funds += updated_ledger_borrow - stakes_previous[i]
+                else:
+                    free_to_transfer_funds += new_stake - stakes_previous[i]
+
+        if free_to_transfer_funds > 0:
+            self._transfer_to_withdrawal(free_to_transfer_funds)
+        self.last_free_to_transfer = free_to_transfer_funds
+
+
+class ReplayStats:
+    eras = 0
+    reverts = 0
+    stake_excess = 0
+    disabled_redeems = 0
+    netted = 0
+    free_to_transfer = 0
+    wrapped = 0
+    first_wrapped = None
+
+
+def replay(seed, ledgers_amount, eras, amount_max, stats=None):
+    """
+    Drive the model with random deposits, redeems, rewards, ledger disabling and ledger transfers.
+    Ledgers settle their borrow toward stake one era after a flush, like `Ledger.pushData`.
+    """
+    rng = random.Random(seed)
+    stats = stats or ReplayStats()
+    model = NimbusModel()
+    for i in range(ledgers_amount):
+        model.add_ledger(i)
+
+    for era in range(eras):
+        stats.eras += 1
+
+        # ledger reports of the previous era
+        for ledger in model.enabled_ledgers + model.disabled_ledgers:
+            if rng.random() < 0.05 and model.ledger_borrow[ledger] > 0:
+                # redeems of this era are the only part of Withdrawal still on the relay chain
+                losses = rng.randrange(min(amount_max // 100, model.ledger_borrow[ledger]) + 1)
+                model.distribute_losses(ledger, losses, model.buffered_redeems, model.buffered_redeems)
+            elif rng.random() < 0.5:
+                model.distribute_rewards(ledger, rng.randrange(amount_max // 100 + 1))
+
+            stake = model.ledger_stake[ledger]
+            borrow = model.ledger_borrow[ledger]
+            if stake > borrow:
+                model.transfer_to_ledger(ledger, min(stake - borrow, model.xc_balance))
+            elif borrow > stake and rng.random() < 0.5:
+                model.transfer_from_ledger(ledger, borrow - stake)
+            model.transfer_downward_balance[ledger] = 0 if rng.random() < 0.5 else min(borrow, stake) // 10
+
+        if len(model.enabled_ledgers) > 1 and rng.random() < 0.01:
+            ledger = rng.choice(model.enabled_ledgers)
+            if rng.random() < 0.5:
+                model.disable_ledger(ledger)
+            else:
+                model.emergency_pause_ledger(ledger)
+        if model.paused_ledgers and rng.random() < 0.05:
+            model.resume_ledger(rng.choice(sorted(model.paused_ledgers)))
+
+        for _ in range(rng.randrange(3)):
+            model.deposit(rng.randrange(1, amount_max))
+        for _ in range(rng.randrange(3)):
+            if model.fund_raised_balance > 0:
+                model.redeem(rng.randrange(1, model.fund_raised_balance + 1) // 2 or 1)
+
+        netted = min(model.buffered_deposits, model.buffered_redeems)
+        saved = model.copy()
+        try:
+            model.soft_rebalance_stakes()
+        except Revert:
+            # the whole oracle report reverts in the EVM
+            stats.reverts += 1
+            model = saved
+            continue
+
+        if any(stake > UINT256_MAX // 2 for stake in model.ledger_stake.values()):
+            # redeem exceeds what unpaused ledgers hold, `uint256(newStake)` wraps the stake record.
+            # The EVM keeps the corrupted state, the replay rolls back to go on exploring.
+            stats.wrapped += 1
+            if stats.first_wrapped is None:
+                stats.first_wrapped = era
+            model = saved
+            continue
+
+        stats.stake_excess += model.last_stake_excess
+        stats.disabled_redeems += model.last_disabled_redeems
+        stats.netted += netted
+        stats.free_to_transfer += model.last_free_to_transfer
+    return model, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay random eras through the Nimbus golden model')
+    parser.add_argument('--eras', type=int, default=100000)
+    parser.add_argument('--ledgers', type=int, default=5)
+    parser.add_argument('--amount-max', type=int, default=10**22)
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32))
+    args = parser.parse_args()
+
+    model, stats = replay(args.seed, args.ledgers, args.eras, args.amount_max)
+    print(f'Seed:              {args.seed}')
+    print(f'Eras:              {stats.eras}')
+    print(f'Reverts:           {stats.reverts}')
+    print(f'Stake excess:      {stats.stake_excess}')
+    print(f'Disabled redeems:  {stats.disabled_redeems}')
+    print(f'Netted:            {stats.netted}')
+    print(f'Free to transfer:  {stats.free_to_transfer}')
+    print(f'Wrapped stakes:    {stats.wrapped} (first at era {stats.first_wrapped})')
+    print(f'Enabled/disabled:  {len(model.enabled_ledgers)}/{len(model.disabled_ledgers)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+import asyncio
+import http.client
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+try:
+    from eth_abi import encode
+except ImportError:
+    # eth-abi before 4
+    from eth_abi import encode_abi as encode
+from eth_utils import keccak
+
+# Types.LedgerStatus
+IDLE, NOMINATOR, VALIDATOR, NONE = range(4)
+
+ORACLE_DATA_ABI = '(bytes32,bytes32,uint8,uint128,uint128,(uint128,uint64)[],uint32[],uint128,uint32)'
+# ReportUtils.COUNT_OUTMASK, the last byte of a variant counts its votes
+COUNT_OUTMASK = (2**256 - 1) ^ 0xFF
+
+# storage slots of dynamic arrays without an array getter: Oracle.currentReportVariants after `isPushed`, and
+# OracleMaster.members after `Pausable._paused` and `eraId` packed in slot 0
+REPORT_VARIANTS_SLOT = 1
+MEMBERS_SLOT = 1
+
+
+def _bytes32(value):
+    if isinstance(value, str):
+        value = value[2:] if value.lower().startswith('0x') else value
+        value = bytes.fromhex(value.rjust(len(value) + len(value) % 2, '0'))
+    return bytes(value).rjust(32, b'\x00')
+
+
+def report_variant(report):
+    """
+    Variant `Oracle.reportRelay` files the report under: keccak(abi.encode(report)) without the vote count byte
+    """
+    stash, controller, status, active, total, unlocking, claimed_rewards, stash_balance, spans = report
+    data = (
+        _bytes32(stash), _bytes32(controller), status, active, total,
+        [tuple(chunk) for chunk in unlocking], list(claimed_rewards), stash_balance, spans,
+    )
+    return int.from_bytes(keccak(encode([ORACLE_DATA_ABI], [data])), 'big') & COUNT_OUTMASK
+
+
+async def storage_array_length(get_storage_at, address, slot):
+    """
+    @param get_storage_at - coroutine function(address, position) returning a 32 byte storage word, like
+    `web3.eth.get_storage_at` run in an executor
+    """
+    return int.from_bytes(await get_storage_at(address, slot), 'big')
+
+
+async def storage_array(get_storage_at, address, slot):
+    """
+    Read a uint256[] state variable from storage: the length is at its slot, elements follow from keccak(slot) and
+    are read concurrently
+    """
+    first = int.from_bytes(keccak(slot.to_bytes(32, 'big')), 'big')
+    length = await storage_array_length(get_storage_at, address, slot)
+    words = await asyncio.gather(*[get_storage_at(address, first + i) for i in range(length)])
+    return [int.from_bytes(word, 'big') for word in words]
+
+
+def quorum_check(variant, variants, quorum, members):
+    """
+    Whether a report can still reach the quorum of its oracle, assuming every member which did not report yet
+    votes for it. Only meaningful while the oracle is not pushed
+    @param variants - `Oracle.currentReportVariants`, a vote count in the last byte of each
+    @param members - number of oracle members
+    @return (votes recorded for the variant, True if it can reach the quorum)
+    """
+    votes = next((recorded & 0xFF for recorded in variants if recorded & COUNT_OUTMASK == variant), 0)
+    unreported = members - sum(recorded & 0xFF for recorded in variants)
+    return votes, votes + unreported >= quorum
+
+
+class ConnectionPool:
+    """
+    Blocking relay connections shared by coroutines. A query takes an idle connection, or opens a new one while
+    there are less than `size`, and runs in a worker thread, so up to `size` queries are in flight at once
+    """
+
+    def __init__(self, connect, size):
+        """
+        @param connect - function opening a connection
+        """
+        self.connect = connect
+        self.size = size
+        self.opened = 0
+        self.idle = None
+        self.executor = ThreadPoolExecutor(max_workers=size)
+
+    async def run(self, fn, *args):
+        """
+        @return fn(connection, *args) called in a worker thread
+        """
+        loop = asyncio.get_running_loop()
+        if self.idle is None:
+            self.idle = asyncio.Queue()
+        if self.idle.empty() and self.opened < self.size:
+            self.opened += 1
+            try:
+                connection = await loop.run_in_executor(self.executor, self.connect)
+            except Exception:
+                self.opened -= 1
+                raise
+        else:
+            connection = await self.idle.get()
+        try:
+            return await loop.run_in_executor(self.executor, fn, connection, *args)
+        finally:
+            self.idle.put_nowait(connection)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class SubstrateRelay:
+    """
+    Staking storage of a relay chain node read with substrate-interface over pooled connections. Account ids are
+    public keys as 0x prefixed hex, like stash accounts of `Nimbus.getStashAccounts`
+    """
+
+    def __init__(self, url, ss58_format, pool_size=16):
+        self.ss58_format = ss58_format
+        self.pool = ConnectionPool(lambda: self._connect(url), pool_size)
+
+    def _connect(self, url):
+        from substrateinterface import SubstrateInterface
+        return SubstrateInterface(url=url, ss58_format=self.ss58_format)
+
+    def _account_id(self, address):
+        from substrateinterface.utils.ss58 import ss58_decode
+        return '0x' + ss58_decode(address)
+
+    async def _query(self, module, storage, params, block_hash):
+        return await self.pool.run(
+            lambda substrate: substrate.query(module, storage, params, block_hash=block_hash).value
+        )
+
+    async def _query_multi(self, module, storage, keys, block_hash):
+        """
+        @return values of a storage map at every key, read in one `state_queryStorageAt` request
+        """
+        if len(keys) == 0:
+            return []
+
+        def query(substrate):
+            storage_keys = [substrate.create_storage_key(module, storage, [key]) for key in keys]
+            return [value.value for _, value in substrate.query_multi(storage_keys, block_hash=block_hash)]
+        return await self.pool.run(query)
+
+    async def head(self):
+        """
+        @return finalized block hash, all reads of one report collection are made at it
+        """
+        return await self.pool.run(lambda substrate: substrate.get_chain_finalised_head())
+
+    async def active_era(self, block_hash):
+        return (await self._query('Staking', 'ActiveEra', [], block_hash))['index']
+
+    async def validators(self, block_hash):
+        return {self._account_id(address) for address in await self._query('Session', 'Validators', [], block_hash)}
+
+    async def bonded(self, stashes, block_hash):
+        """
+        @return controller of every stash, None if not bonded
+        """
+        controllers = await self._query_multi('Staking', 'Bonded', stashes, block_hash)
+        return [None if controller is None else self._account_id(controller) for controller in controllers]
+
+    async def staking_ledgers(self, controllers, block_hash):
+        """
+        @return dict of total, active, unlocking [(value, era)] and claimed_rewards of every controller,
+        None if not bonded
+        """
+        return [
+            None if ledger is None else {
+                'total': ledger['total'],
+                'active': ledger['active'],
+                'unlocking': [(chunk['value'], chunk['era']) for chunk in ledger['unlocking']],
+                'claimed_rewards': list(ledger['claimedRewards']),
+            }
+            for ledger in await self._query_multi('Staking', 'Ledger', controllers, block_hash)
+        ]
+
+    async def free_balances(self, stashes, block_hash):
+        accounts = await self._query_multi('System', 'Account', stashes, block_hash)
+        return [account['data']['free'] for account in accounts]
+
+    async def slashing_spans(self, stashes, block_hash):
+        return [
+            0 if spans is None else len(spans['prior']) + 1
+            for spans in await self._query_multi('Staking', 'SlashingSpans', stashes, block_hash)
+        ]
+
+    async def nominating(self, stashes, block_hash):
+        """
+        @return True for every stash with nominations
+        """
+        nominations = await self._query_multi('Staking', 'Nominators', stashes, block_hash)
+        return [targets is not None for targets in nominations]
+
+    def close(self):
+        self.pool.close()
+
+
+class RelayRpcError(Exception):
+    pass
+
+
+class JsonRpcRelay:
+    """
+    Reads of `SubstrateRelay` from a JSON-RPC server answering its methods by name, like the relay stand-in of
+    `tests/relay_server.py`. Keep-alive HTTP connections are pooled the same way
+    """
+
+    def __init__(self, url, pool_size=16):
+        address = urlsplit(url)
+        self.pool = ConnectionPool(lambda: http.client.HTTPConnection(address.hostname, address.port), pool_size)
+        self.ids = itertools.count()
+
+    def _post(self, connection, method, params):
+        body = json.dumps({'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': params})
+        connection.request('POST', '/', body, {'Content-Type': 'application/json'})
+        response = json.loads(connection.getresponse().read())
+        if 'error' in response:
+            raise RelayRpcError(response['error']['message'])
+        return response['result']
+
+    async def call(self, method, *params):
+        return await self.pool.run(self._post, method, list(params))
+
+    async def head(self):
+        return await self.call('head')
+
+    async def active_era(self, block_hash):
+        return await self.call('active_era', block_hash)
+
+    async def validators(self, block_hash):
+        return set(await self.call('validators', block_hash))
+
+    async def bonded(self, stashes, block_hash):
+        return await self.call('bonded', stashes, block_hash)
+
+    async def staking_ledgers(self, controllers, block_hash):
+        ledgers = await self.call('staking_ledgers', controllers, block_hash)
+        for ledger in ledgers:
+            if ledger is not None:
+                ledger['unlocking'] = [tuple(chunk) for chunk in ledger['unlocking']]
+        return ledgers
+
+    async def free_balances(self, stashes, block_hash):
+        return await self.call('free_balances', stashes, block_hash)
+
+    async def slashing_spans(self, stashes, block_hash):
+        return await self.call('slashing_spans', stashes, block_hash)
+
+    async def nominating(self, stashes, block_hash):
+        return await self.call('nominating', stashes, block_hash)
+
+    def close(self):
+        self.pool.close()
+
+
+def stash_report(stash, controller, ledger, stash_balance, slashing_spans, nominator, validators):
+    """
+    @return Types.OracleData of the stash as a tuple for `OracleMaster.reportRelay`
+    """
+    if ledger is None:
+        return (stash, stash, NONE, 0, 0, [], [], stash_balance, slashing_spans)
+
+    if stash in validators:
+        status = VALIDATOR
+    elif nominator:
+        status = NOMINATOR
+    else:
+        status = IDLE
+    return (
+        stash,
+        controller,
+        status,
+        ledger['active'],
+        ledger['total'],
+        ledger['unlocking'],
+        ledger['claimed_rewards'],
+        stash_balance,
+        slashing_spans,
+    )
+
+
+async def collect_reports(relay, stashes, block_hash=None):
+    """
+    Read the relay state of all stashes at one block. Every storage map is read for all stashes in one request,
+    the number of round trips does not depend on the number of stashes
+    @param block_hash - relay block to read, the finalized head if None
+    @return (active era, reports in the order of stashes)
+    """
+    stashes = [str(stash).lower() for stash in stashes]
+    if block_hash is None:
+        block_hash = await relay.head()
+    era, validators, controllers, balances, spans, nominating = await asyncio.gather(
+        relay.active_era(block_hash),
+        relay.validators(block_hash),
+        relay.bonded(stashes, block_hash),
+        relay.free_balances(stashes, block_hash),
+        relay.slashing_spans(stashes, block_hash),
+        relay.nominating(stashes, block_hash),
+    )
+    bonded = [controller for controller in controllers if controller is not None]
+    ledgers = dict(zip(bonded, await relay.staking_ledgers(bonded, block_hash)))
+    reports = [
+        stash_report(stash, controller, ledgers.get(controller), balance, stash_spans, nominator, validators)
+        for stash, controller, balance, stash_spans, nominator in zip(stashes, controllers, balances, spans, nominating)
+    ]
+    return era, reports
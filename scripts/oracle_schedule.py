@@ -0,0 +1,77 @@
+import asyncio
+
+
+class EraSchedule:
+    """
+    Parachain era clock of `OracleMaster._getCurrentEraId`, from the anchor parameters read once
+    """
+
+    def __init__(self, anchor_era_id, anchor_timestamp, seconds_per_era):
+        self.anchor_era_id = anchor_era_id
+        self.anchor_timestamp = anchor_timestamp
+        self.seconds_per_era = seconds_per_era
+
+    def era_at(self, timestamp):
+        return self.anchor_era_id + (timestamp - self.anchor_timestamp) // self.seconds_per_era
+
+    def era_start(self, era):
+        """
+        @return first parachain block timestamp at which `reportRelay` accepts reports of the era
+        """
+        return self.anchor_timestamp + (era - self.anchor_era_id) * self.seconds_per_era
+
+
+def read_era_schedule(oracle_master):
+    return EraSchedule(oracle_master.ANCHOR_ERA_ID(), oracle_master.ANCHOR_TIMESTAMP(), oracle_master.SECONDS_PER_ERA())
+
+
+class EraScheduler:
+    """
+    Sleeps until the next era can be reported: until its predicted start on the parachain, then polls the relay
+    active era until it changes. Nothing is read from either chain in between
+    """
+
+    def __init__(self, schedule, relay, chain_time, block_seconds, relay_poll_seconds, poll_seconds):
+        """
+        @param chain_time - function returning the timestamp of the latest parachain block
+        @param block_seconds - parachain block time, reports are sent one block after the era start
+        @param relay_poll_seconds - active era polling after the parachain era started, about a relay block
+        @param poll_seconds - delay of another try when the reported era is not done
+        """
+        self.schedule = schedule
+        self.relay = relay
+        self.chain_time = chain_time
+        self.block_seconds = block_seconds
+        self.relay_poll_seconds = relay_poll_seconds
+        self.poll_seconds = poll_seconds
+
+    async def _chain_time(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.chain_time)
+
+    async def _relay_era(self):
+        return await self.relay.active_era(await self.relay.head())
+
+    async def wait(self, reported_era):
+        """
+        @param reported_era - last era with all reports done, None if there is none yet
+        @return era to report next
+        """
+        relay_era = await self._relay_era()
+        now = await self._chain_time()
+        if reported_era is not None and reported_era >= relay_era:
+            era = reported_era + 1
+        elif self.schedule.era_start(relay_era) > now:
+            # started on relay, not on parachain yet
+            era = relay_era
+        else:
+            # held or failed reports of the current era
+            await asyncio.sleep(self.poll_seconds)
+            return relay_era
+
+        delay = self.schedule.era_start(era) - now
+        if delay > 0:
+            print(f"Era {era} starts on parachain in {delay:.0f}s")
+            await asyncio.sleep(delay + self.block_seconds)
+        while await self._relay_era() < era:
+            await asyncio.sleep(self.relay_poll_seconds)
+        return era
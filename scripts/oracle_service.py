@@ -0,0 +1,193 @@
+from brownie import *
+from pathlib import Path
+from colorama import Fore, init
+from scripts.oracle_reports import (
+    SubstrateRelay, collect_reports, quorum_check, report_variant, storage_array, storage_array_length,
+    MEMBERS_SLOT, REPORT_VARIANTS_SLOT
+)
+from scripts.oracle_submitter import NonceManager, ReportSubmitter, PENDING, REVERTED, CONFIRMED
+from scripts.oracle_schedule import EraScheduler, read_era_schedule
+import asyncio
+import json
+import os
+import time
+import yaml
+
+init(autoreset=True)
+
+
+NETWORK = os.getenv("NETWORK", "polkadot")
+
+
+def load_deployments(network):
+    path = './deployments/' + network + '.json'
+    if Path(path).is_file():
+        with open(path) as file:
+            return json.load(file)
+    else:
+        return {}
+
+
+def load_deployment_config(network):
+    with open('./deployment-config.yml') as file:
+        return yaml.safe_load(file)['networks'][network]
+
+
+class OracleService:
+    """
+    Oracle member daemon: when the relay active era changes, reads all ledger stashes concurrently and reports them
+    """
+
+    def __init__(self, oracle_master, member, relay, submitter, scheduler):
+        self.oracle_master = oracle_master
+        self.nimbus = Nimbus.at(oracle_master.NIMBUS())
+        self.member = member
+        self.relay = relay
+        self.submitter = submitter
+        self.scheduler = scheduler
+        # last era reported for every stash
+        self.reported_era = None
+        # stash -> Oracle contract of its ledger
+        self.oracles = {}
+
+    async def _call(self, fn, *args):
+        # brownie calls block, keep the event loop free for relay queries
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _get_storage_at(self, address, position):
+        return await self._call(web3.eth.get_storage_at, address, position)
+
+    async def _oracle(self, stash):
+        if stash not in self.oracles:
+            ledger = await self._call(self.nimbus.findLedger, stash)
+            self.oracles[stash] = Oracle.at(await self._call(self.oracle_master.getOracle, ledger))
+        return self.oracles[stash]
+
+    async def _votable(self, report, quorum, members):
+        """
+        Compare the report with the variants other members voted for in this era before paying for it
+        @return True to send, False to hold a report which cannot reach the quorum, None if the oracle is pushed
+        """
+        oracle = await self._oracle(report[0])
+        pushed, variants = await asyncio.gather(
+            self._call(oracle.isPushed),
+            storage_array(self._get_storage_at, oracle.address, REPORT_VARIANTS_SLOT),
+            return_exceptions=True,
+        )
+        if isinstance(pushed, Exception):
+            raise pushed
+        if pushed:
+            return None
+        if isinstance(variants, Exception):
+            print(f"{Fore.YELLOW}Variants of {report[0]} were not read, sending without the check: {variants}")
+            return True
+        votes, reachable = quorum_check(report_variant(report), variants, quorum, members)
+        if len(variants) > 0 and votes == 0:
+            recorded = ', '.join(f'{variant & 0xFF} votes' for variant in variants)
+            print(f"{Fore.YELLOW}Report of {report[0]} differs from the reports of other members ({recorded})")
+        if not reachable:
+            print(f"{Fore.RED}Report of {report[0]} cannot reach quorum {quorum}, holding it")
+        return reachable
+
+    async def _to_send(self, report, era, quorum, members):
+        """
+        @return True to send the report, False to hold it, None if the member has nothing to send for the stash
+        """
+        last_era, reported = await self._call(self.oracle_master.isReportedLastEra, self.member, report[0])
+        if last_era > era or (last_era == era and reported):
+            return None
+        # variants of earlier eras are cleared by the first report of a new one
+        if last_era == era:
+            return await self._votable(report, quorum, members)
+        return True
+
+    async def report_era(self):
+        """
+        @return reported era, None if there was nothing to report
+        """
+        # the era is checked against the parachain and the stashes are read at the same relay block
+        block_hash = await self.relay.head()
+        era = await self.relay.active_era(block_hash)
+        if era == self.reported_era:
+            return None
+        if era > await self._call(self.oracle_master.getCurrentEraId):
+            print(f"{Fore.YELLOW}Era {era} started on relay but not on parachain yet")
+            # the anchor may have been moved since it was read
+            self.scheduler.schedule = await self._call(read_era_schedule, self.oracle_master)
+            return None
+
+        started = time.time()
+        stashes = await self._call(self.oracle_master.getStashAccounts)
+        _, reports = await collect_reports(self.relay, stashes, block_hash)
+        collected = time.time()
+
+        quorum = await self._call(self.oracle_master.QUORUM)
+        members = await storage_array_length(self._get_storage_at, self.oracle_master.address, MEMBERS_SLOT)
+        # contract reads of all stashes run concurrently, like the relay reads
+        decisions = await asyncio.gather(*[self._to_send(report, era, quorum, members) for report in reports])
+        sends = [
+            lambda tx_params, report=report: self.oracle_master.reportRelay(era, report, tx_params)
+            for report, send in zip(reports, decisions) if send
+        ]
+        held = sum(1 for send in decisions if send is False)
+
+        # all reports of the era are broadcast at once and mined in the same few blocks
+        failed = 0
+        pending = 0
+        for tx in await self.submitter.submit(sends):
+            if isinstance(tx, Exception):
+                print(f"{Fore.RED}Report was not sent: {type(tx).__name__}: {tx}")
+                failed += 1
+                continue
+            status = tx.status
+            if status == PENDING:
+                print(f"{Fore.YELLOW}Report {tx.txid} still pending at the deadline, it may be mined later")
+                pending += 1
+            elif status != CONFIRMED:
+                print(f"{Fore.RED}Report {tx.txid} {'reverted' if status == REVERTED else 'dropped'}")
+                failed += 1
+
+        # held, failed and pending reports are read and checked again on the next poll
+        if held == 0 and failed == 0 and pending == 0:
+            self.reported_era = era
+        print(
+            f"{Fore.GREEN}Era {era}: {len(reports)} stashes read in {collected - started:.1f}s, "
+            f"{len(sends) - failed - pending} reports confirmed in {time.time() - collected:.1f}s, {held} held, "
+            f"{failed} failed, {pending} pending"
+        )
+        return era
+
+    async def run(self):
+        while True:
+            try:
+                await self.report_era()
+                await self.scheduler.wait(self.reported_era)
+            except Exception as e:
+                print(f"{Fore.RED}Reporting failed: {type(e).__name__}: {e}")
+                await asyncio.sleep(self.scheduler.poll_seconds)
+
+
+def main():
+    oracle_config = load_deployment_config(NETWORK)['oracle']
+    deployments = load_deployments(NETWORK)
+
+    oracle_master = OracleMaster.at(deployments['OracleMaster'])
+    member = accounts.load(os.getenv("ORACLE_ACCOUNT"))
+    endpoint = os.getenv("RELAY_ENDPOINT", oracle_config['relay_endpoint'])
+    relay = SubstrateRelay(endpoint, oracle_config['ss58_format'], oracle_config['pool_size'])
+    nonces = NonceManager(lambda: web3.eth.get_transaction_count(member.address, 'pending'))
+    submitter = ReportSubmitter(member, nonces, oracle_config['stuck_seconds'], oracle_config['deadline_seconds'])
+    scheduler = EraScheduler(
+        read_era_schedule(oracle_master),
+        relay,
+        lambda: web3.eth.get_block('latest')['timestamp'],
+        oracle_config['block_seconds'],
+        oracle_config['relay_poll_seconds'],
+        oracle_config['poll_seconds'],
+    )
+
+    print(f"{Fore.GREEN}Oracle member {member} reports to {oracle_master} on {NETWORK}")
+    try:
+        asyncio.run(OracleService(oracle_master, member, relay, submitter, scheduler).run())
+    finally:
+        relay.close()
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+# brownie TransactionReceipt.status
+DROPPED, PENDING, REVERTED, CONFIRMED = -2, -1, 0, 1
+
+
+class NonceManager:
+    """
+    Nonces of one account assigned locally, so transactions are sent without waiting for the previous receipts
+    """
+
+    def __init__(self, pending_count):
+        """
+        @param pending_count - function returning the account transaction count including pending ones
+        """
+        self.pending_count = pending_count
+        self.next = None
+        # nonces of transactions given up while pending, they can still be mined
+        self.reserved = set()
+
+    def take(self):
+        if self.next is None:
+            self.next = self.pending_count()
+            # lower nonces are mined or pending on the node, it does not give them out again
+            self.reserved = {nonce for nonce in self.reserved if nonce >= self.next}
+        while self.next in self.reserved:
+            self.next += 1
+        nonce = self.next
+        self.next += 1
+        return nonce
+
+    def release(self, nonce):
+        """
+        Give back the last taken nonce when its transaction was not sent, later ones would wait for it forever
+        """
+        assert nonce == self.next - 1, "only the last nonce can be released"
+        self.next = nonce
+
+    def reserve(self, nonce):
+        """
+        Never give out the nonce again, even if the node does not count its transaction as pending anymore
+        """
+        self.reserved.add(nonce)
+
+    def reset(self):
+        # read again from the node before the next transaction
+        self.next = None
+
+
+class ReportSubmitter:
+    """
+    Sends a batch of transactions back to back with local nonces, then follows the receipts together. A
+    transaction pending for longer than `stuck_seconds` is replaced by the same one with a higher gas price, one
+    still pending after `deadline_seconds` is given up
+    """
+
+    def __init__(self, sender, nonces, stuck_seconds=60, deadline_seconds=600, increment=1.125, max_replacements=3,
+                 poll_seconds=2):
+        """
+        @param increment - gas price multiplier of a replacement, nodes accept 1.1 and more
+        """
+        self.sender = sender
+        self.nonces = nonces
+        self.stuck_seconds = stuck_seconds
+        self.deadline_seconds = deadline_seconds
+        self.increment = increment
+        self.max_replacements = max_replacements
+        self.poll_seconds = poll_seconds
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _broadcast(self, send):
+        nonce = self.nonces.take()
+        try:
+            return await self._call(send, {'from': self.sender, 'nonce': nonce, 'required_confs': 0})
+        except Exception:
+            self.nonces.release(nonce)
+            raise
+
+    async def _follow(self, tx):
+        """
+        Any of the transactions sent for the nonce can be mined, the original one too after it was replaced
+        @return receipt of the mined one, the last one sent if all were dropped or are pending at the deadline
+        """
+        started = sent = time.time()
+        receipts = [tx]
+        replacements = 0
+        while True:
+            statuses = [receipt.status for receipt in receipts]
+            for receipt, status in zip(receipts, statuses):
+                if status in (REVERTED, CONFIRMED):
+                    return receipt
+            if PENDING not in statuses:
+                return receipts[-1]
+            if time.time() - started > self.deadline_seconds:
+                print(f"{receipts[-1].txid} is still pending after {self.deadline_seconds}s, giving it up")
+                return receipts[-1]
+            if time.time() - sent > self.stuck_seconds and replacements < self.max_replacements:
+                try:
+                    receipts.append(await self._call(receipts[-1].replace, self.increment))
+                except Exception as e:
+                    # usually mined meanwhile, the status tells
+                    print(f"Replacing {receipts[-1].txid} failed: {type(e).__name__}: {e}")
+                sent = time.time()
+                replacements += 1
+            await asyncio.sleep(self.poll_seconds)
+
+    async def submit(self, sends):
+        """
+        @param sends - functions sending one transaction with the given tx parameters and returning its receipt
+        @return receipts in the order of `sends`, an exception in place of a transaction which was not sent. A
+        receipt still PENDING was given up at the deadline, its nonce stays reserved
+        """
+        sent = []
+        for send in sends:
+            try:
+                sent.append(await self._broadcast(send))
+            except Exception as e:
+                sent.append(e)
+
+        receipts = await asyncio.gather(*[
+            self._follow(tx) for tx in sent if not isinstance(tx, Exception)
+        ])
+        receipts = iter(receipts)
+        results = [tx if isinstance(tx, Exception) else next(receipts) for tx in sent]
+        statuses = [None if isinstance(tx, Exception) else tx.status for tx in results]
+        for tx, status in zip(results, statuses):
+            if status == PENDING:
+                self.nonces.reserve(tx.nonce)
+        if any(status != CONFIRMED for status in statuses):
+            # a dropped transaction leaves a gap, take nonces from the node again
+            self.nonces.reset()
+        return results
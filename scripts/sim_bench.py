@@ -0,0 +1,182 @@
+import argparse
+import random
+import time
+
+from sim_distr2 import Nimbus, STAKE_MAX, REWARD_MAX
+from sim_strategies import STRATEGIES, get_strategy
+
+
+# eras between unbond and withdraw on the relay chain
+UNBONDING_ERAS = 28
+
+
+class RelayOps:
+    """
+    Relay calls `Ledger.pushData` would send for every ledger stake change:
+    an increase rebonds unlocking chunks first and bonds the rest, a decrease unbonds
+    """
+
+    def __init__(self, ledgers_amount):
+        self.bonds = 0
+        self.unbonds = 0
+        self.rebonds = 0
+        # per ledger list of [era, amount], oldest first
+        self.unlocking = [[] for _ in range(ledgers_amount)]
+
+    def apply(self, era, before, after):
+        for i in range(len(before)):
+            chunks = self.unlocking[i]
+            while chunks and chunks[0][0] + UNBONDING_ERAS <= era:
+                chunks.pop(0)
+
+            diff = after[i] - before[i]
+            if diff < 0:
+                self.unbonds += 1
+                chunks.append([era, -diff])
+            elif diff > 0:
+                if chunks:
+                    self.rebonds += 1
+                    # rebond takes the newest chunks first
+                    while chunks and diff > 0:
+                        rebond = min(chunks[-1][1], diff)
+                        chunks[-1][1] -= rebond
+                        diff -= rebond
+                        if chunks[-1][1] == 0:
+                            chunks.pop()
+                if diff > 0:
+                    self.bonds += 1
+
+    def total(self):
+        return self.bonds + self.unbonds + self.rebonds
+
+
+class StrategyResult:
+    def __init__(self, name):
+        self.name = name
+        self.eras = 0
+        self.elapsed = 0.0
+        self.deviation_sum = 0.0
+        self.max_deviation = 0.0
+        # eras from shock to target per run, None if it was not reached
+        self.convergence = []
+        self.bonds = 0
+        self.unbonds = 0
+        self.rebonds = 0
+        # (run, era, error) of runs which raised inside the strategy
+        self.errors = []
+
+
+def deviation(nimbus):
+    """
+    Share of the total stake placed on wrong ledgers
+    """
+    if nimbus.total_stake == 0:
+        return 0.0
+    target_stakes = nimbus.target_stakes()
+    misplaced = sum(abs(target_stakes[i] - nimbus.ledger_stakes[i]) for i in range(len(target_stakes)))
+    return misplaced / 2 / nimbus.total_stake
+
+
+def event_stream(seed, ledgers, eras, stake_max, reward_max):
+    """
+    Rewards and net stake per era. Events do not depend on the simulated state, so every strategy
+    sees the same stream. Slashes and redeems are clamped to the available stake when applied.
+    """
+    rng = random.Random(seed)
+    events = []
+    for _ in range(eras):
+        rewards = [rng.randrange(-reward_max, reward_max) for _ in range(ledgers)]
+        stake = rng.randrange(-stake_max, stake_max)
+        events.append((rewards, stake))
+    return events
+
+
+def run_strategy(name, run, events, args, shock_shares, result):
+    nimbus = Nimbus(args.ledgers, verbose=False, strategy=get_strategy(name))
+    ops = RelayOps(args.ledgers)
+    nimbus.stake(args.stake_max)
+    nimbus.soft_rebalance()
+
+    converged_at = None
+    try:
+        for era, (rewards, stake) in enumerate(events):
+            if era == args.shock_era:
+                nimbus.set_shares(shock_shares)
+
+            nimbus.rewards([max(rewards[i], -nimbus.ledger_stakes[i]) for i in range(args.ledgers)])
+            stake = max(stake, -nimbus.total_stake)
+            if stake > 0:
+                nimbus.stake(stake)
+            else:
+                nimbus.redeem(-stake)
+
+            before = nimbus.ledger_stakes.copy()
+            started = time.perf_counter()
+            nimbus.soft_rebalance()
+            result.elapsed += time.perf_counter() - started
+            result.eras += 1
+            ops.apply(era, before, nimbus.ledger_stakes)
+
+            current = deviation(nimbus)
+            result.deviation_sum += current
+            result.max_deviation = max(result.max_deviation, current)
+            if converged_at is None and era >= args.shock_era and current <= args.tolerance:
+                converged_at = era - args.shock_era
+    except (AssertionError, ZeroDivisionError) as e:
+        result.errors.append((run, era, repr(e)))
+
+    result.convergence.append(converged_at)
+    result.bonds += ops.bonds
+    result.unbonds += ops.unbonds
+    result.rebonds += ops.rebonds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare rebalance strategies on identical event streams')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help='comma separated, any of ' + ', '.join(STRATEGIES))
+    parser.add_argument('--ledgers', type=int, default=5)
+    parser.add_argument('--eras', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5, help='amount of event streams, seeded from --seed')
+    parser.add_argument('--stake-max', type=int, default=STAKE_MAX)
+    parser.add_argument('--reward-max', type=int, default=REWARD_MAX)
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32))
+    parser.add_argument('--shock-era', type=int, default=100, help='era when ledger shares change')
+    parser.add_argument('--shock-shares', help='comma separated shares after the shock, the first ledger is disabled by default')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='misplaced stake share counted as converged')
+    args = parser.parse_args()
+
+    if args.shock_shares:
+        shock_shares = [int(share) for share in args.shock_shares.split(',')]
+    else:
+        shock_shares = [0] + [100] * (args.ledgers - 1)
+    assert len(shock_shares) == args.ledgers
+
+    names = args.strategies.split(',')
+    results = {name: StrategyResult(name) for name in names}
+    seeds = random.Random(args.seed)
+    for run in range(args.runs):
+        events = event_stream(seeds.randrange(2**64), args.ledgers, args.eras, args.stake_max, args.reward_max)
+        for name in names:
+            run_strategy(name, run, events, args, shock_shares, results[name])
+
+    print(f'Seed: {args.seed}  runs: {args.runs}  eras: {args.eras}  ledgers: {args.ledgers}  '
+          f'shock at era {args.shock_era} to {shock_shares}')
+    print(f'{"strategy":>10} {"us/era":>10} {"mean dev%":>10} {"max dev%":>10} {"converge":>10} '
+          f'{"bonds":>10} {"unbonds":>10} {"rebonds":>10} {"ops/era":>10}')
+    for name in names:
+        result = results[name]
+        eras = max(result.eras, 1)
+        reached = [c for c in result.convergence if c is not None]
+        converge = f'{sum(reached) / len(reached):.1f}' if reached else 'never'
+        if len(reached) < len(result.convergence):
+            converge += f' ({len(result.convergence) - len(reached)}x)'
+        ops = result.bonds + result.unbonds + result.rebonds
+        print(f'{name:>10} {result.elapsed / eras * 1e6:10.2f} {result.deviation_sum / eras * 100:10.3f} '
+              f'{result.max_deviation * 100:10.3f} {converge:>10} {result.bonds:10d} {result.unbonds:10d} '
+              f'{result.rebonds:10d} {ops / eras:10.3f}')
+        for run, era, error in result.errors:
+            print(f'  run {run} failed at era {era}: {error}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import os
+import pickle
+import tempfile
+
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(path, nimbus, rng, step, stake_sum):
+    """
+    Atomically write simulator state: the file at `path` is either the previous checkpoint or the new one
+    @param step - first step that is not simulated yet
+    """
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'nimbus': {
+            'ledger_stakes': list(nimbus.ledger_stakes),
+            'ledger_shares': list(nimbus.ledger_shares),
+            'total_stake': nimbus.total_stake,
+            'buffered_stakes': nimbus.buffered_stakes,
+            'buffered_redeems': nimbus.buffered_redeems,
+        },
+        'rng': rng.getstate(),
+        'step': step,
+        'stake_sum': stake_sum,
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_checkpoint(path, nimbus, rng):
+    """
+    Restore `nimbus` and `rng` from the checkpoint
+    @return (step, stake_sum)
+    """
+    with open(path, 'rb') as file:
+        state = pickle.load(file)
+    assert state['version'] == CHECKPOINT_VERSION, f"unsupported checkpoint version {state['version']}"
+
+    saved = state['nimbus']
+    nimbus.ledger_stakes = list(saved['ledger_stakes'])
+    nimbus.ledger_shares = [0] * len(saved['ledger_shares'])
+    nimbus.set_shares(saved['ledger_shares'])
+    nimbus.total_stake = saved['total_stake']
+    nimbus.buffered_stakes = saved['buffered_stakes']
+    nimbus.buffered_redeems = saved['buffered_redeems']
+    rng.setstate(state['rng'])
+    return state['step'], state['stake_sum']
@@ -1,26 +1,58 @@
+import argparse
 import random
 import numpy as np
 
+from sim_checkpoint import save_checkpoint, load_checkpoint
+from sim_stats import DeviationStats
+from sim_strategies import UniformStrategy
+from sim_trace import TraceRing
+
 
 class Nimbus:
     ledger_shares = []
     ledger_stakes = []
 
     total_stake = 0
+    total_shares = 0
 
     buffered_stakes = 0
     buffered_redeems = 0
 
-    def __init__(self, ledgers_amount):
+    verbose = True
+    strategy = None
+
+    def __init__(self, ledgers_amount, verbose=True, strategy=None):
+        self.verbose = verbose
+        self.strategy = strategy or UniformStrategy()
         self.ledger_stakes = [0] * ledgers_amount
         self.ledger_shares = [100] * ledgers_amount
+        self.total_shares = sum(self.ledger_shares)
 
     def set_shares(self, shares):
         assert len(self.ledger_shares) == len(shares)
-        self.ledger_shares = shares
+        self.ledger_shares = list(shares)
+        self.total_shares = sum(self.ledger_shares)
 
     def total_ledger_shares(self):
-        return sum(self.ledger_shares)
+        return self.total_shares
+
+    def _target_diffs(self):
+        """
+        Differences between target and real stakes with sums of positive and negative ones, in one pass
+        """
+        diffs = [0] * len(self.ledger_stakes)
+        pos_diffs_sum = 0
+        neg_diffs_sum = 0
+        total_stake = self.total_stake
+        total_shares = self.total_shares
+        for i in range(len(self.ledger_stakes)):
+            diff = total_stake * self.ledger_shares[i] // total_shares - self.ledger_stakes[i]
+            diffs[i] = diff
+            if diff < 0:
+                neg_diffs_sum += -diff
+            else:
+                pos_diffs_sum += diff
+        return diffs, pos_diffs_sum, neg_diffs_sum
 
     def target_stakes(self):
         arr = [0] * len(self.ledger_shares)
@@ -32,14 +64,16 @@ class Nimbus:
         self.buffered_stakes += amount
         self.total_stake += amount
 
-        print("+++STAKE+++", amount)
+        if self.verbose:
+            print("+++STAKE+++", amount)
 
     def redeem(self, amount):
         assert amount <= self.total_stake
         self.buffered_redeems += amount
         self.total_stake -= amount
 
-        print("---REDEEM---", amount)
+        if self.verbose:
+            print("---REDEEM---", amount)
 
     def rewards(self, ledger_rewards):
         assert len(ledger_rewards) == len(self.ledger_stakes)
@@ -48,125 +82,15 @@ class Nimbus:
             self.ledger_stakes[i] += ledger_rewards[i]
             self.total_stake += ledger_rewards[i]
 
-        print("-+-REWARDS-+-  ", np.array(ledger_rewards))
+        if self.verbose:
+            print("-+-REWARDS-+-  ", np.array(ledger_rewards))
 
     def soft_rebalance(self):
-        self._uni_distr(self.buffered_stakes - self.buffered_redeems)
-#        if self.buffered_stakes > self.buffered_redeems:
-#            self._distr_stake(self.buffered_stakes - self.buffered_redeems)
-#        elif self.buffered_stakes < self.buffered_redeems:
-#            self._distr_unstake(self.buffered_redeems - self.buffered_stakes)
+        self.strategy.distribute(self, self.buffered_stakes - self.buffered_redeems)
 
         self.buffered_stakes = 0
         self.buffered_redeems = 0
 
-    def _distr_unstake(self, stake):
-        diffs = []
-        min_diff = 2**256
-        pos_diffs_sum = 0
-        neg_diffs_sum = 0
-        for i in range(len(self.ledger_stakes)):
-            target_stake = self.total_stake * self.ledger_shares[i] // self.total_ledger_shares()
-            diff = target_stake - self.ledger_stakes[i]
-            diffs.append(diff)
-            if diff < 0:
-                neg_diffs_sum += -diff
-            else:
-                pos_diffs_sum += diff
-
-        assert(neg_diffs_sum > pos_diffs_sum)
-        print('DIFFS error(-):', neg_diffs_sum - pos_diffs_sum + stake)
-
-        total_decrement = 0
-        for i in range(len(self.ledger_stakes)):
-            if diffs[i] < 0:
-                decrement = -diffs[i] * stake // neg_diffs_sum
-                self.ledger_stakes[i] -= decrement
-                total_decrement += decrement
-
-        remaining = stake - total_decrement
-        if remaining > 0:
-            for i in range(len(self.ledger_stakes)):
-                if self.ledger_stakes[i] > 0:
-                    decrement = min(self.ledger_stakes[i], remaining)
-                    self.ledger_stakes[i] -= decrement
-                    remaining -= decrement
-                    if remaining == 0:
-                        break
-
-    def _distr_stake(self, stake):
-        diffs = []
-        pos_diffs_sum = 0
-        neg_diffs_sum = 0
-        for i in range(len(self.ledger_stakes)):
-            target_stake = self.total_stake * self.ledger_shares[i] // self.total_ledger_shares()
-            diff = target_stake - self.ledger_stakes[i]
-            diffs.append(diff)
-            if diff < 0:
-                neg_diffs_sum += -diff
-            else:
-                pos_diffs_sum += diff
-
-        assert(pos_diffs_sum > neg_diffs_sum)
-        print('DIFFS error(+):', pos_diffs_sum - neg_diffs_sum - stake)
-
-        total_increment = 0
-        for i in range(len(self.ledger_stakes)):
-            if diffs[i] > 0 and self.ledger_shares[i] > 0:
-                increment = diffs[i] * stake // pos_diffs_sum
-                self.ledger_stakes[i] += increment
-                total_increment += increment
-
-        remaining = stake - total_increment
-        if remaining > 0:
-            for i in range(len(self.ledger_stakes)):
-                if self.ledger_shares[i] > 0:
-                    self.ledger_stakes[i] += remaining
-                    break
-
-    def _uni_distr(self, stake):
-        diffs = []
-        active_diffs_sum = 0
-        for i in range(len(self.ledger_stakes)):
-            target_stake = self.total_stake * self.ledger_shares[i] // self.total_ledger_shares()
-            diff = target_stake - self.ledger_stakes[i]
-            diffs.append(diff)
-            if diff < 0 and stake < 0:
-                active_diffs_sum += -diff
-            elif diff > 0 and stake > 0:
-                active_diffs_sum += diff
-
-        total_change = 0
-
-        if active_diffs_sum != 0:
-            direction = 1
-            if stake < 0:
-                direction = -1
-
-            for i in range(len(self.ledger_stakes)):
-                if diffs[i] * direction > 0 and (direction < 0 or self.ledger_shares[i] > 0):
-                    change = diffs[i] * stake // active_diffs_sum
-                    self.ledger_stakes[i] += direction * change
-                    total_change += direction * change
-
-        remaining = stake - total_change
-        print('stake, total_change:', stake, total_change)
-        print('REMAINING:', remaining)
-        if remaining > 0:
-            for i in range(len(self.ledger_stakes)):
-                if self.ledger_shares[i] > 0:
-                    self.ledger_stakes[i] += remaining
-                    break
-        elif remaining < 0:
-            for i in range(len(self.ledger_stakes)):
-                if self.ledger_stakes[i] > 0:
-                    decrement = min(self.ledger_stakes[i], -remaining)
-                    self.ledger_stakes[i] -= decrement
-                    remaining += decrement
-                    if remaining == 0:
-                        break
-
-
     def _diffs(self, from_arr, to_arr, reverse=False):
         assert len(from_arr) == len(to_arr)
         diffs = []
@@ -194,8 +118,9 @@ class Nimbus:
 
         return arr
 
-    def print(self):
-        target_stakes = self.target_stakes()
+    def relative_diffs(self, target_stakes=None):
+        if target_stakes is None:
+            target_stakes = self.target_stakes()
         diffs = self._diffs(target_stakes, self.ledger_stakes)
         relative_diffs = []
         for i in range(len(self.ledger_stakes)):
@@ -203,6 +128,12 @@ class Nimbus:
                 relative_diffs.append(diffs[i] / target_stakes[i] * 100)
             else:
                 relative_diffs.append(100)
+        return relative_diffs
+
+    def print(self):
+        target_stakes = self.target_stakes()
+        diffs = self._diffs(target_stakes, self.ledger_stakes)
+        relative_diffs = self.relative_diffs(target_stakes)
 
         print('\n=======================================================================')
         print('Target stakes: ', np.array(target_stakes), "sum: ", sum(target_stakes))
@@ -212,31 +143,27 @@ class Nimbus:
         print('=======================================================================\n')
 
 
-np.set_printoptions(precision=3, formatter={'float': lambda x: f"{x:10.3f}", 'all': lambda x: f"{x:10d}"})
-
 STAKE_MAX = 100000
 REWARD_MAX = 1000
 
-nimbus = Nimbus(5)
-nimbus.stake(STAKE_MAX)
-nimbus.soft_rebalance()
-nimbus.print()
 
-stake_sum = nimbus.total_stake
-for i in range(100000000):
+def random_step(nimbus, rng=random, stake_max=STAKE_MAX, reward_max=REWARD_MAX):
+    """
+    Apply random rewards and a random net stake, then rebalance.
+    `rng` is the `random` module or any `random.Random` instance.
+    @return (stake, rewards, bondings, unbondings)
+    """
     prev_stakes = nimbus.ledger_stakes.copy()
-    rewards = random.choices(range(max(-min(nimbus.ledger_stakes), -REWARD_MAX), REWARD_MAX), k=len(nimbus.ledger_stakes))
+    rewards = rng.choices(range(max(-min(nimbus.ledger_stakes), -reward_max), reward_max), k=len(nimbus.ledger_stakes))
     nimbus.rewards(rewards)
-    stake = random.randrange(max(-nimbus.total_stake, -STAKE_MAX), STAKE_MAX)
+    stake = rng.randrange(max(-nimbus.total_stake, -stake_max), stake_max)
     if stake > 0:
         nimbus.stake(stake)
     else:
         nimbus.redeem(-stake)
     nimbus.soft_rebalance()
-    nimbus.print()
-    stake_sum += stake + sum(rewards)
 
-    after_stakes = nimbus.ledger_stakes.copy()
+    after_stakes = nimbus.ledger_stakes
     unbondings = 0
     bondings = 0
     for i in range(len(prev_stakes)):
@@ -245,9 +172,81 @@ for i in range(100000000):
         elif after_stakes[i] > prev_stakes[i] + rewards[i]:
             bondings += 1
 
-    print('UNBONDINGS AMOUNT: ', unbondings)
-    print('BONDINGS AMOUNT:   ', bondings, "\n\n")
-    assert(not (stake > 0 and unbondings > 0))
-    assert(not (stake < 0 and bondings > 0))
-    assert(sum(nimbus.ledger_stakes) == sum(nimbus.target_stakes()))
-    assert(sum(nimbus.ledger_stakes) == stake_sum)
+    return stake, rewards, bondings, unbondings
+
+
+def check_step(nimbus, stake, bondings, unbondings, stake_sum):
+    """
+    @return names of rebalance invariants violated by the last step
+    """
+    failed = []
+    if stake > 0 and unbondings > 0:
+        failed.append('unbond_on_stake')
+    if stake < 0 and bondings > 0:
+        failed.append('bond_on_redeem')
+    if sum(nimbus.ledger_stakes) != sum(nimbus.target_stakes()):
+        failed.append('target_sum')
+    if sum(nimbus.ledger_stakes) != stake_sum:
+        failed.append('stake_sum')
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stake distribution simulator')
+    parser.add_argument('--steps', type=int, default=100000000)
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32))
+    parser.add_argument('--quiet', action='store_true', help='no console output, failures are dumped from the trace')
+    parser.add_argument('--trace-size', type=int, default=1024, help='amount of last steps kept in memory')
+    parser.add_argument('--dump-steps', type=int, default=256, help='amount of last steps dumped on failure')
+    parser.add_argument('--trace-file', default='sim_trace.npz')
+    parser.add_argument('--checkpoint', help='checkpoint file, written every --checkpoint-every steps')
+    parser.add_argument('--checkpoint-every', type=int, default=1000000)
+    parser.add_argument('--resume', action='store_true', help='continue from the --checkpoint file')
+    parser.add_argument('--stats-every', type=int, default=0, help='collect deviation statistics, print them every N steps')
+    args = parser.parse_args()
+
+    np.set_printoptions(precision=3, formatter={'float': lambda x: f"{x:10.3f}", 'all': lambda x: f"{x:10d}"})
+
+    rng = random.Random(args.seed)
+    nimbus = Nimbus(5, verbose=not args.quiet)
+    if args.resume:
+        assert args.checkpoint, "--resume requires --checkpoint"
+        first_step, stake_sum = load_checkpoint(args.checkpoint, nimbus, rng)
+    else:
+        nimbus.stake(STAKE_MAX)
+        nimbus.soft_rebalance()
+        first_step, stake_sum = 0, nimbus.total_stake
+    if nimbus.verbose:
+        nimbus.print()
+
+    trace = TraceRing(args.trace_size, len(nimbus.ledger_stakes))
+    stats = DeviationStats(len(nimbus.ledger_stakes)) if args.stats_every > 0 else None
+    with trace.on_failure(args.trace_file, args.dump_steps):
+        for step in range(first_step, args.steps):
+            if args.checkpoint and step > first_step and step % args.checkpoint_every == 0:
+                save_checkpoint(args.checkpoint, nimbus, rng, step, stake_sum)
+
+            stake, rewards, bondings, unbondings = random_step(nimbus, rng)
+            trace.record(step, stake, rewards, nimbus.ledger_stakes)
+            stake_sum += stake + sum(rewards)
+
+            if nimbus.verbose:
+                nimbus.print()
+                print('UNBONDINGS AMOUNT: ', unbondings)
+                print('BONDINGS AMOUNT:   ', bondings, "\n\n")
+            failed = check_step(nimbus, stake, bondings, unbondings, stake_sum)
+            assert not failed, f"invariants violated: {failed}"
+
+            if stats is not None:
+                stats.update(nimbus, bondings, unbondings)
+                if (step + 1) % args.stats_every == 0:
+                    print(stats.report(), '\n')
+
+    if stats is not None and stats.eras % args.stats_every != 0:
+        print(stats.report())
+    if args.checkpoint:
+        save_checkpoint(args.checkpoint, nimbus, rng, args.steps, stake_sum)
+
+
+if __name__ == '__main__':
+    main()
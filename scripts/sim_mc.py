@@ -0,0 +1,140 @@
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+from sim_distr2 import Nimbus, STAKE_MAX, REWARD_MAX, random_step, check_step
+from sim_stats import FixedHistogram, RunningMoments, deviation_edges
+
+
+class TrialStats:
+    """
+    Statistics of one or several merged trials
+    """
+
+    def __init__(self):
+        self.trials = 0
+        self.eras = 0
+        self.bondings = 0
+        self.unbondings = 0
+        self.max_relative_diff = 0.0
+        # absolute relative deviation % of every ledger in every era
+        self.deviation = RunningMoments()
+        self.histogram = FixedHistogram(deviation_edges())
+        # (seed, step, violated invariants)
+        self.failures = []
+
+    def merge(self, other):
+        """
+        Add the counts of another trial. Ledgers are interchangeable between trials, so the deviation moments and
+        histogram are over all ledgers, per ledger histograms are kept by `DeviationStats` of the single run simulators
+        """
+        self.trials += other.trials
+        self.eras += other.eras
+        self.bondings += other.bondings
+        self.unbondings += other.unbondings
+        self.max_relative_diff = max(self.max_relative_diff, other.max_relative_diff)
+        self.deviation.merge(other.deviation)
+        self.histogram.merge(other.histogram)
+        self.failures.extend(other.failures)
+
+
+def max_relative_diff(nimbus):
+    target_stakes = nimbus.target_stakes()
+    result = 0.0
+    for i in range(len(target_stakes)):
+        if target_stakes[i] > 0:
+            result = max(result, abs(target_stakes[i] - nimbus.ledger_stakes[i]) / target_stakes[i])
+    return result
+
+
+def trial_seeds(root_seed, trials):
+    """
+    Non-overlapping per trial seeds spawned from the root seed
+    """
+    children = np.random.SeedSequence(root_seed).spawn(trials)
+    return [int.from_bytes(child.generate_state(4).tobytes(), 'little') for child in children]
+
+
+def run_trial(task):
+    seed, ledgers, steps, stake_max, reward_max = task
+    rng = random.Random(seed)
+    stats = TrialStats()
+    stats.trials = 1
+
+    nimbus = Nimbus(ledgers, verbose=False)
+    nimbus.stake(stake_max)
+    nimbus.soft_rebalance()
+
+    stake_sum = nimbus.total_stake
+    for step in range(steps):
+        stake, rewards, bondings, unbondings = random_step(nimbus, rng, stake_max, reward_max)
+        stake_sum += stake + sum(rewards)
+        stats.eras += 1
+        stats.bondings += bondings
+        stats.unbondings += unbondings
+        stats.max_relative_diff = max(stats.max_relative_diff, max_relative_diff(nimbus))
+        for diff in nimbus.relative_diffs():
+            stats.deviation.add(abs(diff))
+            stats.histogram.add(abs(diff))
+
+        failed = check_step(nimbus, stake, bondings, unbondings, stake_sum)
+        if failed:
+            # state is broken after the first violation, so the trial stops here
+            stats.failures.append((seed, step, failed))
+            break
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel Monte Carlo runner for rebalance invariants')
+    parser.add_argument('--trials', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=10000)
+    parser.add_argument('--ledgers', type=int, default=5)
+    parser.add_argument('--stake-max', type=int, default=STAKE_MAX)
+    parser.add_argument('--reward-max', type=int, default=REWARD_MAX)
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32), help='root seed for all trials')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--replay', type=int, help='run a single trial with the given trial seed in this process')
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        seeds = [args.replay]
+    else:
+        seeds = trial_seeds(args.seed, args.trials)
+    tasks = [(seed, args.ledgers, args.steps, args.stake_max, args.reward_max) for seed in seeds]
+
+    started = time.time()
+    report = TrialStats()
+    if args.replay is not None or args.workers == 1:
+        for task in tasks:
+            report.merge(run_trial(task))
+    else:
+        with multiprocessing.Pool(args.workers) as pool:
+            for stats in pool.imap_unordered(run_trial, tasks):
+                report.merge(stats)
+    elapsed = time.time() - started
+
+    if args.replay is not None:
+        print(f'Trial seed:      {args.replay}')
+    else:
+        print(f'Root seed:       {args.seed}')
+    print(f'Trials:          {report.trials} on {args.workers} workers in {elapsed:.2f}s')
+    print(f'Eras:            {report.eras}')
+    print(f'Bondings:        {report.bondings}')
+    print(f'Unbondings:      {report.unbondings}')
+    print(f'Max rel. diff%:  {report.max_relative_diff * 100:.3f}')
+    print(f'Mean |diff|%:    {report.deviation.mean:.4f} (std {report.deviation.variance() ** 0.5:.4f})')
+    print(f'P99 |diff|% <=   {report.histogram.quantile(0.99):.4g}')
+    print('|diff|% histogram:')
+    print(report.histogram.format())
+    print(f'Failures:        {len(report.failures)}')
+    for seed, step, failed in sorted(report.failures):
+        print(f'  seed {seed} step {step}: {", ".join(failed)}')
+
+
+if __name__ == '__main__':
+    main()
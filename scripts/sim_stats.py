@@ -0,0 +1,232 @@
+import bisect
+
+import numpy as np
+
+
+class RunningMoments:
+    """
+    Running mean and variance (Welford)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class FixedHistogram:
+    """
+    Histogram with fixed bins between ascending `edges`, values outside are counted separately
+    """
+
+    def __init__(self, edges):
+        self.edges = [float(edge) for edge in edges]
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, x):
+        if x < self.edges[0]:
+            self.underflow += 1
+        elif x >= self.edges[-1]:
+            self.overflow += 1
+        else:
+            self.counts[bisect.bisect_right(self.edges, x) - 1] += 1
+
+    def merge(self, other):
+        assert self.edges == other.edges
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def total(self):
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def quantile(self, p):
+        """
+        @return upper edge of the bin holding the quantile, inf if it is in the overflow
+        """
+        rank = p * self.total()
+        seen = self.underflow
+        if rank < seen:
+            return self.edges[0]
+        for i, count in enumerate(self.counts):
+            seen += count
+            if rank < seen:
+                return self.edges[i + 1]
+        return float('inf')
+
+    def format(self):
+        total = max(self.total(), 1)
+        lines = []
+        if self.underflow:
+            lines.append(f'{"":>10} < {self.edges[0]:<10.4g} {self.underflow:>10} {self.underflow / total * 100:7.2f}%')
+        for i, count in enumerate(self.counts):
+            if count:
+                lines.append(f'{self.edges[i]:>10.4g} - {self.edges[i + 1]:<10.4g} {count:>10} {count / total * 100:7.2f}%')
+        if self.overflow:
+            lines.append(f'{"":>10} >= {self.edges[-1]:<9.4g} {self.overflow:>10} {self.overflow / total * 100:7.2f}%')
+        return '\n'.join(lines)
+
+
+def deviation_edges(smallest=1e-4, largest=100.0, per_decade=5):
+    """
+    Bins of absolute relative deviation in percent: [0, smallest), then log spaced up to `largest`. Deviations
+    are mostly well below 1%, linear bins would put nearly all of them into the first one
+    """
+    decades = int(round(np.log10(largest / smallest)))
+    return [0.0] + list(np.logspace(np.log10(smallest), np.log10(largest), decades * per_decade + 1))
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with five markers (P-square algorithm by Jain and Chlamtac)
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        h = self.heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not h[i - 1] < height < h[i + 1]:
+                    height = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+                h[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        h = self.heights
+        n = self.positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if len(self.heights) < 5:
+            if not self.heights:
+                return 0.0
+            return self.heights[min(int(self.p * len(self.heights)), len(self.heights) - 1)]
+        return self.heights[2]
+
+
+class DeviationSeries:
+    """
+    Moments, histogram of the absolute values and quantile sketches of one stream of relative deviations
+    """
+
+    def __init__(self, quantiles, edges):
+        self.moments = RunningMoments()
+        self.histogram = FixedHistogram(edges)
+        self.quantiles = [P2Quantile(q) for q in quantiles]
+
+    def add(self, x):
+        self.moments.add(x)
+        self.histogram.add(abs(x))
+        for quantile in self.quantiles:
+            quantile.add(x)
+
+
+class DeviationStats:
+    """
+    Constant memory statistics of relative deviation from target stakes, per ledger and overall.
+    Deviation is `(target - stake) / target * 100` as in `Nimbus.print`. Ledger histograms have one bin per decade,
+    the overall one is finer
+    """
+
+    QUANTILES = (0.5, 0.99, 0.999)
+
+    def __init__(self, ledgers_amount, edges=None):
+        self.eras = 0
+        self.bondings = 0
+        self.unbondings = 0
+        ledger_edges = deviation_edges(per_decade=1)
+        self.ledgers = [DeviationSeries(self.QUANTILES, ledger_edges) for _ in range(ledgers_amount)]
+        self.overall = DeviationSeries(self.QUANTILES, deviation_edges() if edges is None else edges)
+
+    def update(self, nimbus, bondings=0, unbondings=0):
+        self.eras += 1
+        self.bondings += bondings
+        self.unbondings += unbondings
+        relative_diffs = nimbus.relative_diffs()
+        for i in range(len(relative_diffs)):
+            self.ledgers[i].add(relative_diffs[i])
+            self.overall.add(abs(relative_diffs[i]))
+
+    def report(self):
+        lines = [
+            f'Eras: {self.eras}  bondings: {self.bondings}  unbondings: {self.unbondings}',
+            f'{"":>10} {"mean":>10} {"std":>10} {"min":>10} {"max":>10} '
+            + ' '.join(f'{"P" + format(q * 100, "g"):>10}' for q in self.QUANTILES),
+        ]
+        for name, series in [('|all|', self.overall)] + [(f'ledger {i}', s) for i, s in enumerate(self.ledgers)]:
+            m = series.moments
+            lines.append(
+                f'{name:>10} {m.mean:10.3f} {m.variance() ** 0.5:10.3f} {m.min:10.3f} {m.max:10.3f} '
+                + ' '.join(f'{q.value():10.3f}' for q in series.quantiles)
+            )
+        lines.append('|all| deviation % histogram:')
+        lines.append(self.overall.histogram.format())
+        if self.ledgers:
+            edges = self.ledgers[0].histogram.edges
+            lines.append('ledger |deviation| % histogram, counts below:')
+            header = [format(edge, 'g') for edge in edges[1:]] + ['>=' + format(edges[-1], 'g')]
+            lines.append(f'{"":>10} ' + ' '.join(f'{edge:>10}' for edge in header))
+            for i, series in enumerate(self.ledgers):
+                counts = list(series.histogram.counts) + [series.histogram.overflow]
+                lines.append(f'{"ledger " + str(i):>10} ' + ' '.join(f'{count:>10}' for count in counts))
+        return '\n'.join(lines)
@@ -0,0 +1,162 @@
+class Strategy:
+    """
+    Distribution algorithm used by `Nimbus.soft_rebalance`. `distribute` moves the net buffered
+    `stake` (negative for redeems) into `nimbus.ledger_stakes` so that the stakes sum to `nimbus.total_stake`.
+    """
+
+    name = None
+
+    def distribute(self, nimbus, stake):
+        raise NotImplementedError
+
+
+class UniformStrategy(Strategy):
+    """
+    Stakes go to ledgers below target and redeems come from ledgers above target,
+    proportionally to the distance from target. Dust is placed greedily.
+    """
+
+    name = 'uni'
+
+    def distribute(self, nimbus, stake):
+        diffs, pos_diffs_sum, neg_diffs_sum = nimbus._target_diffs()
+        active_diffs_sum = 0
+        if stake < 0:
+            active_diffs_sum = neg_diffs_sum
+        elif stake > 0:
+            active_diffs_sum = pos_diffs_sum
+
+        total_change = 0
+
+        if active_diffs_sum != 0:
+            direction = 1
+            if stake < 0:
+                direction = -1
+
+            for i in range(len(nimbus.ledger_stakes)):
+                if diffs[i] * direction > 0 and (direction < 0 or nimbus.ledger_shares[i] > 0):
+                    change = diffs[i] * stake // active_diffs_sum
+                    nimbus.ledger_stakes[i] += direction * change
+                    total_change += direction * change
+
+        remaining = stake - total_change
+        if nimbus.verbose:
+            print('stake, total_change:', stake, total_change)
+            print('REMAINING:', remaining)
+        if remaining > 0:
+            _put_first(nimbus, remaining)
+        elif remaining < 0:
+            _take_first(nimbus, -remaining)
+
+
+class SplitStrategy(Strategy):
+    """
+    Separate algorithms for net stake and net redeem, only the ledgers on the moving side are touched
+    """
+
+    name = 'split'
+
+    def distribute(self, nimbus, stake):
+        if stake > 0:
+            self._distr_stake(nimbus, stake)
+        elif stake < 0:
+            self._distr_unstake(nimbus, -stake)
+
+    def _distr_unstake(self, nimbus, stake):
+        diffs, pos_diffs_sum, neg_diffs_sum = nimbus._target_diffs()
+
+        if nimbus.verbose:
+            print('DIFFS error(-):', neg_diffs_sum - pos_diffs_sum + stake)
+
+        # there are no ledgers above target when the redeem is smaller than the targets dust
+        total_decrement = 0
+        if neg_diffs_sum != 0:
+            for i in range(len(nimbus.ledger_stakes)):
+                if diffs[i] < 0:
+                    decrement = -diffs[i] * stake // neg_diffs_sum
+                    nimbus.ledger_stakes[i] -= decrement
+                    total_decrement += decrement
+
+        remaining = stake - total_decrement
+        if remaining > 0:
+            _take_first(nimbus, remaining)
+
+    def _distr_stake(self, nimbus, stake):
+        diffs, pos_diffs_sum, neg_diffs_sum = nimbus._target_diffs()
+
+        if nimbus.verbose:
+            print('DIFFS error(+):', pos_diffs_sum - neg_diffs_sum - stake)
+
+        total_increment = 0
+        if pos_diffs_sum != 0:
+            for i in range(len(nimbus.ledger_stakes)):
+                if diffs[i] > 0 and nimbus.ledger_shares[i] > 0:
+                    increment = diffs[i] * stake // pos_diffs_sum
+                    nimbus.ledger_stakes[i] += increment
+                    total_increment += increment
+
+        remaining = stake - total_increment
+        if remaining > 0:
+            _put_first(nimbus, remaining)
+
+
+class ShiftedStrategy(Strategy):
+    """
+    Every ledger gets a part of the stake proportional to its diff shifted above zero,
+    so stakes touch all ledgers. Redeems are taken proportionally to raw diffs.
+    """
+
+    name = 'opt'
+
+    def distribute(self, nimbus, stake):
+        diffs, pos_diffs_sum, neg_diffs_sum = nimbus._target_diffs()
+        min_diff = min(diffs)
+        diffs_sum = pos_diffs_sum - neg_diffs_sum
+
+        shift = -min_diff + 1
+        if stake < 0:
+            shift = 0
+        shifted_diffs_sum = diffs_sum + shift * len(nimbus.ledger_stakes)
+
+        stakes_sum = 0
+        non_zero_ledger = -1
+        for i in range(len(nimbus.ledger_stakes)):
+            shifted_diff = diffs[i] + shift
+            stake_diff = stake * shifted_diff // shifted_diffs_sum
+            new_stake = nimbus.ledger_stakes[i] + stake_diff
+            assert(new_stake >= 0)
+            stakes_sum += new_stake
+            nimbus.ledger_stakes[i] = new_stake
+
+            if non_zero_ledger == -1 and nimbus.ledger_shares[i] > 0:
+                non_zero_ledger = i
+
+        dust = nimbus.total_stake - stakes_sum
+        if non_zero_ledger != -1 and dust > 0:
+            nimbus.ledger_stakes[non_zero_ledger] += dust
+
+
+def _put_first(nimbus, amount):
+    for i in range(len(nimbus.ledger_stakes)):
+        if nimbus.ledger_shares[i] > 0:
+            nimbus.ledger_stakes[i] += amount
+            break
+
+
+def _take_first(nimbus, amount):
+    for i in range(len(nimbus.ledger_stakes)):
+        if nimbus.ledger_stakes[i] > 0:
+            decrement = min(nimbus.ledger_stakes[i], amount)
+            nimbus.ledger_stakes[i] -= decrement
+            amount -= decrement
+            if amount == 0:
+                break
+
+
+STRATEGIES = {
+    strategy.name: strategy for strategy in (UniformStrategy, SplitStrategy, ShiftedStrategy)
+}
+
+
+def get_strategy(name):
+    return STRATEGIES[name]()
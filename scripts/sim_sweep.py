@@ -0,0 +1,205 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from sim_distr2 import Nimbus, random_step, check_step
+from sim_stats import DeviationStats
+from sim_strategies import STRATEGIES, get_strategy
+
+
+# sources which define simulation results, any change invalidates cached cells
+CODE_FILES = ('sim_distr2.py', 'sim_strategies.py', 'sim_stats.py', 'sim_sweep.py')
+
+
+def code_version():
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(directory, name), 'rb') as file:
+            digest.update(name.encode())
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def share_vector(pattern, ledgers):
+    """
+    Named share pattern or a comma separated vector, None if the vector does not fit `ledgers`
+    """
+    if pattern == 'uniform':
+        return [100] * ledgers
+    if pattern == 'linear':
+        return [100 * (i + 1) for i in range(ledgers)]
+    if pattern == 'disabled-first':
+        return [0] + [100] * (ledgers - 1)
+    shares = [int(share) for share in pattern.split(',')]
+    return shares if len(shares) == ledgers else None
+
+
+def cell_key(config, strategy, seed, version):
+    payload = json.dumps({'config': config, 'strategy': strategy, 'seed': seed, 'code': version}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Cell results stored as `<dir>/<key[:2]>/<key>.json`, written atomically
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.cell-')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(result, file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def run_cell(task):
+    """
+    Simulate one grid cell, the run stops at the first violated invariant
+    @return (key, result)
+    """
+    key, config, strategy, seed = task
+    rng = random.Random(seed)
+    nimbus = Nimbus(config['ledgers'], verbose=False, strategy=get_strategy(strategy))
+    nimbus.set_shares(config['shares'])
+    nimbus.stake(config['stake_max'])
+    nimbus.soft_rebalance()
+
+    stats = DeviationStats(config['ledgers'])
+    stake_sum = nimbus.total_stake
+    failed = []
+    for step in range(config['steps']):
+        stake, rewards, bondings, unbondings = random_step(nimbus, rng, config['stake_max'], config['reward_max'])
+        stake_sum += stake + sum(rewards)
+        stats.update(nimbus, bondings, unbondings)
+        failed = check_step(nimbus, stake, bondings, unbondings, stake_sum)
+        if failed:
+            break
+
+    overall = stats.overall
+    return key, {
+        'eras': stats.eras,
+        'bondings': stats.bondings,
+        'unbondings': stats.unbondings,
+        'mean_deviation': overall.moments.mean,
+        'max_deviation': overall.moments.max,
+        'p99_deviation': overall.quantiles[DeviationStats.QUANTILES.index(0.99)].value(),
+        'failed_step': step if failed else None,
+        'failed': failed,
+    }
+
+
+def grid(args):
+    for ledgers, stake_max, reward_max, pattern in itertools.product(
+        args.ledgers, args.stake_max, args.reward_max, args.shares
+    ):
+        shares = share_vector(pattern, ledgers)
+        if shares is None:
+            continue
+        yield {
+            'ledgers': ledgers,
+            'stake_max': stake_max,
+            'reward_max': reward_max,
+            'shares': shares,
+            'steps': args.steps,
+        }
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parameter sweep over the stake distribution simulator')
+    parser.add_argument('--ledgers', type=_int_list, default=[5])
+    parser.add_argument('--stake-max', type=_int_list, default=[100000])
+    parser.add_argument('--reward-max', type=_int_list, default=[1000])
+    parser.add_argument('--shares', action='append',
+                        help='uniform, linear, disabled-first or a comma separated vector, may be repeated')
+    parser.add_argument('--strategies', default='uni', help='comma separated, any of ' + ', '.join(STRATEGIES))
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--seeds', type=int, default=4, help='runs per cell, seeded from --seed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-dir', default='.sim_cache')
+    args = parser.parse_args()
+    args.shares = args.shares or ['uniform']
+
+    version = code_version()
+    seeds = [int.from_bytes(child.generate_state(4).tobytes(), 'little')
+             for child in np.random.SeedSequence(args.seed).spawn(args.seeds)]
+    cache = ResultCache(args.cache_dir)
+
+    cells = []
+    results = {}
+    tasks = []
+    queued = set()
+    hits = 0
+    for config in grid(args):
+        for strategy in args.strategies.split(','):
+            keys = [cell_key(config, strategy, seed, version) for seed in seeds]
+            cells.append((config, strategy, keys))
+            for key, seed in zip(keys, seeds):
+                # repeated grid values give the same key, each run is read or computed once
+                if key in results or key in queued:
+                    continue
+                cached = cache.get(key)
+                if cached is not None:
+                    results[key] = cached
+                    hits += 1
+                else:
+                    queued.add(key)
+                    tasks.append((key, config, strategy, seed))
+
+    started = time.time()
+    if tasks:
+        with multiprocessing.Pool(min(args.workers, len(tasks))) as pool:
+            for key, result in pool.imap_unordered(run_cell, tasks):
+                cache.put(key, result)
+                results[key] = result
+    elapsed = time.time() - started
+
+    print(f'Runs: {len(results)}  computed: {len(tasks)} in {elapsed:.2f}s  cached: {hits}')
+    print(f'{"ledgers":>8} {"stake":>10} {"reward":>8} {"strategy":>8} {"mean dev%":>10} {"P99 dev%":>10} '
+          f'{"max dev%":>10} {"bonds/era":>10} {"unbonds/era":>11} {"failed":>7}  shares')
+    for config, strategy, keys in cells:
+        runs = [results[key] for key in keys]
+        eras = sum(run['eras'] for run in runs)
+        failed = sum(1 for run in runs if run['failed'])
+        print(f'{config["ledgers"]:8d} {config["stake_max"]:10d} {config["reward_max"]:8d} {strategy:>8} '
+              f'{sum(run["mean_deviation"] * run["eras"] for run in runs) / eras:10.3f} '
+              f'{max(run["p99_deviation"] for run in runs):10.3f} '
+              f'{max(run["max_deviation"] for run in runs):10.3f} '
+              f'{sum(run["bondings"] for run in runs) / eras:10.3f} '
+              f'{sum(run["unbondings"] for run in runs) / eras:11.3f} '
+              f'{failed:7d}  {config["shares"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import contextlib
+import sys
+
+import numpy as np
+
+
+class TraceRing:
+    """
+    Fixed-size in-memory trace of simulator steps. Every step stores its inputs (net stake and
+    per ledger rewards) and the resulting ledger stakes. Only the last `capacity` steps are kept.
+    """
+
+    def __init__(self, capacity, ledgers_amount):
+        assert capacity > 0
+        self.capacity = capacity
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.stakes = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros((capacity, ledgers_amount), dtype=np.int64)
+        self.ledger_stakes = np.zeros((capacity, ledgers_amount), dtype=np.int64)
+        self.recorded = 0
+
+    def record(self, step, stake, rewards, ledger_stakes):
+        pos = self.recorded % self.capacity
+        self.steps[pos] = step
+        self.stakes[pos] = stake
+        self.rewards[pos] = rewards
+        self.ledger_stakes[pos] = ledger_stakes
+        self.recorded += 1
+
+    def last(self, k=None):
+        """
+        @return dict of arrays with the last `k` steps in chronological order
+        """
+        size = min(self.recorded, self.capacity)
+        k = size if k is None else min(k, size)
+        idx = (np.arange(self.recorded - k, self.recorded)) % self.capacity
+        return {
+            'steps': self.steps[idx],
+            'stakes': self.stakes[idx],
+            'rewards': self.rewards[idx],
+            'ledger_stakes': self.ledger_stakes[idx],
+        }
+
+    def dump(self, path, k=None):
+        np.savez_compressed(path, **self.last(k))
+
+    @contextlib.contextmanager
+    def on_failure(self, path, k=None):
+        """
+        Dump the last `k` steps to `path` if an invariant assertion fires inside the block
+        """
+        try:
+            yield self
+        except AssertionError:
+            self.dump(path, k)
+            print(f'Invariant violated, last steps are saved to {path}', file=sys.stderr)
+            raise
+
+
+def load(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main():
+    np.set_printoptions(precision=3, linewidth=200, formatter={'all': lambda x: f"{x:10d}"})
+    trace = load(sys.argv[1])
+    for i in range(len(trace['steps'])):
+        print(f"STEP {trace['steps'][i]}  STAKE {trace['stakes'][i]}")
+        print('Rewards      : ', trace['rewards'][i])
+        print('Real   stakes: ', trace['ledger_stakes'][i], "sum: ", trace['ledger_stakes'][i].sum())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import collections
+import heapq
+import math
+import random
+import time
+
+from sim_stats import P2Quantile, RunningMoments
+
+
+UNBONDING_ERAS = 28
+MAX_UNLOCKING_CHUNKS = 32
+
+# event kinds, also the order of events inside one era
+ARRIVE = 0
+WITHDRAW = 1
+FLUSH = 2
+DEPOSIT = 3
+REDEEM = 4
+
+
+class UnbondingSim:
+    """
+    Event-driven model of redeem liquidity: relay unlocking chunks of every ledger and the Withdrawal batch queue.
+    Only eras with events are visited, so quiet stretches cost nothing.
+
+    Era flow follows the contracts: redeems and deposits are buffered during an era and flushed at the start of
+    the next one. The flush first pops at most one batch from the Withdrawal queue if its funds are there, then
+    queues the batch of the previous era, nets deposits against redeems and unbonds the rest from ledgers.
+    Unbonds of one ledger in the same era merge into one chunk, like the relay staking pallet does.
+    Matured chunks are withdrawn `withdraw_delay` eras after maturity and reach Withdrawal `transfer_delay` later.
+    Deposits only grow active balance, rebonding of unlocking chunks is not modelled.
+    """
+
+    def __init__(self, ledgers_amount, initial_stake, spread, unbonding_eras=UNBONDING_ERAS,
+                 max_chunks=MAX_UNLOCKING_CHUNKS, withdraw_delay=0, transfer_delay=1, queue_cap=35):
+        self.active = [initial_stake] * ledgers_amount
+        # per ledger [mature era, amount], oldest first
+        self.chunks = [collections.deque() for _ in range(ledgers_amount)]
+        self.spread = min(spread, ledgers_amount)
+        self.cursor = 0
+        self.unbonding_eras = unbonding_eras
+        self.max_chunks = max_chunks
+        self.withdraw_delay = withdraw_delay
+        self.transfer_delay = transfer_delay
+
+        self.events = []
+        self.seq = 0
+        self.flush_eras = set()
+        self.era = 0
+
+        self.buffered_deposits = 0
+        self.buffered_redeems = 0
+        self.batch_amount = 0
+        # (era the redeems were made, amount)
+        self.queue = collections.deque()
+        self.queue_cap = queue_cap
+        self.withdrawal_free = 0
+
+        self.processed = 0
+        self.max_live_chunks = 0
+        # (era, ledger) of unbonds refused because of the chunk limit
+        self.chunk_limit_hits = []
+        self.wait = RunningMoments()
+        self.wait_quantiles = [P2Quantile(q) for q in (0.5, 0.99)]
+        self.claimed_batches = 0
+
+    def schedule(self, era, kind, payload=None):
+        heapq.heappush(self.events, (era, kind, self.seq, payload))
+        self.seq += 1
+
+    def _schedule_flush(self, era):
+        if era not in self.flush_eras:
+            self.flush_eras.add(era)
+            self.schedule(era, FLUSH)
+
+    def run(self, until_era, on_event=None):
+        while self.events and self.events[0][0] <= until_era:
+            era, kind, _, payload = heapq.heappop(self.events)
+            self.era = era
+            self.processed += 1
+            if kind == ARRIVE:
+                self.withdrawal_free += payload
+                self._schedule_flush(era)
+            elif kind == WITHDRAW:
+                self._withdraw(payload)
+            elif kind == FLUSH:
+                self.flush_eras.discard(era)
+                self._flush()
+            elif kind == DEPOSIT:
+                self.buffered_deposits += payload
+                self._schedule_flush(era + 1)
+            elif kind == REDEEM:
+                self.buffered_redeems += payload
+                self.batch_amount += payload
+                self._schedule_flush(era + 1)
+            if on_event is not None:
+                on_event(self, kind, payload)
+
+    def _flush(self):
+        # Withdrawal.newEra
+        if self.queue and self.withdrawal_free >= self.queue[0][1]:
+            redeem_era, amount = self.queue.popleft()
+            self.withdrawal_free -= amount
+            self.claimed_batches += 1
+            wait = self.era - redeem_era
+            self.wait.add(wait)
+            for quantile in self.wait_quantiles:
+                quantile.add(wait)
+        if self.batch_amount > 0 and len(self.queue) < self.queue_cap:
+            self.queue.append((self.era - 1, self.batch_amount))
+            self.batch_amount = 0
+
+        # Nimbus._softRebalanceStakes
+        netted = min(self.buffered_deposits, self.buffered_redeems)
+        self.withdrawal_free += netted
+        self.buffered_deposits -= netted
+        self.buffered_redeems -= netted
+        if self.buffered_deposits > 0:
+            self._bond(self.buffered_deposits)
+            self.buffered_deposits = 0
+        if self.buffered_redeems > 0:
+            self.buffered_redeems = self._unbond(self.buffered_redeems)
+            if self.buffered_redeems > 0:
+                self._schedule_flush(self.era + 1)
+
+        # a funded batch can be popped next era
+        if self.queue and (self.withdrawal_free >= self.queue[0][1] or self.batch_amount > 0):
+            self._schedule_flush(self.era + 1)
+
+    def _next_ledgers(self):
+        ledgers_amount = len(self.active)
+        for _ in range(self.spread):
+            ledger = self.cursor
+            self.cursor = (self.cursor + 1) % ledgers_amount
+            yield ledger
+
+    def _bond(self, amount):
+        part = amount // self.spread
+        for i, ledger in enumerate(self._next_ledgers()):
+            self.active[ledger] += part if i > 0 else amount - part * (self.spread - 1)
+
+    def _unbond(self, amount):
+        """
+        @return amount which could not be unbonded this era
+        """
+        mature_era = self.era + self.unbonding_eras
+        for _ in range(len(self.active) // self.spread + 1):
+            ledgers = [ledger for ledger in self._next_ledgers() if self.active[ledger] > 0]
+            for i, ledger in enumerate(ledgers):
+                part = amount // (len(ledgers) - i)
+                part = min(part if i < len(ledgers) - 1 else amount, self.active[ledger])
+                if part == 0:
+                    continue
+                chunks = self.chunks[ledger]
+                if chunks and chunks[-1][0] == mature_era:
+                    chunks[-1][1] += part
+                elif len(chunks) >= self.max_chunks:
+                    self.chunk_limit_hits.append((self.era, ledger))
+                    continue
+                else:
+                    chunks.append([mature_era, part])
+                    self.max_live_chunks = max(self.max_live_chunks, len(chunks))
+                    self.schedule(mature_era + self.withdraw_delay, WITHDRAW, ledger)
+                self.active[ledger] -= part
+                amount -= part
+            if amount == 0:
+                break
+        return amount
+
+    def _withdraw(self, ledger):
+        chunks = self.chunks[ledger]
+        withdrawn = 0
+        while chunks and chunks[0][0] + self.withdraw_delay <= self.era:
+            withdrawn += chunks.popleft()[1]
+        if withdrawn > 0:
+            self.schedule(self.era + self.transfer_delay, ARRIVE, withdrawn)
+
+
+def schedule_arrivals(sim, rng, kind, probability, amount_max, until_era):
+    """
+    Bernoulli arrivals per era drawn as geometric gaps, so empty eras produce no events
+    """
+    if probability <= 0:
+        return
+    era = 0
+    log_miss = math.log(1 - probability) if probability < 1 else None
+    while True:
+        gap = 1 if log_miss is None else 1 + int(math.log(1 - rng.random()) / log_miss)
+        era += gap
+        if era > until_era:
+            break
+        sim.schedule(era, kind, rng.randrange(1, amount_max))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Event-driven unbonding and redeem liquidity forecast')
+    parser.add_argument('--ledgers', type=int, default=1000)
+    parser.add_argument('--eras', type=int, default=4 * 365 * 10, help='6 hour eras, default is ten years')
+    parser.add_argument('--initial-stake', type=int, default=10**6)
+    parser.add_argument('--spread', type=int, default=16, help='ledgers touched by one flush')
+    parser.add_argument('--redeem-prob', type=float, default=0.5, help='probability of redeems in an era')
+    parser.add_argument('--redeem-max', type=int, default=10**5)
+    parser.add_argument('--deposit-prob', type=float, default=0.5)
+    parser.add_argument('--deposit-max', type=int, default=10**5)
+    parser.add_argument('--unbonding-eras', type=int, default=UNBONDING_ERAS)
+    parser.add_argument('--max-chunks', type=int, default=MAX_UNLOCKING_CHUNKS)
+    parser.add_argument('--withdraw-delay', type=int, default=0, help='eras between chunk maturity and withdraw')
+    parser.add_argument('--transfer-delay', type=int, default=1, help='eras between withdraw and funds on Withdrawal')
+    parser.add_argument('--queue-cap', type=int, default=35, help='Withdrawal queue capacity')
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32))
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sim = UnbondingSim(
+        args.ledgers, args.initial_stake, args.spread, args.unbonding_eras, args.max_chunks,
+        args.withdraw_delay, args.transfer_delay, args.queue_cap
+    )
+    schedule_arrivals(sim, rng, REDEEM, args.redeem_prob, args.redeem_max, args.eras)
+    schedule_arrivals(sim, rng, DEPOSIT, args.deposit_prob, args.deposit_max, args.eras)
+
+    started = time.time()
+    sim.run(args.eras)
+    elapsed = time.time() - started
+
+    print(f'Seed:               {args.seed}')
+    print(f'Eras:               {args.eras}  ledgers: {args.ledgers}')
+    print(f'Events:             {sim.processed} in {elapsed:.2f}s')
+    print(f'Claimable batches:  {sim.claimed_batches}, {len(sim.queue)} queued at the end')
+    if sim.wait.count > 0:
+        print(f'Eras to claim:      mean {sim.wait.mean:.1f}  P50 {sim.wait_quantiles[0].value():.0f}  '
+              f'P99 {sim.wait_quantiles[1].value():.0f}  max {sim.wait.max:.0f}')
+    if sim.queue:
+        print(f'Oldest queued:      redeemed at era {sim.queue[0][0]}')
+    print(f'Max live chunks:    {sim.max_live_chunks} of {args.max_chunks}')
+    if sim.chunk_limit_hits:
+        era, ledger = sim.chunk_limit_hits[0]
+        print(f'Chunk limit hits:   {len(sim.chunk_limit_hits)}, first at era {era} on ledger {ledger}')
+    else:
+        print('Chunk limit hits:   0')
+
+
+if __name__ == '__main__':
+    main()
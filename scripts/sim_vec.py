@@ -0,0 +1,220 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from sim_distr2 import Nimbus, STAKE_MAX, REWARD_MAX
+
+
+# products of stakes and diffs must fit into int64 to keep floor division exact
+INT64_SAFE = 2**62
+
+
+class BatchedNimbus:
+    """
+    Batched counterpart of `sim_distr2.Nimbus` with `UniformStrategy` as distribution algorithm.
+    Every array has shape (trials, ledgers) or (trials,), so one call advances all trials at once.
+    Integer semantics (floor division, dust placement) are identical to the Python-int version.
+    """
+
+    def __init__(self, trials, ledgers_amount, shares=None):
+        self.trials = trials
+        self.ledger_stakes = np.zeros((trials, ledgers_amount), dtype=np.int64)
+        self.ledger_shares = np.full(ledgers_amount, 100, dtype=np.int64)
+        self.total_stake = np.zeros(trials, dtype=np.int64)
+        self.buffered_stakes = np.zeros(trials, dtype=np.int64)
+        self.buffered_redeems = np.zeros(trials, dtype=np.int64)
+        if shares is not None:
+            self.set_shares(shares)
+
+    def set_shares(self, shares):
+        shares = np.asarray(shares, dtype=np.int64)
+        assert shares.shape == self.ledger_shares.shape
+        assert shares.sum() > 0
+        self.ledger_shares = shares
+
+    def total_ledger_shares(self):
+        return int(self.ledger_shares.sum())
+
+    def target_stakes(self):
+        self._check_bounds(self.total_stake, self.ledger_shares.max())
+        targets = self.total_stake[:, None] * self.ledger_shares // self.total_ledger_shares()
+        # dust goes to the first ledger with non zero share, same as `_distr_prop`
+        dust = self.total_stake - targets.sum(axis=1)
+        non_zero_prop = int(np.argmax(self.ledger_shares > 0))
+        targets[:, non_zero_prop] += np.where(dust > 0, dust, 0)
+        return targets
+
+    def stake(self, amounts):
+        self.buffered_stakes += amounts
+        self.total_stake += amounts
+
+    def redeem(self, amounts):
+        assert (amounts <= self.total_stake).all()
+        self.buffered_redeems += amounts
+        self.total_stake -= amounts
+
+    def rewards(self, ledger_rewards):
+        assert ledger_rewards.shape == self.ledger_stakes.shape
+        assert (self.ledger_stakes + ledger_rewards >= 0).all()
+        self.ledger_stakes += ledger_rewards
+        self.total_stake += ledger_rewards.sum(axis=1)
+
+    def soft_rebalance(self):
+        self._uni_distr(self.buffered_stakes - self.buffered_redeems)
+
+        self.buffered_stakes[:] = 0
+        self.buffered_redeems[:] = 0
+
+    def _uni_distr(self, stake):
+        self._check_bounds(self.total_stake, self.ledger_shares.max())
+        targets = self.total_stake[:, None] * self.ledger_shares // self.total_ledger_shares()
+        diffs = targets - self.ledger_stakes
+
+        direction = np.where(stake < 0, -1, 1)
+        directed = diffs * direction[:, None]
+        active = (directed > 0) & (stake != 0)[:, None]
+        active_diffs_sum = np.where(active, directed, 0).sum(axis=1)
+
+        # for stakes only ledgers with non zero share are growing, redeems touch everyone
+        changing = active & ((direction < 0)[:, None] | (self.ledger_shares > 0)) & (active_diffs_sum != 0)[:, None]
+        self._check_bounds(diffs, stake)
+        # diffs * stake is always non negative on changing ledgers, so `//` matches Python ints
+        change = np.where(changing, diffs * stake[:, None] // np.maximum(active_diffs_sum, 1)[:, None], 0)
+        self.ledger_stakes += direction[:, None] * change
+        total_change = (direction[:, None] * change).sum(axis=1)
+
+        remaining = stake - total_change
+
+        # positive remaining goes to the first ledger with non zero share
+        first_share = int(np.argmax(self.ledger_shares > 0))
+        self.ledger_stakes[:, first_share] += np.where(remaining > 0, remaining, 0)
+
+        # negative remaining is taken greedily from the first ledgers with non zero stake
+        need = np.where(remaining < 0, -remaining, 0)
+        taken_before = np.cumsum(self.ledger_stakes, axis=1) - self.ledger_stakes
+        decrement = np.clip(need[:, None] - taken_before, 0, self.ledger_stakes)
+        self.ledger_stakes -= decrement
+
+    def _check_bounds(self, values, factor):
+        bound = int(np.abs(values).max(initial=0)) * int(np.abs(factor).max(initial=0))
+        if bound >= INT64_SAFE:
+            raise OverflowError(f"stake values too large for int64 engine: {bound}")
+
+
+class BatchedStats:
+    eras = 0
+    bondings = 0
+    unbondings = 0
+    failures = 0
+
+
+def random_step(nimbus, rng, stake_max=STAKE_MAX, reward_max=REWARD_MAX):
+    """
+    Draw rewards and a net stake for every trial, the same distributions as `sim_distr2.main`
+    @return (rewards, stake) arrays
+    """
+    reward_low = np.maximum(-nimbus.ledger_stakes.min(axis=1), -reward_max)
+    rewards = rng.integers(reward_low[:, None], reward_max, size=nimbus.ledger_stakes.shape, dtype=np.int64)
+    stake_low = np.maximum(-(nimbus.total_stake + rewards.sum(axis=1)), -stake_max)
+    stake = rng.integers(stake_low, stake_max, dtype=np.int64)
+    return rewards, stake
+
+
+def apply_step(nimbus, rewards, stake):
+    """
+    Apply one era to every trial and check rebalance invariants
+    @return (bondings, unbondings, failed) arrays per trial
+    """
+    nimbus.rewards(rewards)
+    prev_stakes = nimbus.ledger_stakes.copy()
+    nimbus.stake(np.where(stake > 0, stake, 0))
+    nimbus.redeem(np.where(stake > 0, 0, -stake))
+    nimbus.soft_rebalance()
+
+    unbondings = (nimbus.ledger_stakes < prev_stakes).sum(axis=1)
+    bondings = (nimbus.ledger_stakes > prev_stakes).sum(axis=1)
+
+    failed = (stake > 0) & (unbondings > 0)
+    failed |= (stake < 0) & (bondings > 0)
+    failed |= nimbus.ledger_stakes.sum(axis=1) != nimbus.target_stakes().sum(axis=1)
+    failed |= nimbus.ledger_stakes.sum(axis=1) != nimbus.total_stake
+    return bondings, unbondings, failed
+
+
+def run(trials, ledgers, steps, seed, stats=None):
+    rng = np.random.default_rng(seed)
+    nimbus = BatchedNimbus(trials, ledgers)
+    nimbus.stake(np.full(trials, STAKE_MAX, dtype=np.int64))
+    nimbus.soft_rebalance()
+
+    stats = stats or BatchedStats()
+    stake_sum = nimbus.total_stake.copy()
+    for _ in range(steps):
+        rewards, stake = random_step(nimbus, rng)
+        bondings, unbondings, failed = apply_step(nimbus, rewards, stake)
+        stake_sum += stake + rewards.sum(axis=1)
+        failed |= nimbus.ledger_stakes.sum(axis=1) != stake_sum
+
+        stats.eras += trials
+        stats.bondings += int(bondings.sum())
+        stats.unbondings += int(unbondings.sum())
+        stats.failures += int(failed.sum())
+        assert not failed.any(), f"invariant violated in trials {np.flatnonzero(failed)}"
+    return nimbus, stats
+
+
+def cross_check(trials, ledgers, steps, seed):
+    """
+    Run the batched engine and `sim_distr2.Nimbus` on the same events and compare them step by step
+    """
+    rng = np.random.default_rng(seed)
+    batched = BatchedNimbus(trials, ledgers)
+    reference = [Nimbus(ledgers, verbose=False) for _ in range(trials)]
+
+    batched.stake(np.full(trials, STAKE_MAX, dtype=np.int64))
+    batched.soft_rebalance()
+    for nimbus in reference:
+        nimbus.stake(STAKE_MAX)
+        nimbus.soft_rebalance()
+
+    for step in range(steps):
+        rewards, stake = random_step(batched, rng)
+        apply_step(batched, rewards, stake)
+        for t, nimbus in enumerate(reference):
+            nimbus.rewards([int(r) for r in rewards[t]])
+            if stake[t] > 0:
+                nimbus.stake(int(stake[t]))
+            else:
+                nimbus.redeem(int(-stake[t]))
+            nimbus.soft_rebalance()
+            assert batched.ledger_stakes[t].tolist() == nimbus.ledger_stakes, f"trial {t} diverged at step {step}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched stake distribution simulator')
+    parser.add_argument('--trials', type=int, default=10000)
+    parser.add_argument('--ledgers', type=int, default=5)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=random.randrange(2**32))
+    parser.add_argument('--check', type=int, default=0, help='cross check N trials against sim_distr2.Nimbus first')
+    args = parser.parse_args()
+
+    if args.check > 0:
+        cross_check(args.check, args.ledgers, min(args.steps, 1000), args.seed)
+        print(f'Cross check passed: {args.check} trials')
+
+    started = time.time()
+    _, stats = run(args.trials, args.ledgers, args.steps, args.seed)
+    elapsed = time.time() - started
+
+    print(f'Seed:            {args.seed}')
+    print(f'Ledger-eras:     {stats.eras * args.ledgers} in {elapsed:.2f}s ({stats.eras * args.ledgers / elapsed:.0f}/s)')
+    print(f'Bondings:        {stats.bondings}')
+    print(f'Unbondings:      {stats.unbondings}')
+    print(f'Failures:        {stats.failures}')
+
+
+if __name__ == '__main__':
+    main()
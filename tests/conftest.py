@@ -1,6 +1,12 @@
+import contextlib
+import io
 import pytest
 from pathlib import Path
 from brownie import project, config
+from brownie._config import CONFIG
+import gas_bench
+from pybackend import PyBackend
+from scenarios import BASE, Deployment, ScenarioLibrary
 
 # import oz project
 project.load(Path.home() / ".brownie" / "packages" / config["dependencies"][0])
@@ -27,23 +33,141 @@ def deploy_with_proxy(contract, proxy_admin, *args):
     return (contract.at(proxy_instance.address, owner=owner), logic_instance)
 
 
-@pytest.fixture(scope="function", autouse=True)
-def isolate(fn_isolation):
-    pass
+def pytest_addoption(parser):
+    parser.addoption("--gas-bench", action="store_true", help="run gas benchmarks and compare them with the baseline")
+    parser.addoption("--gas-baseline", default=gas_bench.DEFAULT_BASELINE, help="gas benchmark baseline file")
+    parser.addoption("--gas-update", action="store_true", help="write gas benchmark results to the baseline")
+    parser.addoption("--gas-tolerance", type=float, default=0.0, help="gas increase ratio not marked as regression")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "scenario(name): start the test from a named snapshot of `scenarios.py`")
+    config.addinivalue_line("markers", "gas_bench: gas benchmark, runs only with --gas-bench")
+
+    if hasattr(config, 'workerinput'):
+        network_id = config.workerinput['network']
+    else:
+        network = config.getoption('network', False)
+        network_id = network[0] if network else None
+    cmd_settings = CONFIG.networks[network_id or CONFIG.settings['networks']['default']].get('cmd_settings')
+    if cmd_settings is None:
+        return
+    if hasattr(config, 'workerinput'):
+        # brownie launches a dev chain per xdist worker on port + worker number, give each one its own accounts too
+        mnemonic = cmd_settings.get('mnemonic', 'brownie')
+        cmd_settings['mnemonic'] = f"{mnemonic} {config.workerinput['workerid']}"
+    if config.getoption('gas_bench'):
+        # only the benchmark chain goes above the target block gas limit, the other tests keep the default one
+        cmd_settings['gas_limit'] = gas_bench.BENCH_BLOCK_GAS_LIMIT
+
+
+@pytest.hookimpl(tryfirst=True, optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    """
+    Tests do not share chain state with their module, so they are spread one by one instead of brownie's file
+    scheduling and long modules run on all workers. `--update` needs whole modules per worker for its results
+    """
+    if config.getoption('update', False):
+        return None
+    from xdist.scheduler import LoadScheduling
+    return LoadScheduling(config, log)
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('gas_bench'):
+        path = config.getoption('gas_baseline')
+        if not config.getoption('gas_update') and not Path(path).is_file():
+            # without a baseline every metric would be reported as new and no regression could show
+            raise pytest.UsageError(f"no gas baseline at {path}, create it with --gas-bench --gas-update")
+        return
+    skip = pytest.mark.skip(reason="gas benchmark, run with --gas-bench")
+    for item in items:
+        if 'gas_bench' in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = getattr(config, '_gas_recorder', None)
+    if recorder is None or not recorder.results:
+        return
+    path = config.getoption('gas_baseline')
+    baseline = gas_bench.load(path)
+    rows = gas_bench.compare(baseline, recorder.results, config.getoption('gas_tolerance'))
+    terminalreporter.section('gas usage: baseline, current, delta')
+    for line in gas_bench.format_rows(rows):
+        terminalreporter.write_line(line)
+    regressions = sum(1 for row in rows if row[-1])
+    terminalreporter.write_line(f"{regressions} metrics above the baseline")
+    for note in recorder.notes:
+        terminalreporter.write_line(note)
+    if config.getoption('gas_update'):
+        # configurations which were not run keep their baseline
+        baseline.update(recorder.results)
+        gas_bench.save(baseline, path)
+        terminalreporter.write_line(f"baseline written to {path}")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = (yield).get_result()
+    relay = getattr(item, 'funcargs', {}).get('relay')
+    if report.when == 'call' and report.failed and relay is not None and not relay.verbose:
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            relay.dump()
+        report.sections.append(('relay transactions', out.getvalue()))
+
+
+@pytest.fixture(scope="session")
+def scenarios(nimbus, xcTOKEN, oracle_master, withdrawal, mocknimbus, mockledger, accounts):
+    """
+    Contracts are deployed once per session, the base snapshot is taken after all of them
+    """
+    return ScenarioLibrary(Deployment(nimbus, xcTOKEN, oracle_master, withdrawal, accounts))
 
 
 @pytest.fixture(scope="module")
+def module_isolation():
+    """
+    Replaces brownie's chain reset around every module, deployments are kept for the whole session and `isolate`
+    reverts each test to its snapshot. xdist workers only run tests which request this fixture
+    """
+    yield
+
+
+@pytest.fixture(scope="function", autouse=True)
+def isolate(request, scenarios, module_isolation):
+    marker = request.node.get_closest_marker('scenario')
+    return scenarios.enter(marker.args[0] if marker else BASE)
+
+
+@pytest.fixture(scope="function")
+def relay(isolate):
+    assert isolate is not None, "relay needs a scenario marker"
+    return isolate
+
+
+@pytest.fixture(scope="session")
+def gas_recorder(request):
+    """
+    Gas used by the benchmarks of the session, compared with the baseline at the end. Results of xdist workers
+    are not collected, run benchmarks without `-n`
+    """
+    request.config._gas_recorder = gas_bench.GasRecorder()
+    return request.config._gas_recorder
+
+
+@pytest.fixture(scope="session")
 def proxy_admin(accounts):
     ProxyAdmin = OpenzeppelinContractsProject.ProxyAdmin
     return ProxyAdmin.deploy({'from': accounts[0]})
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def xcTOKEN(xcTOKEN_mock, accounts):
     return xcTOKEN_mock.deploy({'from': accounts[0]})
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def auth_manager(AuthManager, proxy_admin, accounts):
     (am, _) = deploy_with_proxy(AuthManager, proxy_admin, accounts[0])
     am.addByString('ROLE_SPEC_MANAGER', accounts[0], {'from': accounts[0]})
@@ -60,7 +184,7 @@ def auth_manager(AuthManager, proxy_admin, accounts):
     return am
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def oracle_master(Oracle, OracleMaster, Ledger, accounts, chain):
     o = Oracle.deploy({'from': accounts[0]})
     om = OracleMaster.deploy({'from': accounts[0]})
@@ -68,35 +192,35 @@ def oracle_master(Oracle, OracleMaster, Ledger, accounts, chain):
     return om
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def withdrawal(Withdrawal, xcTOKEN, accounts):
     wdr = Withdrawal.deploy({'from': accounts[0]})
     wdr.initialize(35, xcTOKEN, {'from': accounts[0]})
     return wdr
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def controller(Controller_mock, accounts, chain):
     c = Controller_mock.deploy({'from': accounts[0]})
     return c
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def admin(accounts):
     return accounts[0]
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def treasury(accounts):
     return accounts.add()
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def developers(accounts):
     return accounts.add()
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def nimbus(Nimbus, xcTOKEN, controller, auth_manager, oracle_master, withdrawal, proxy_admin, chain, Ledger, LedgerBeacon, LedgerFactory, accounts, developers, treasury):
     lc = Ledger.deploy({'from': accounts[0]})
     (_nimbus, _nimbus_impl) = deploy_with_proxy(Nimbus, proxy_admin, auth_manager, xcTOKEN, controller, developers, treasury, oracle_master, withdrawal, 50000 * 10**18, 3000, "TST", "TST", 12)
@@ -111,7 +235,7 @@ def nimbus(Nimbus, xcTOKEN, controller, auth_manager, oracle_master, withdrawal,
     return _nimbus
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def mocknimbus(Nimbus, LedgerMock, LedgerBeacon, LedgerFactory, Oracle, OracleMaster, Withdrawal, xcTOKEN, controller, auth_manager, admin, developers, treasury):
     lc = LedgerMock.deploy({'from': admin})
     o = Oracle.deploy({'from': admin})
@@ -130,7 +254,12 @@ def mocknimbus(Nimbus, LedgerMock, LedgerBeacon, LedgerFactory, Oracle, OracleMa
     return _nimbus
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def mockledger(mocknimbus, admin, LedgerMock):
     mocknimbus.addLedger(0x01, 0x01, 0, {'from': admin})
     return LedgerMock.at(mocknimbus.findLedger(0x01))
+
+
+@pytest.fixture(scope="function")
+def pybackend():
+    return PyBackend()
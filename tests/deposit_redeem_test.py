@@ -1,14 +1,8 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
+import pytest
 
-def test_redeem_right_after_deposit(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
 
+@pytest.mark.scenario('3 ledgers')
+def test_redeem_right_after_deposit(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -22,8 +16,7 @@ def test_redeem_right_after_deposit(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[1].active_balance == 0
     assert relay.ledgers[2].active_balance == 0
 
-    for i in range(20):
-        relay.new_era()
+    relay.fast_forward(20)
 
     # 0. Save ledger stakes before actions
     led1_stake = nimbus.ledgerStake(relay.ledgers[0].ledger_address)
@@ -52,8 +45,7 @@ def test_redeem_right_after_deposit(nimbus, oracle_master, xcTOKEN, accounts):
     assert readyToClaim == 0
 
     # 4. wait and check
-    for i in range(28):
-        relay.new_era()
+    relay.fast_forward(28)
 
     (waitingToUnbonding, readyToClaim) = nimbus.getUnbonded(accounts[1])
 
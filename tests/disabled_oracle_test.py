@@ -1,15 +1,8 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
+import pytest
 
 
-def test_deposit_redeem_with_disabled_oracle(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
+@pytest.mark.scenario('3 ledgers')
+def test_deposit_redeem_with_disabled_oracle(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit = 1500 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -44,14 +37,8 @@ def test_deposit_redeem_with_disabled_oracle(nimbus, oracle_master, xcTOKEN, wit
     assert withdrawal.totalVirtualXcTokenAmount() == 0
 
 
-def test_deposit_redeem_with_disabled_oracle_and_disabled_ledger(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
+@pytest.mark.scenario('3 ledgers')
+def test_deposit_redeem_with_disabled_oracle_and_disabled_ledger(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit = 1500 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -88,14 +75,8 @@ def test_deposit_redeem_with_disabled_oracle_and_disabled_ledger(nimbus, oracle_
     assert withdrawal.totalVirtualXcTokenAmount() == 0
 
 
-def test_redeem_deposit_with_disabled_oracle(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
+@pytest.mark.scenario('3 ledgers')
+def test_redeem_deposit_with_disabled_oracle(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit = 1500 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -0,0 +1,113 @@
+import json
+import math
+
+from helpers import RELAY_EVENTS
+
+
+DEFAULT_BASELINE = 'tests/gas_baseline.json'
+
+# block gas limit of the Moonbeam parachains the contracts are deployed to
+MOONBEAM_BLOCK_GAS_LIMIT = 15_000_000
+# development chain block gas limit with --gas-bench, above the target so reports past it are still measured
+BENCH_BLOCK_GAS_LIMIT = 2 * MOONBEAM_BLOCK_GAS_LIMIT
+
+# events telling which branches of `Ledger.pushData` a quorum report went through
+PUSH_DATA_EVENTS = RELAY_EVENTS | {'DownwardComplete', 'UpwardComplete', 'Rewards', 'Slash'}
+
+
+def push_data_branch(tx):
+    """
+    @return metric name of the `Ledger.pushData` branches taken by a quorum reaching report
+    """
+    names = sorted({event.name for event in tx.events if event.name in PUSH_DATA_EVENTS})
+    return 'Ledger.pushData ' + ('+'.join(names) if names else 'idle')
+
+
+class GasRecorder:
+    """
+    Gas used per configuration and metric, the highest value is kept when a metric is measured several times
+    """
+
+    def __init__(self):
+        self.results = {}
+        # lines printed after the deltas
+        self.notes = []
+
+    def record(self, config, metric, gas):
+        metrics = self.results.setdefault(config, {})
+        metrics[metric] = max(metrics.get(metric, 0), gas)
+
+    def record_era(self, config, reports):
+        """
+        Record the report transactions returned by `RelayChain.new_era`, two members per ledger, the second
+        vote reaches the quorum and pushes the data to the ledger
+        """
+        self.record(config, 'OracleMaster.reportRelay first of era', reports[0].gas_used)
+        for i, tx in enumerate(reports):
+            if i % 2 == 0:
+                if i > 0:
+                    self.record(config, 'OracleMaster.reportRelay vote', tx.gas_used)
+            else:
+                self.record(config, 'OracleMaster.reportRelay quorum', tx.gas_used)
+                self.record(config, push_data_branch(tx), tx.gas_used)
+        self.record(config, 'era reports total', sum(tx.gas_used for tx in reports))
+
+
+def limit_crossing(points, limit):
+    """
+    Interpolate the size at which gas goes above `limit`, extrapolated from the last two points when no point does
+    @param points - (size, gas) sorted by size
+    @return (size, True if a measured point is above the limit), None if gas does not grow towards the limit
+    """
+    above = next((k for k, (_, gas) in enumerate(points) if gas > limit), None)
+    if above == 0:
+        return points[0][0], True
+    (n0, g0), (n1, g1) = points[above - 1:above + 1] if above is not None else points[-2:]
+    if g1 <= g0:
+        return None
+    return n0 + math.floor((limit - g0) * (n1 - n0) / (g1 - g0)) + 1, above is not None
+
+
+def load(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save(results, path):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+        file.write('\n')
+
+
+def compare(baseline, results, tolerance=0.0):
+    """
+    @return rows (config, metric, baseline gas or None, gas, delta or None, over tolerance) for every measured metric
+    """
+    rows = []
+    for config in results:
+        for metric in sorted(results[config]):
+            gas = results[config][metric]
+            base = baseline.get(config, {}).get(metric)
+            delta = None if base is None else gas - base
+            regression = delta is not None and delta > base * tolerance
+            rows.append((config, metric, base, gas, delta, regression))
+    return rows
+
+
+def format_rows(rows):
+    lines = []
+    config = None
+    for row_config, metric, base, gas, delta, regression in rows:
+        if row_config != config:
+            config = row_config
+            lines.append(config)
+        if delta is None:
+            change = 'new'
+        else:
+            change = f'{delta:+d}' + (f' ({100 * delta / base:+.2f}%)' if base else '')
+        base = '-' if base is None else base
+        lines.append(f"  {'!' if regression else ' '} {metric:<60} {base:>10} {gas:>10} {change}")
+    return lines
@@ -0,0 +1,96 @@
+import pytest
+from brownie import chain
+from gas_bench import MOONBEAM_BLOCK_GAS_LIMIT, limit_crossing
+
+
+LEDGERS = [1, 4, 16, 64]
+# batches waiting in the withdrawal queue, they stay queued for the 28 unbonding eras
+QUEUE_FILL = [0, 8, 24]
+# up to MAX_LEDGERS_AMOUNT of Nimbus
+SCALING_LEDGERS = [1, 25, 50, 100, 150, 200]
+
+
+@pytest.mark.gas_bench
+@pytest.mark.parametrize('queue_fill', QUEUE_FILL)
+@pytest.mark.parametrize('ledgers', LEDGERS)
+@pytest.mark.scenario('tokens distributed')
+def test_gas(gas_recorder, nimbus, oracle_master, withdrawal, accounts, relay, ledgers, queue_fill):
+    config = f'{ledgers} ledgers, {queue_fill} queued batches'
+    for i in range(1, ledgers + 1):
+        relay.new_ledger(hex(0x10 * i), hex(0x10 * i + 1))
+
+    for acc in accounts[1:5]:
+        nimbus.deposit(25 * 10**12 * ledgers, {'from': acc})
+    gas_recorder.record_era(config, relay.new_era())  # transfer to relay
+    gas_recorder.record_era(config, relay.new_era())  # bond
+
+    # one batch per era, spread over holders to stay under the requests limit per holder
+    for i in range(queue_fill):
+        nimbus.redeem(10**12, {'from': accounts[1 + i % 4]})
+        gas_recorder.record_era(config, relay.new_era())  # unbond
+    assert withdrawal.queue()[1] == queue_fill  # (first, size, cap, id)
+
+    gas_recorder.record(config, 'Nimbus.deposit', nimbus.deposit(10**12, {'from': accounts[2]}).gas_used)
+    gas_recorder.record(config, 'Nimbus.redeem', nimbus.redeem(2 * 10**12, {'from': accounts[1]}).gas_used)
+    gas_recorder.record(config, 'Nimbus.claimUnbonded pending', nimbus.claimUnbonded({'from': accounts[1]}).gas_used)
+
+    # the same call is made by the first report of the era, reverted to keep the relay in sync
+    chain.snapshot()
+    gas_recorder.record(config, 'Nimbus.flushStakes', nimbus.flushStakes({'from': oracle_master}).gas_used)
+    chain.revert()
+
+    gas_recorder.record_era(config, relay.new_era([10**9] * ledgers))  # unbond or rebond, rewards
+    gas_recorder.record_era(config, relay.new_era())
+    gas_recorder.record_era(config, relay.new_era([-10**9] * ledgers))  # slash
+
+    relay.timetravel(28)
+    gas_recorder.record_era(config, relay.new_era())  # withdraw
+    gas_recorder.record_era(config, relay.new_era())  # transfer to parachain
+    gas_recorder.record_era(config, relay.new_era())  # transfer to parachain completed
+    gas_recorder.record_era(config, relay.new_era())  # withdrawal batch released
+
+    assert nimbus.getUnbonded(accounts[1])[1] > 0
+    gas_recorder.record(config, 'Nimbus.claimUnbonded ready', nimbus.claimUnbonded({'from': accounts[1]}).gas_used)
+
+
+@pytest.mark.gas_bench
+@pytest.mark.scenario('tokens distributed')
+def test_first_report_scaling(gas_recorder, nimbus, accounts, relay):
+    """
+    The first report of an era clears reporting of every ledger and flushes stakes over all of them. Every 8th
+    ledger is disabled and every other 8th is paused, a deposit before each era changes every enabled ledger stake
+    """
+    bench = 'first report of era'
+    points = []
+    for ledgers in SCALING_LEDGERS:
+        while len(relay.ledgers) < ledgers:
+            i = len(relay.ledgers) + 1
+            relay.new_ledger(hex(0x10 * i), hex(0x10 * i + 1))
+            if i % 8 == 4:
+                nimbus.disableLedger(relay.ledgers[-1].ledger_address, {'from': accounts[0]})
+            elif i % 8 == 0:
+                nimbus.emergencyPauseLedger(relay.ledgers[-1].ledger_address, {'from': accounts[0]})
+
+        nimbus.deposit(10**12 * ledgers, {'from': accounts[1]})
+        gas = relay.new_era()[0].gas_used
+        gas_recorder.record(bench, f'{ledgers:03d} ledgers', gas)
+        points.append((ledgers, gas))
+
+    limit = MOONBEAM_BLOCK_GAS_LIMIT
+    crossing = limit_crossing(points, limit)
+    if crossing is None:
+        gas_recorder.notes.append(f'{bench}: gas does not grow with ledgers, block gas limit {limit} is not reached')
+    else:
+        ledgers, measured = crossing
+        gas_recorder.notes.append(
+            f"{bench}: block gas limit {limit} is exceeded at {ledgers} ledgers"
+            f" ({'interpolated' if measured else 'extrapolated'} from {points[-1][0]} ledgers {points[-1][1]} gas)"
+        )
+
+
+def test_limit_crossing():
+    assert limit_crossing([(1, 100), (10, 1000)], 5000) == (51, False)
+    assert limit_crossing([(1, 100), (10, 1000), (20, 2000)], 1500) == (16, True)
+    assert limit_crossing([(1, 100), (10, 1000)], 1000) == (11, False)
+    assert limit_crossing([(1, 2000), (10, 3000)], 1000) == (1, True)
+    assert limit_crossing([(1, 100), (10, 100)], 1000) is None
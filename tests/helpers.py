@@ -1,18 +1,45 @@
 
-from brownie import Ledger
+import copy
+import functools
+import os
+from collections import deque
+
+from brownie.convert import to_address, to_bytes
+
+# report events emulated on the relay side, other events of a report are skipped
+RELAY_EVENTS = frozenset((
+    'TransferToRelaychain', 'TransferToParachain', 'Bond', 'BondExtra', 'Unbond', 'Rebond', 'Withdraw', 'Nominate',
+    'Chill',
+))
+
+
+def _recorded(action, encode):
+    """
+    Record the decorated RelayChain action while `trace` is set, failed steps are recorded with their error
+    @param encode - function of the call arguments returning the step arguments
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if self.trace is None:
+                return fn(self, *args, **kwargs)
+            step_args = encode(self, *args, **kwargs)
+            try:
+                result = fn(self, *args, **kwargs)
+            except Exception as e:
+                self.trace.append([action, step_args, self.state(), f'{type(e).__name__}: {e}'])
+                raise
+            self.trace.append([action, step_args, self.state()])
+            return result
+        return wrapper
+    return decorator
 
-class RelayLedger:
-    ledger_address = None
-    stash_account = None
-    controller_account = None
-
-    active_balance = 0
-    free_balance = 0
-    unlocking_chunks = []
-    validators = 0
-    status = None
 
-    relay = None
+class RelayLedger:
+    __slots__ = (
+        'relay', 'ledger_address', 'stash_account', 'controller_account',
+        'active_balance', 'free_balance', 'unlocking_chunks', 'unlocking_balance', 'validators', 'status',
+    )
 
     def __init__(self, relay, ledger_address, stash_account, controller_account):
         self.relay = relay
@@ -22,17 +49,20 @@ class RelayLedger:
 
         self.active_balance = 0
         self.free_balance = 0
-        self.unlocking_chunks = []
+        # (amount, era) oldest first, `unlocking_balance` is the sum of amounts
+        self.unlocking_chunks = deque()
+        self.unlocking_balance = 0
         self.validators = 0
         self.status = None
 
     def total_balance(self):
-        return self.active_balance + self._unlocking_sum() + self.free_balance
+        return self.active_balance + self.unlocking_balance + self.free_balance
 
     def unbond(self, amount):
         assert self.active_balance >= amount
         self.active_balance -= amount
         self.unlocking_chunks.append((amount, self.relay.era + 28))
+        self.unlocking_balance += amount
         assert len(self.unlocking_chunks) < 32
 
     def bond(self, amount):
@@ -46,29 +76,42 @@ class RelayLedger:
         self.free_balance -= amount
 
     def rebond(self, amount):
-        rebonded = 0
-        while len(self.unlocking_chunks) > 0:
-            if rebonded + self.unlocking_chunks[0][0] <= amount:
-                rebonded += self.unlocking_chunks[0][0]
-                self.unlocking_chunks.pop(0)
-            else:
-                diff = amount - rebonded
-                rebonded += diff
-                self.unlocking_chunks[0] = (self.unlocking_chunks[0][0] - diff, self.unlocking_chunks[0][1])
-                break
-        
+        rebonded = self._take_unlocking(amount)
         self.active_balance += rebonded
 
     def withdraw(self):
-        while len(self.unlocking_chunks) > 0 and self.unlocking_chunks[0][1] < self.relay.era:
-            self.free_balance += self.unlocking_chunks[0][0]
-            self.unlocking_chunks.pop(0)
-
-    def _unlocking_sum(self):
-        sum = 0
-        for i in range(len(self.unlocking_chunks)):
-            sum += self.unlocking_chunks[i][0]
-        return sum
+        chunks = self.unlocking_chunks
+        while len(chunks) > 0 and chunks[0][1] < self.relay.era:
+            withdrawn = chunks.popleft()[0]
+            self.unlocking_balance -= withdrawn
+            self.free_balance += withdrawn
+
+    def slash(self, amount):
+        """
+        Slash active balance first, then unlocking chunks from the oldest one
+        """
+        from_active = min(self.active_balance, amount)
+        self.active_balance -= from_active
+        slashed = from_active + self._take_unlocking(amount - from_active)
+        assert slashed == amount
+
+    def _take_unlocking(self, amount):
+        """
+        Remove up to `amount` from unlocking chunks, oldest first
+        @return removed amount
+        """
+        chunks = self.unlocking_chunks
+        taken = 0
+        while len(chunks) > 0 and taken < amount:
+            chunk_amount, era = chunks[0]
+            if taken + chunk_amount <= amount:
+                taken += chunk_amount
+                chunks.popleft()
+            else:
+                chunks[0] = (chunk_amount - (amount - taken), era)
+                taken = amount
+        self.unlocking_balance -= taken
+        return taken
 
     def _status_num(self):
         if self.status == 'Chill':
@@ -86,8 +129,8 @@ class RelayLedger:
             self.controller_account,
             self._status_num(),
             self.active_balance,
-            self.active_balance + self._unlocking_sum(),
-            self.unlocking_chunks,
+            self.active_balance + self.unlocking_balance,
+            list(self.unlocking_chunks),
             [],
             self.total_balance(),
             0 # ledger slashing spans (for test always 0)
@@ -95,6 +138,11 @@ class RelayLedger:
 
 
 class RelayChain:
+    # print every transaction with `tx.info()`, set RELAY_VERBOSE=1 to debug a scenario
+    verbose = os.environ.get('RELAY_VERBOSE', '') not in ('', '0')
+    # transactions kept for `dump` when printing is off
+    history_size = 64
+
     nimbus = None
     xcTOKEN = None
     oracle_master = None
@@ -106,27 +154,148 @@ class RelayChain:
     bond_enabled = True
     transfer_enabled = True
     block_xcm_messages = False
-
-    def __init__(self, nimbus, xcTOKEN, oracle_master, accounts, chain):
+    # recorded steps while recording, see `relay_trace.py`
+    trace = None
+
+    def __init__(self, nimbus, xcTOKEN, oracle_master, accounts, chain, ledger_at=None):
+        """
+        @param ledger_at - ledger contract by address, `Ledger.at` by default. Set it to `PyBackend.at`
+                           to run the scenario on the in-memory backend of `pybackend.py`
+        """
         self.nimbus = nimbus
         self.xcTOKEN = xcTOKEN
         self.oracle_master = oracle_master
         self.accounts = accounts
         self.chain = chain
+        if ledger_at is None:
+            # contract containers exist only in a loaded project, `RelayLedger` alone works without one
+            from brownie import Ledger
+            ledger_at = Ledger.at
+        self.ledger_at = ledger_at
 
         self.oracle_master.addOracleMember(self.accounts[0], {'from': self.accounts[0]})
         self.oracle_master.addOracleMember(self.accounts[1], {'from': self.accounts[0]})
         self.oracle_master.setQuorum(2, {'from': self.accounts[0]})
 
         self.ledgers = []
+        self._by_stash = {}
+        self._by_controller = {}
+        self._by_address = {}
         self.era = 0
         self.total_rewards = 0
+        self.history = deque(maxlen=self.history_size)
+
+    def copy(self):
+        """
+        Independent copy of the relay side state, contracts, accounts and chain are shared with the original
+        """
+        shared = (self.nimbus, self.xcTOKEN, self.oracle_master, self.accounts, self.chain, self.ledger_at)
+        memo = {id(obj): obj for obj in shared}
+        memo[id(self.history)] = deque(maxlen=self.history_size)
+        return copy.deepcopy(self, memo)
+
+    def record(self):
+        """
+        Start recording every action with the relay state after it, `relay_trace.replay` drives a relay through it.
+        Nimbus calls are recorded only when made with `call`
+        @return the trace list, steps are [action, args, state] and the error text of failed ones
+        """
+        self.trace = []
+        return self.trace
+
+    def state(self):
+        """
+        Relay side state in plain lists, comparable between runs and backends
+        """
+        return [self.era, [
+            [ledger.active_balance, ledger.free_balance, [list(chunk) for chunk in ledger.unlocking_chunks],
+             ledger.validators, ledger.status]
+            for ledger in self.ledgers
+        ]]
+
+    def _flags(self):
+        return [self.bond_enabled, self.transfer_enabled, self.block_xcm_messages]
+
+    def encode_arg(self, arg):
+        """
+        Ledger addresses and accounts differ between backends, they are recorded by index
+        """
+        address = getattr(arg, 'address', arg)
+        if not (isinstance(address, str) and address.startswith('0x') and len(address) == 42):
+            return arg
+        key = self._address_key(address)
+        if key in self._by_address:
+            return ['ledger', self.ledgers.index(self._by_address[key])]
+        for i, account in enumerate(self.accounts):
+            if self._address_key(getattr(account, 'address', account)) == key:
+                return ['account', i]
+        return arg
+
+    def decode_arg(self, arg):
+        if isinstance(arg, list) and len(arg) == 2 and arg[0] == 'ledger':
+            return self.ledgers[arg[1]].ledger_address
+        if isinstance(arg, list) and len(arg) == 2 and arg[0] == 'account':
+            return self.accounts[arg[1]]
+        return arg
+
+    def _sender_index(self, sender):
+        if sender is None:
+            return 0
+        return sender if isinstance(sender, int) else list(self.accounts).index(sender)
+
+    @_recorded('call', lambda self, method, *args, sender=None: [
+        method, self._sender_index(sender), [self.encode_arg(arg) for arg in args]
+    ])
+    def call(self, method, *args, sender=None):
+        """
+        Nimbus call which is recorded, `sender` is an account or its index, accounts[0] by default
+        """
+        return self._track(getattr(self.nimbus, method)(*args, {'from': self.accounts[self._sender_index(sender)]}))
+
+    def deposit(self, sender, amount):
+        return self.call('deposit', amount, sender=sender)
 
+    def redeem(self, sender, shares):
+        return self.call('redeem', shares, sender=sender)
+
+    def claim_unbonded(self, sender):
+        return self.call('claimUnbonded', sender=sender)
+
+    def _track(self, tx):
+        if self.verbose:
+            tx.info()
+        else:
+            self.history.append(tx)
+        return tx
+
+    def dump(self, last=None):
+        """
+        Print kept transactions, all of them or `last` ones
+        """
+        txs = list(self.history)
+        for tx in txs[-last:] if last else txs:
+            tx.info()
+
+    @_recorded('new_ledger', lambda self, stash_account, controller_account: [stash_account, controller_account])
     def new_ledger(self, stash_account, controller_account):
-        tx = self.nimbus.addLedger(stash_account, controller_account, 0, {'from': self.accounts[0]})
-        tx.info()
-        self.ledgers.append(RelayLedger(self, tx.events['LedgerAdd'][0]['addr'], stash_account, controller_account))
-        Ledger.at(tx.events['LedgerAdd'][0]['addr']).refreshAllowances({'from': self.accounts[0]})
+        tx = self._track(self.nimbus.addLedger(stash_account, controller_account, 0, {'from': self.accounts[0]}))
+        ledger = RelayLedger(self, tx.events['LedgerAdd'][0]['addr'], stash_account, controller_account)
+        self.ledgers.append(ledger)
+        self._by_stash[self._stash_key(stash_account)] = ledger
+        self._by_controller[self._stash_key(controller_account)] = ledger
+        self._by_address[self._address_key(ledger.ledger_address)] = ledger
+        self.ledger_at(ledger.ledger_address).refreshAllowances({'from': self.accounts[0]})
+
+    @_recorded('remove_ledger', lambda self, ledger_address: [
+        self.ledgers.index(self.ledger_by_address(ledger_address))
+    ])
+    def remove_ledger(self, ledger_address):
+        ledger = self.ledger_by_address(ledger_address)
+        self._track(self.nimbus.removeLedger(ledger_address, {'from': self.accounts[0]}))
+        self.ledgers.remove(ledger)
+        del self._by_stash[self._stash_key(ledger.stash_account)]
+        del self._by_controller[self._stash_key(ledger.controller_account)]
+        del self._by_address[self._address_key(ledger.ledger_address)]
 
     def disable_bond(self):
         self.bond_enabled = False
@@ -140,66 +309,62 @@ class RelayChain:
     def enable_transfer(self):
         self.transfer_enabled = True
 
-    def _ledger_idx_by_stash_account(self, stash_account):
-        for i in range(len(self.ledgers)):
-            if self.ledgers[i].stash_account == stash_account:
-                return i
-        assert False, "not found ledger"
+    def _stash_key(self, stash_account):
+        return bytes(to_bytes(stash_account, 'bytes32'))
 
-    def _ledger_idx_by_controller_account(self, stash_account):
-        for i in range(len(self.ledgers)):
-            if self.ledgers[i].stash_account == stash_account:
-                return i
-        assert False, "not found ledger"
+    def _address_key(self, ledger_address):
+        return str(to_address(ledger_address))
 
-    def _ledger_idx_by_ledger_address(self, ledger_address):
-        for i in range(len(self.ledgers)):
-            if self.ledgers[i].ledger_address == ledger_address:
-                return i
-        assert False, "not found ledger"
+    def ledger_by_stash_account(self, stash_account):
+        ledger = self._by_stash.get(self._stash_key(stash_account))
+        assert ledger is not None, "not found ledger"
+        return ledger
+
+    def ledger_by_controller_account(self, controller_account):
+        ledger = self._by_controller.get(self._stash_key(controller_account))
+        assert ledger is not None, "not found ledger"
+        return ledger
+
+    def ledger_by_address(self, ledger_address):
+        ledger = self._by_address.get(self._address_key(ledger_address))
+        assert ledger is not None, "not found ledger"
+        return ledger
 
     def _process_upward_transfer(self, event):
-        idx = self._ledger_idx_by_stash_account(event['to'])
-        self.ledgers[idx].free_balance += event['amount']
-        self.xcTOKEN.burn(event['from'], event['amount'], {'from': self.accounts[0]}).info()
+        self.ledger_by_stash_account(event['to']).free_balance += event['amount']
+        self._track(self.xcTOKEN.burn(event['from'], event['amount'], {'from': self.accounts[0]}))
 
     def _process_downward_transfer(self, event):
-        idx = self._ledger_idx_by_stash_account(event['from'])
-        assert self.ledgers[idx].free_balance >= event['amount']
-        self.ledgers[idx].free_balance -= event['amount']
-        self.xcTOKEN.mint(event['to'], event['amount'], {'from': self.accounts[0]}).info()
+        ledger = self.ledger_by_stash_account(event['from'])
+        assert ledger.free_balance >= event['amount']
+        ledger.free_balance -= event['amount']
+        self._track(self.xcTOKEN.mint(event['to'], event['amount'], {'from': self.accounts[0]}))
 
     def _process_call(self, name, event):
         if name == 'Bond':
             if self.bond_enabled:
-                idx = self._ledger_idx_by_ledger_address(event['caller'])
-                self.ledgers[idx].bond(event['amount'])
+                self.ledger_by_address(event['caller']).bond(event['amount'])
         elif name == 'BondExtra':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].bond_extra(event['amount'])
+            self.ledger_by_address(event['caller']).bond_extra(event['amount'])
         elif name == 'Unbond':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].unbond(event['amount'])
+            self.ledger_by_address(event['caller']).unbond(event['amount'])
         elif name == 'Rebond':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].rebond(event['amount'])
+            self.ledger_by_address(event['caller']).rebond(event['amount'])
         elif name == 'Withdraw':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].withdraw()
+            self.ledger_by_address(event['caller']).withdraw()
         elif name == 'Nominate':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].validators += event['validators']
-            self.ledgers[idx].status = 'Nominator'
+            ledger = self.ledger_by_address(event['caller'])
+            ledger.validators += event['validators']
+            ledger.status = 'Nominator'
         elif name == 'Chill':
-            idx = self._ledger_idx_by_ledger_address(event['caller'])
-            self.ledgers[idx].status = 'Chill'
-            pass
+            self.ledger_by_address(event['caller']).status = 'Chill'
 
     def _after_report(self, tx):
         if not(self.block_xcm_messages):
-            for i in range(len(tx.events)):
-                name = tx.events[i].name
-                event = tx.events[i]
+            for event in tx.events:
+                name = event.name
+                if name not in RELAY_EVENTS:
+                    continue
                 if name == 'TransferToRelaychain':
                     if self.transfer_enabled:
                         self._process_upward_transfer(event)
@@ -208,39 +373,24 @@ class RelayChain:
                 else:
                     self._process_call(name, event)
 
+    @_recorded('era', lambda self, rewards=[], blocked_quorum=[]: [
+        self.era + 1, list(rewards), list(blocked_quorum), self._flags()
+    ])
     def new_era(self, rewards=[], blocked_quorum=[]):
+        """
+        @return report transactions of the era
+        """
         self.era += 1
         self.chain.sleep(6 * 60 * 60)
+        reports = []
         for i in range(len(self.ledgers)):
             if i < len(rewards) and self.ledgers[i].status != 'Chill':
                 self.total_rewards += rewards[i]
                 if (rewards[i] >= 0):
                     self.ledgers[i].active_balance += rewards[i]
                 else:
-                    if ((self.ledgers[i].active_balance + rewards[i]) >= 0):
-                        self.ledgers[i].active_balance += rewards[i]
-                        rewards[i] = 0
-                    else:
-                        rewards[i] += self.ledgers[i].active_balance
-                        self.ledgers[i].active_balance = 0
-                        remove_idx = 0
-                        upd_idx = -1
-                        upd_val = 0
-                        for chunk in self.ledgers[i].unlocking_chunks:
-                            if ((chunk[0] + rewards[i]) >= 0):
-                                upd_val = chunk[0] + rewards[i]
-                                rewards[i] = 0
-                                upd_idx = i
-                            else:
-                                rewards[i] += chunk[0]
-                                remove_idx += 1
-
-                        if (upd_idx >= 0):
-                            self.ledgers[i].unlocking_chunks[upd_idx] = (upd_val, self.ledgers[i].unlocking_chunks[upd_idx][1])
-
-                        self.ledgers[i].unlocking_chunks = self.ledgers[i].unlocking_chunks[remove_idx:]
-
-                    assert rewards[i] == 0
+                    self.ledgers[i].slash(-rewards[i])
+                    rewards[i] = 0
 
             for j in range(2):
                 send_report = True
@@ -250,16 +400,60 @@ class RelayChain:
                         
                 if send_report:
                     tx = self.oracle_master.reportRelay(self.era, self.ledgers[i].get_report_data(), {'from': self.accounts[j]})
-                    tx.info()
+                    self._track(tx)
                     self._after_report(tx)
-
-
+                    reports.append(tx)
+        return reports
+
+    def fast_forward(self, eras, rewards=None):
+        """
+        Advance `eras` eras like repeated `new_era` calls, but report only eras where something can happen:
+        the first one, eras with rewards, eras after a report which emitted any event and eras in which an
+        unlocking chunk becomes withdrawable. A report emits no events only if it changed nothing, the next
+        one would be the same, so quiet eras in between are covered by one time jump
+        @param rewards - per ledger rewards of every era, or a function of the era number returning them
+        @return number of reported eras
+        """
+        reported = 0
+        skipped = 0
+        quiet = False
+        last_reported = self.era
+        for _ in range(eras):
+            era = self.era + skipped + 1
+            era_rewards = list((rewards(era) if callable(rewards) else rewards) or [])
+            if quiet and not any(era_rewards) and not self._withdrawable_since(last_reported, era):
+                skipped += 1
+                continue
+            if skipped > 0:
+                self.chain.sleep(6 * 60 * 60 * skipped)
+                self.era += skipped
+                skipped = 0
+            reports = self.new_era(era_rewards)
+            quiet = all(len(tx.events) == 0 for tx in reports)
+            last_reported = self.era
+            reported += 1
+        if skipped > 0:
+            self.timetravel(skipped)
+        return reported
+
+    def _withdrawable_since(self, last_era, era):
+        """
+        True if an unlocking chunk became withdrawable after `last_era` up to `era`
+        """
+        for ledger in self.ledgers:
+            for _, chunk_era in ledger.unlocking_chunks:
+                if last_era < chunk_era <= era:
+                    return True
+        return False
+
+    @_recorded('finalize_quorum', lambda self, ledger_index: [ledger_index, self._flags()])
     def finalize_quorum(self, ledger_index):
         tx = self.oracle_master.reportRelay(self.era, self.ledgers[ledger_index].get_report_data(), {'from': self.accounts[1]})
-        tx.info()
+        self._track(tx)
         self._after_report(tx)
 
 
+    @_recorded('timetravel', lambda self, eras: [eras])
     def timetravel(self, eras):
         self.chain.sleep(6 * 60 * 60 * eras)
         self.era += eras
@@ -1,5 +1,5 @@
-from brownie import chain, Ledger
-from helpers import RelayChain, distribute_initial_tokens
+import pytest
+from brownie import Ledger
 
 
 def check_distribution(nimbus, stashes, total_deposit):
@@ -13,14 +13,11 @@ def check_distribution(nimbus, stashes, total_deposit):
     assert stakes_sum == total_deposit
 
 
-def test_add_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('1 ledger')
+def test_add_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts, relay):
     stashes = [0x10]
     total_deposit = 0
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger(hex(stashes[0]), hex(stashes[0]+1))
-
     deposit = 1000 * 10**18
     total_deposit += deposit
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -51,15 +48,11 @@ def test_add_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[1].active_balance == Ledger.at(nimbus.findLedger(hex(stashes[1]))).ledgerStake()
 
 
-def test_remove_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('2 ledgers')
+def test_remove_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts, relay):
     stashes = [0x10, 0x20]
     total_deposit = 0
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger(hex(stashes[0]), hex(stashes[0]+1))
-    relay.new_ledger(hex(stashes[1]), hex(stashes[1]+1))
-
     deposit = 1000 * 10**18
     total_deposit += deposit
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -100,15 +93,11 @@ def test_remove_ledger_slowly(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.total_rewards + total_deposit == nimbus.getTotalPooledToken()
 
 
-def test_redeems_to_disabled_ledger(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('2 ledgers')
+def test_redeems_to_disabled_ledger(nimbus, oracle_master, xcTOKEN, accounts, relay):
     stashes = [0x10, 0x20]
     total_deposit = 0
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger(hex(stashes[0]), hex(stashes[0]+1))
-    relay.new_ledger(hex(stashes[1]), hex(stashes[1]+1))
-
     led1 = relay.ledgers[0].ledger_address
     led2 = relay.ledgers[1].ledger_address
 
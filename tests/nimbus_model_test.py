@@ -0,0 +1,75 @@
+from brownie import chain, Ledger
+from helpers import RelayChain, distribute_initial_tokens
+from scripts.nimbus_model import NimbusModel
+
+
+def model_from_chain(nimbus, xcTOKEN, withdrawal, disabled_amount, paused):
+    """
+    Load Nimbus state before the next flush. `getLedgerAddresses` lists enabled ledgers first
+    """
+    model = NimbusModel()
+    model.fund_raised_balance = nimbus.fundRaisedBalance()
+    model.buffered_deposits = nimbus.bufferedDeposits()
+    model.buffered_redeems = nimbus.bufferedRedeems()
+    model.xc_balance = xcTOKEN.balanceOf(nimbus)
+    model.withdrawal_balance = xcTOKEN.balanceOf(withdrawal)
+
+    ledgers = nimbus.getLedgerAddresses()
+    enabled_amount = len(ledgers) - disabled_amount
+    model.enabled_ledgers = list(ledgers[:enabled_amount])
+    model.disabled_ledgers = list(ledgers[enabled_amount:])
+    model.paused_ledgers = set(paused)
+    for ledger in ledgers:
+        model.ledger_stake[ledger] = nimbus.ledgerStake(ledger)
+        model.ledger_borrow[ledger] = nimbus.ledgerBorrow(ledger)
+        model.transfer_downward_balance[ledger] = Ledger.at(ledger).transferDownwardBalance()
+    return model
+
+
+def test_model_matches_soft_rebalance(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
+    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+
+    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
+    relay.new_ledger("0x10", "0x11")
+    relay.new_ledger("0x20", "0x21")
+    relay.new_ledger("0x30", "0x31")
+
+    disabled_amount = 0
+    paused = []
+
+    def flush_and_compare():
+        model = model_from_chain(nimbus, xcTOKEN, withdrawal, disabled_amount, paused)
+        model.soft_rebalance_stakes()
+        relay.new_era()
+        for ledger in model.ledger_stake:
+            assert nimbus.ledgerStake(ledger) == model.ledger_stake[ledger]
+        assert nimbus.bufferedDeposits() == model.buffered_deposits
+        assert nimbus.bufferedRedeems() == model.buffered_redeems
+
+    nimbus.deposit(100 * 10**18 + 1, {'from': accounts[0]})
+    flush_and_compare()
+    flush_and_compare()
+
+    # deposits and redeems in one era are netted
+    nimbus.deposit(7 * 10**18, {'from': accounts[1]})
+    nimbus.redeem(3 * 10**18, {'from': accounts[0]})
+    flush_and_compare()
+
+    nimbus.redeem(20 * 10**18 + 3, {'from': accounts[0]})
+    flush_and_compare()
+
+    # redeems are drained from disabled ledgers first, paused ones are skipped
+    nimbus.disableLedger(relay.ledgers[2].ledger_address, {'from': accounts[0]})
+    disabled_amount += 1
+    nimbus.redeem(10 * 10**18, {'from': accounts[0]})
+    flush_and_compare()
+
+    nimbus.emergencyPauseLedger(relay.ledgers[1].ledger_address, {'from': accounts[0]})
+    disabled_amount += 1
+    paused.append(relay.ledgers[1].ledger_address)
+    nimbus.redeem(5 * 10**18, {'from': accounts[0]})
+    nimbus.deposit(2 * 10**18, {'from': accounts[2]})
+    flush_and_compare()
+
+    nimbus.deposit(30 * 10**18, {'from': accounts[2]})
+    flush_and_compare()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+from eth_utils import keccak
+from scripts.oracle_reports import (
+    ConnectionPool, collect_reports, quorum_check, report_variant, storage_array, storage_array_length,
+    IDLE, NOMINATOR, VALIDATOR, NONE, MEMBERS_SLOT, REPORT_VARIANTS_SLOT
+)
+
+
+class FakeRelay:
+    """
+    Relay state in dicts, every read holds a pooled connection for `latency` seconds like a node round trip
+    """
+
+    def __init__(self, latency, pool_size):
+        self.latency = latency
+        self.pool = ConnectionPool(object, pool_size)
+        self.era = 7
+        self.validator_set = set()
+        self.controllers = {}
+        self.ledgers = {}
+        self.balances = {}
+        self.spans = {}
+        self.nominators = set()
+        self.reads = 0
+
+    async def _read(self, value):
+        def read(connection):
+            time.sleep(self.latency)
+            return value
+        self.reads += 1
+        return await self.pool.run(read)
+
+    async def head(self):
+        return await self._read('0xhead')
+
+    async def active_era(self, block_hash):
+        return await self._read(self.era)
+
+    async def validators(self, block_hash):
+        return await self._read(self.validator_set)
+
+    async def bonded(self, stashes, block_hash):
+        return await self._read([self.controllers.get(stash) for stash in stashes])
+
+    async def staking_ledgers(self, controllers, block_hash):
+        return await self._read([self.ledgers.get(controller) for controller in controllers])
+
+    async def free_balances(self, stashes, block_hash):
+        return await self._read([self.balances.get(stash, 0) for stash in stashes])
+
+    async def slashing_spans(self, stashes, block_hash):
+        return await self._read([self.spans.get(stash, 0) for stash in stashes])
+
+    async def nominating(self, stashes, block_hash):
+        return await self._read([stash in self.nominators for stash in stashes])
+
+
+def stash(i):
+    return '0x' + i.to_bytes(32, 'big').hex()
+
+
+def bond(relay, i, active, unlocking=[]):
+    relay.controllers[stash(i)] = stash(i + 1)
+    relay.ledgers[stash(i + 1)] = {
+        'total': active + sum(value for value, _ in unlocking),
+        'active': active,
+        'unlocking': list(unlocking),
+        'claimed_rewards': [5, 6],
+    }
+    relay.balances[stash(i)] = active + sum(value for value, _ in unlocking) + 100
+
+
+def test_reports():
+    relay = FakeRelay(0, 4)
+    bond(relay, 0x10, 1000, [(200, 30)])
+    bond(relay, 0x20, 500)
+    bond(relay, 0x30, 700)
+    relay.balances[stash(0x40)] = 50
+    relay.nominators.add(stash(0x10))
+    relay.validator_set.add(stash(0x20))
+    relay.spans[stash(0x30)] = 2
+
+    era, reports = asyncio.run(collect_reports(relay, [stash(0x10), stash(0x20), stash(0x30), stash(0x40).upper()]))
+    assert era == 7
+    assert reports == [
+        (stash(0x10), stash(0x11), NOMINATOR, 1000, 1200, [(200, 30)], [5, 6], 1300, 0),
+        (stash(0x20), stash(0x21), VALIDATOR, 500, 500, [], [5, 6], 600, 0),
+        (stash(0x30), stash(0x31), IDLE, 700, 700, [], [5, 6], 800, 2),
+        (stash(0x40), stash(0x40), NONE, 0, 0, [], [], 50, 0),
+    ]
+
+
+def test_reads_independent_of_stashes():
+    latency = 0.05
+    for stashes in [4, 256]:
+        relay = FakeRelay(latency, 8)
+        for i in range(stashes):
+            bond(relay, 0x10 * (i + 1), 1000)
+
+        started = time.time()
+        era, reports = asyncio.run(collect_reports(relay, [stash(0x10 * (i + 1)) for i in range(stashes)], '0xhead'))
+        elapsed = time.time() - started
+
+        assert len(reports) == stashes
+        # era, validators, bonded, balances, spans and nominations at once, then the ledgers of bonded stashes
+        assert relay.reads == 7
+        # two round trips
+        assert elapsed < 3 * latency
+
+
+def test_quorum_check():
+    a, b = 0x1234 << 8, 0x5678 << 8
+    assert quorum_check(a, [], 2, 3) == (0, True)
+    assert quorum_check(a, [a + 1], 2, 3) == (1, True)
+    # 3 of 5 members voted, 2 left
+    assert quorum_check(a, [a + 1, b + 2], 3, 5) == (1, True)
+    assert quorum_check(a, [b + 3], 3, 5) == (0, False)
+    assert quorum_check(b, [b + 3], 3, 5) == (3, True)
+
+
+def test_storage_array():
+    first = int.from_bytes(keccak((1).to_bytes(32, 'big')), 'big')
+    storage = {1: 2, first: 0xaa, first + 1: 0xbb}
+
+    reads = []
+
+    async def get_storage_at(address, position):
+        reads.append(position)
+        await asyncio.sleep(0.05)
+        return storage.get(position, 0).to_bytes(32, 'big')
+
+    assert asyncio.run(storage_array_length(get_storage_at, '0x01', 1)) == 2
+    started = time.time()
+    assert asyncio.run(storage_array(get_storage_at, '0x01', 1)) == [0xaa, 0xbb]
+    # the length, then both elements at once
+    assert time.time() - started < 0.15
+    assert asyncio.run(storage_array(get_storage_at, '0x01', 3)) == []
+    assert reads == [1, 1, first, first + 1, 3]
+
+
+@pytest.mark.scenario('1 ledger')
+def test_report_variant_matches_oracle(oracle_master, Oracle, accounts, relay, web3):
+    ledger = relay.ledgers[0]
+    oracle = Oracle.at(oracle_master.getOracle(ledger.ledger_address))
+    report = ledger.get_report_data()
+
+    async def get_storage_at(address, position):
+        return web3.eth.get_storage_at(address, position)
+
+    def read(reader, address, slot):
+        return asyncio.run(reader(get_storage_at, address, slot))
+
+    assert read(storage_array_length, oracle_master.address, MEMBERS_SLOT) == 2
+    assert read(storage_array, oracle.address, REPORT_VARIANTS_SLOT) == []
+
+    oracle_master.reportRelay(0, report, {'from': accounts[0]})
+    variants = read(storage_array, oracle.address, REPORT_VARIANTS_SLOT)
+    assert variants == [report_variant(report) + 1]
+    assert quorum_check(report_variant(report), variants, 2, 2) == (1, True)
+
+    changed = report[:7] + (report[7] + 1,) + report[8:]
+    assert quorum_check(report_variant(changed), variants, 2, 2) == (0, False)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from scripts.oracle_schedule import EraSchedule, EraScheduler, read_era_schedule
+
+
+class ClockRelay:
+    """
+    Relay active era changing every `seconds_per_era` from `started`, counting reads
+    """
+
+    def __init__(self, seconds_per_era, started, era=0):
+        self.seconds_per_era = seconds_per_era
+        self.started = started
+        self.first_era = era
+        self.reads = 0
+
+    async def head(self):
+        return '0xhead'
+
+    async def active_era(self, block_hash):
+        self.reads += 1
+        return self.first_era + int((time.time() - self.started) // self.seconds_per_era)
+
+
+def test_era_schedule():
+    schedule = EraSchedule(10, 1000, 100)
+    assert schedule.era_at(1000) == 10
+    assert schedule.era_at(1099) == 10
+    assert schedule.era_at(1100) == 11
+    assert schedule.era_start(11) == 1100
+    assert schedule.era_at(schedule.era_start(25)) == 25
+
+
+def test_schedule_matches_oracle_master(nimbus, oracle_master, chain):
+    schedule = read_era_schedule(oracle_master)
+    era = oracle_master.getCurrentEraId()
+    chain.sleep(schedule.era_start(era + 1) - chain.time() - 60)
+    chain.mine()
+    assert oracle_master.getCurrentEraId() == era
+    chain.sleep(120)
+    chain.mine()
+    assert oracle_master.getCurrentEraId() == era + 1 == schedule.era_at(chain.time())
+
+
+def run_wait(scheduler, reported_era):
+    started = time.time()
+    era = asyncio.run(scheduler.wait(reported_era))
+    return era, time.time() - started
+
+
+def test_scheduler_waits_for_parachain():
+    now = time.time()
+    # relay era 4 started 0.1s ago, parachain era 4 starts in 0.1s
+    relay = ClockRelay(0.5, now - 0.1, 4)
+    scheduler = EraScheduler(EraSchedule(4, now + 0.1, 0.5), relay, time.time, 0.02, 0.01, 10)
+
+    era, elapsed = run_wait(scheduler, 3)
+    assert era == 4
+    assert 0.1 <= elapsed < 0.2
+
+    reads = relay.reads
+    era, elapsed = run_wait(scheduler, 4)
+    assert era == 5
+    assert 0.45 <= elapsed < 0.6
+    # one read before sleeping until the parachain era start, one after it
+    assert relay.reads - reads == 2
+
+
+def test_scheduler_waits_for_relay():
+    now = time.time()
+    # parachain era 4 started 0.1s ago, relay era 4 starts in 0.1s
+    relay = ClockRelay(0.5, now + 0.1 - 0.5, 3)
+    scheduler = EraScheduler(EraSchedule(4, now - 0.1, 0.5), relay, time.time, 0.02, 0.01, 10)
+
+    era, elapsed = run_wait(scheduler, 3)
+    assert era == 4
+    assert 0.1 <= elapsed < 0.2
+
+
+def test_scheduler_retries_current_era():
+    now = time.time()
+    relay = ClockRelay(60, now - 1, 4)
+    scheduler = EraScheduler(EraSchedule(4, now - 1, 60), relay, time.time, 0, 0, 0.1)
+
+    era, elapsed = run_wait(scheduler, 3)
+    assert era == 4
+    assert 0.1 <= elapsed < 0.2
+    era, elapsed = run_wait(scheduler, None)
+    assert era == 4
+    assert 0.1 <= elapsed < 0.2
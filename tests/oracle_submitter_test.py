@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+from scripts.oracle_submitter import NonceManager, ReportSubmitter, DROPPED, PENDING, REVERTED, CONFIRMED
+
+
+class FakeChain:
+    """
+    Mempool of one account. Transactions are mined in nonce order `block_seconds` after being sent, unless their
+    gas price is below `min_gas_price`. Of several transactions with the same nonce the first one sent which is due
+    is mined, the others are dropped
+    """
+
+    def __init__(self, block_seconds, min_gas_price=0):
+        self.block_seconds = block_seconds
+        self.min_gas_price = min_gas_price
+        self.mined = 0
+        self.sent = []
+
+    def pending_count(self):
+        self.mine()
+        return self.mined + len([tx for tx in self.sent if tx._status == PENDING])
+
+    def send(self, tx_params, revert=False, fail=False):
+        assert tx_params['required_confs'] == 0
+        if fail:
+            raise ValueError('execution reverted')
+        tx = FakeReceipt(self, tx_params['nonce'], 10, revert)
+        self.sent.append(tx)
+        return tx
+
+    def mine(self):
+        while True:
+            due = [
+                tx for tx in self.sent
+                if tx._status == PENDING and tx.nonce == self.mined and tx.gas_price >= self.min_gas_price
+                and time.time() - tx.sent > self.block_seconds
+            ]
+            if len(due) == 0:
+                return
+            for tx in self.sent:
+                if tx.nonce == self.mined:
+                    tx._status = DROPPED
+            due[0]._status = REVERTED if due[0].revert else CONFIRMED
+            self.mined += 1
+
+
+class FakeReceipt:
+
+    def __init__(self, chain, nonce, gas_price, revert):
+        self.chain = chain
+        self.nonce = nonce
+        self.gas_price = gas_price
+        self.revert = revert
+        self.sent = time.time()
+        self.txid = f'0x{nonce:02x}{gas_price:04x}'
+        self._status = PENDING
+
+    @property
+    def status(self):
+        self.chain.mine()
+        return self._status
+
+    def replace(self, increment):
+        tx = FakeReceipt(self.chain, self.nonce, int(self.gas_price * increment), self.revert)
+        self.chain.sent.append(tx)
+        return tx
+
+
+def test_nonces():
+    counts = iter([5, 9])
+    nonces = NonceManager(lambda: next(counts))
+    assert [nonces.take() for _ in range(3)] == [5, 6, 7]
+    nonces.release(7)
+    assert nonces.take() == 7
+    nonces.reset()
+    assert nonces.take() == 9
+
+
+def test_reserved_nonces():
+    counts = iter([5, 5, 9])
+    nonces = NonceManager(lambda: next(counts))
+    nonces.reserve(6)
+    nonces.reserve(7)
+    assert [nonces.take() for _ in range(3)] == [5, 8, 9]
+    nonces.reset()
+    # the node lost the reserved transactions
+    assert [nonces.take() for _ in range(2)] == [5, 8]
+    nonces.reset()
+    assert nonces.take() == 9
+    assert nonces.reserved == set()
+
+
+def test_reports_pipelined():
+    block_seconds = 0.2
+    chain = FakeChain(block_seconds)
+    submitter = ReportSubmitter('member', NonceManager(chain.pending_count), poll_seconds=0.01)
+
+    started = time.time()
+    results = asyncio.run(submitter.submit([chain.send] * 20))
+    elapsed = time.time() - started
+
+    assert [tx.nonce for tx in results] == list(range(20))
+    assert all(tx.status == CONFIRMED for tx in results)
+    # one after another 20 reports would wait for 20 blocks
+    assert elapsed < 3 * block_seconds
+
+
+def test_failed_reports():
+    chain = FakeChain(0.05)
+    nonces = NonceManager(chain.pending_count)
+    submitter = ReportSubmitter('member', nonces, poll_seconds=0.01)
+
+    results = asyncio.run(submitter.submit([
+        chain.send,
+        lambda tx_params: chain.send(tx_params, fail=True),
+        lambda tx_params: chain.send(tx_params, revert=True),
+        chain.send,
+    ]))
+
+    assert results[0].status == CONFIRMED and results[0].nonce == 0
+    assert isinstance(results[1], ValueError)
+    # no gap left by the report which was not sent
+    assert results[2].status == REVERTED and results[2].nonce == 1
+    assert results[3].status == CONFIRMED and results[3].nonce == 2
+    assert nonces.take() == 3
+
+
+def test_stuck_reports_replaced():
+    chain = FakeChain(0.05, min_gas_price=12)
+    submitter = ReportSubmitter('member', NonceManager(chain.pending_count), stuck_seconds=0.1, poll_seconds=0.01)
+
+    results = asyncio.run(submitter.submit([chain.send] * 3))
+
+    assert [tx.nonce for tx in results] == [0, 1, 2]
+    assert all(tx.status == CONFIRMED and tx.gas_price == 12 for tx in results)
+    assert [tx.status for tx in chain.sent if tx.gas_price == 10] == [DROPPED] * 3
+
+
+def test_original_mined_after_replacement():
+    # the replacement is sent before the original is mined
+    chain = FakeChain(0.15)
+    nonces = NonceManager(chain.pending_count)
+    submitter = ReportSubmitter('member', nonces, stuck_seconds=0.05, poll_seconds=0.01)
+
+    results = asyncio.run(submitter.submit([chain.send] * 2))
+
+    assert [(tx.nonce, tx.gas_price, tx.status) for tx in results] == [(0, 10, CONFIRMED), (1, 10, CONFIRMED)]
+    assert len(chain.sent) > 2
+    assert all(tx.status == DROPPED for tx in chain.sent if tx.gas_price > 10)
+    # confirmed reports keep the local nonces
+    assert nonces.next == 2
+
+
+def test_pending_reports_given_up():
+    chain = FakeChain(0.01, min_gas_price=100)
+    nonces = NonceManager(chain.pending_count)
+    submitter = ReportSubmitter('member', nonces, stuck_seconds=0.05, deadline_seconds=0.3, poll_seconds=0.01)
+
+    started = time.time()
+    results = asyncio.run(submitter.submit([chain.send] * 2))
+    elapsed = time.time() - started
+
+    assert [tx.status for tx in results] == [PENDING, PENDING]
+    assert [tx.gas_price for tx in results] == [13, 13]
+    assert 0.3 <= elapsed < 0.5
+    # the given up transactions can still be mined, their nonces are not sent again
+    assert nonces.next is None
+    assert nonces.reserved == {0, 1}
+    chain.sent.clear()
+    assert nonces.take() == 2
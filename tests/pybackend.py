@@ -0,0 +1,1713 @@
+import functools
+import io
+import pickle
+from collections import namedtuple
+
+from scripts.nimbus_model import NimbusModel, Revert, UINT256_MAX, _sub
+
+
+ZERO_ADDRESS = '0x' + '00' * 20
+UINT128_MAX = 2**128 - 1
+
+# Types.LedgerStatus
+IDLE = 0
+NOMINATOR = 1
+VALIDATOR = 2
+NONE = 3
+
+# Types.OracleData, stash and controller accounts are normalized to 32 bytes
+Report = namedtuple('Report', [
+    'stash_account', 'controller_account', 'stake_status', 'active_balance', 'total_balance',
+    'unlocking', 'claimed_rewards', 'stash_balance', 'slashing_spans',
+])
+
+
+def _address(value):
+    return getattr(value, 'address', value).lower()
+
+
+def _bytes32(value):
+    if isinstance(value, int):
+        return value.to_bytes(32, 'big')
+    if isinstance(value, str):
+        value = value[2:] if value.startswith('0x') else value
+        value = bytes.fromhex(value.rjust(len(value) + len(value) % 2, '0'))
+    return bytes(value).rjust(32, b'\x00')
+
+
+def _to_uint128(value):
+    if value > UINT128_MAX:
+        raise Revert("SafeCast: value doesn't fit in 128 bits")
+    return value
+
+
+def _report(data):
+    report = Report(*data)
+    return report._replace(
+        stash_account=_bytes32(report.stash_account),
+        controller_account=_bytes32(report.controller_account),
+        unlocking=tuple((balance, era) for balance, era in report.unlocking),
+        claimed_rewards=tuple(report.claimed_rewards),
+    )
+
+
+def _total_unlocking(report, era_id):
+    """
+    `LedgerUtils.getTotalUnlocking`
+    @return (unlocking balance, withdrawable balance)
+    """
+    total = 0
+    withdrawable = 0
+    for balance, era in report.unlocking:
+        total += balance
+        if era <= era_id:
+            withdrawable += balance
+    return total, withdrawable
+
+
+def _is_consistent(report):
+    total, _ = _total_unlocking(report, 0)
+    return (
+        len(report.unlocking) < 255
+        and report.total_balance == report.active_balance + total
+        and report.stash_balance >= report.total_balance
+    )
+
+
+class PyEvent(dict):
+    def __init__(self, name, address, fields):
+        super().__init__(fields)
+        self.name = name
+        self.address = address
+
+    def __repr__(self):
+        return f'{self.name}({dict.__repr__(self)})'
+
+
+class PyEventDict:
+    """
+    Events of one transaction in emission order, indexed by position or by name like brownie's `EventDict`
+    """
+
+    def __init__(self):
+        self._events = []
+
+    def append(self, event):
+        self._events.append(event)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            found = [event for event in self._events if event.name == key]
+            if not found:
+                raise KeyError(f"Event '{key}' did not fire")
+            return found
+        return self._events[key]
+
+    def __contains__(self, name):
+        return any(event.name == name for event in self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+    def count(self, name):
+        return sum(1 for event in self._events if event.name == name)
+
+
+class PyTransaction:
+    def __init__(self, sender, receiver, fn_name, timestamp):
+        self.sender = sender
+        self.receiver = receiver
+        self.fn_name = fn_name
+        self.timestamp = timestamp
+        self.events = PyEventDict()
+        self.return_value = None
+        self.status = 1
+
+    def info(self):
+        pass
+
+
+class PyWorld:
+    """
+    Contract registry, block time and the call stack of the in-memory backend.
+    A top level call is a transaction: on any exception every contract it entered is restored to the state
+    before it and contracts it created are removed. A contract changes only its own state, so contracts the
+    transaction did not enter need no copy.
+    """
+
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+        self.contracts = {}
+        self.default_sender = None
+        self.tx_count = 0
+        self._next_address = 0x1000
+        # (executing contract, msg.sender) of nested calls
+        self._frames = []
+        self._tx = None
+        # address -> state of a contract before the transaction entered it
+        self._saved = {}
+        self._created = []
+
+    def new_address(self):
+        self._next_address += 1
+        return '0x' + format(self._next_address, '040x')
+
+    def register(self, contract):
+        address = self.new_address()
+        self.contracts[address] = contract
+        if self._tx is not None:
+            self._created.append(address)
+        return address
+
+    def at(self, address):
+        return self.contracts[_address(address)]
+
+    @property
+    def msg_sender(self):
+        return self._frames[-1][1]
+
+    def _dump(self, states):
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+        # contracts referenced from the state of other contracts are kept by identity
+        pickler.persistent_id = self._persistent_id
+        pickler.dump(states)
+        return buffer.getvalue()
+
+    def _load(self, data, contracts):
+        unpickler = pickle.Unpickler(io.BytesIO(data))
+        unpickler.persistent_load = lambda pid: self if pid == 'world' else contracts[pid]
+        for address, state in unpickler.load().items():
+            contract = contracts[address]
+            contract.__dict__.clear()
+            contract.__dict__.update(state)
+
+    def snapshot(self):
+        states = self._dump({address: contract.__dict__ for address, contract in self.contracts.items()})
+        return self.timestamp, self._next_address, dict(self.contracts), states
+
+    def restore(self, snapshot):
+        timestamp, next_address, contracts, states = snapshot
+        self.timestamp = timestamp
+        self._next_address = next_address
+        self.contracts = dict(contracts)
+        self._load(states, contracts)
+
+    def _persistent_id(self, obj):
+        if obj is self:
+            return 'world'
+        if isinstance(obj, PyContract):
+            return obj.address
+        return None
+
+    def _rollback(self, next_address):
+        for address in self._created:
+            del self.contracts[address]
+        self._next_address = next_address
+        for address, data in self._saved.items():
+            if address in self.contracts:
+                self._load(data, self.contracts)
+
+    def call(self, contract, fn, args, sender):
+        if self._frames:
+            return self._run(contract, fn, args, self._frames[-1][0].address)
+
+        next_address = self._next_address
+        self._tx = PyTransaction(sender or self.default_sender, contract.address, fn.__name__, self.timestamp)
+        try:
+            self._tx.return_value = self._run(contract, fn, args, self._tx.sender)
+        except BaseException:
+            self._rollback(next_address)
+            raise
+        finally:
+            tx, self._tx = self._tx, None
+            self._saved = {}
+            self._created = []
+        self.tx_count += 1
+        return tx
+
+    def _run(self, contract, fn, args, sender):
+        if contract.address not in self._saved:
+            self._saved[contract.address] = self._dump({contract.address: contract.__dict__})
+        self._frames.append((contract, _address(sender)))
+        try:
+            return fn(contract, *args)
+        finally:
+            self._frames.pop()
+
+    def emit(self, contract, name, fields):
+        self._tx.events.append(PyEvent(name, contract.address, fields))
+
+
+def external(fn):
+    """
+    State changing contract function. A trailing `{'from': account}` dict makes it a transaction
+    like in brownie, calls from other contracts get the calling contract as `msg.sender`.
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args):
+        sender = None
+        if args and isinstance(args[-1], dict):
+            sender = args[-1].get('from')
+            args = args[:-1]
+        return self.world.call(self, fn, args, sender)
+    return wrapper
+
+
+class PyContract:
+    def __init__(self, world):
+        self.world = world
+        self.address = world.register(self)
+
+    def __str__(self):
+        return self.address
+
+    @property
+    def msg_sender(self):
+        return self.world.msg_sender
+
+    def _emit(self, name, **fields):
+        self.world.emit(self, name, fields)
+
+
+class PyChain:
+    """
+    The part of brownie's `chain` used by scenarios: block time and snapshots
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self._snapshot = None
+
+    def time(self):
+        return self.world.timestamp
+
+    def sleep(self, seconds):
+        self.world.timestamp += seconds
+
+    def mine(self, blocks=1, timestamp=None):
+        if timestamp is not None:
+            self.world.timestamp = timestamp
+
+    def snapshot(self):
+        self._snapshot = self.world.snapshot()
+
+    def revert(self):
+        assert self._snapshot is not None, "no snapshot"
+        self.world.restore(self._snapshot)
+
+
+class PyAuthManager(PyContract):
+    def __init__(self, world):
+        super().__init__(world)
+        self.members = {}
+
+    @external
+    def initialize(self, superior):
+        self.members.setdefault(_address(superior), set()).add('SUPER_ROLE')
+
+    def has(self, role, member):
+        return role in self.members.get(_address(member), ())
+
+    @external
+    def addByString(self, role, member):
+        if not self.has('SUPER_ROLE', self.msg_sender):
+            raise Revert("FORBIDDEN")
+        roles = self.members.setdefault(_address(member), set())
+        if role in roles:
+            raise Revert("ALREADY_MEMBER")
+        roles.add(role)
+
+    @external
+    def remove(self, role, member):
+        if not self.has('SUPER_ROLE', self.msg_sender):
+            raise Revert("FORBIDDEN")
+        if not self.has(role, member):
+            raise Revert("MEMBER_NOT_FOUND")
+        self.members[_address(member)].remove(role)
+
+
+class PyERC20(PyContract):
+    """
+    OpenZeppelin 4.1 ERC20
+    """
+
+    def __init__(self, world):
+        super().__init__(world)
+        self._balances = {}
+        self._allowances = {}
+        self._total_supply = 0
+
+    def totalSupply(self):
+        return self._total_supply
+
+    def balanceOf(self, account):
+        return self._balances.get(_address(account), 0)
+
+    def allowance(self, owner, spender):
+        return self._allowances.get((_address(owner), _address(spender)), 0)
+
+    @external
+    def transfer(self, recipient, amount):
+        self._transfer(self.msg_sender, _address(recipient), amount)
+        return True
+
+    @external
+    def approve(self, spender, amount):
+        self._approve(self.msg_sender, _address(spender), amount)
+        return True
+
+    @external
+    def transferFrom(self, sender, recipient, amount):
+        sender = _address(sender)
+        self._transfer(sender, _address(recipient), amount)
+        current_allowance = self.allowance(sender, self.msg_sender)
+        if current_allowance < amount:
+            raise Revert("ERC20: transfer amount exceeds allowance")
+        self._approve(sender, self.msg_sender, current_allowance - amount)
+        return True
+
+    def _transfer(self, sender, recipient, amount):
+        if sender == ZERO_ADDRESS:
+            raise Revert("ERC20: transfer from the zero address")
+        if recipient == ZERO_ADDRESS:
+            raise Revert("ERC20: transfer to the zero address")
+        sender_balance = self._balances.get(sender, 0)
+        if sender_balance < amount:
+            raise Revert("ERC20: transfer amount exceeds balance")
+        self._balances[sender] = sender_balance - amount
+        self._balances[recipient] = self._balances.get(recipient, 0) + amount
+        self._emit('Transfer', **{'from': sender, 'to': recipient, 'value': amount})
+
+    def _approve(self, owner, spender, amount):
+        self._allowances[(owner, spender)] = amount
+        self._emit('Approval', owner=owner, spender=spender, value=amount)
+
+    def _mint(self, account, amount):
+        if account == ZERO_ADDRESS:
+            raise Revert("ERC20: mint to the zero address")
+        self._total_supply += amount
+        self._balances[account] = self._balances.get(account, 0) + amount
+        self._emit('Transfer', **{'from': ZERO_ADDRESS, 'to': account, 'value': amount})
+
+    def _burn(self, account, amount):
+        account_balance = self._balances.get(account, 0)
+        if account_balance < amount:
+            raise Revert("ERC20: burn amount exceeds balance")
+        self._balances[account] = account_balance - amount
+        self._total_supply -= amount
+        self._emit('Transfer', **{'from': account, 'to': ZERO_ADDRESS, 'value': amount})
+
+
+class PyXcToken(PyERC20):
+    """
+    `xcTOKEN_mock`, anyone can mint and burn
+    """
+
+    @external
+    def initialize(self):
+        self._mint(self.msg_sender, 10**9 * 10**18)
+
+    @external
+    def mint(self, to, amount):
+        self._mint(_address(to), amount)
+
+    @external
+    def burn(self, account, amount):
+        self._burn(_address(account), amount)
+
+
+class PyController(PyContract):
+    """
+    `Controller_mock`: relay calls are only emitted as events, `RelayChain` executes them
+    """
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.sender_to_account = {}
+
+    def senderToAccount(self, address):
+        return self.sender_to_account.get(_address(address), bytes(32))
+
+    def _account(self):
+        return self.senderToAccount(self.msg_sender)
+
+    @external
+    def newSubAccount(self, index, account_id, para_address):
+        self.sender_to_account[_address(para_address)] = _bytes32(account_id)
+
+    @external
+    def deleteSubAccount(self, para_address):
+        # the mock has no such function, so `Nimbus.removeLedger` reverts against it
+        raise Revert("Controller_mock: deleteSubAccount is not implemented")
+
+    @external
+    def nominate(self, validators):
+        self._emit('Nominate', caller=self.msg_sender, stash=self._account(), validators=list(validators))
+
+    @external
+    def bond(self, controller, amount):
+        self._emit('Bond', caller=self.msg_sender, stash=self._account(), controller=_bytes32(controller), amount=amount)
+
+    @external
+    def bondExtra(self, amount):
+        self._emit('BondExtra', caller=self.msg_sender, stash=self._account(), amount=amount)
+
+    @external
+    def unbond(self, amount):
+        self._emit('Unbond', caller=self.msg_sender, stash=self._account(), amount=amount)
+
+    @external
+    def withdrawUnbonded(self, slashing_spans):
+        self._emit('Withdraw', caller=self.msg_sender, stash=self._account())
+
+    @external
+    def rebond(self, amount, unbonding_chunks):
+        self._emit('Rebond', caller=self.msg_sender, stash=self._account(), amount=amount)
+
+    @external
+    def chill(self):
+        self._emit('Chill', caller=self.msg_sender, stash=self._account())
+
+    @external
+    def transferToParachain(self, amount):
+        self._emit('TransferToParachain', **{'from': self._account(), 'to': self.msg_sender, 'amount': amount})
+
+    @external
+    def transferToRelaychain(self, amount):
+        self._emit('TransferToRelaychain', **{'from': self.msg_sender, 'to': self._account(), 'amount': amount})
+
+
+class _WithdrawalQueue:
+    """
+    `WithdrawalQueue` ring buffer of (batchTotalShares, batchXcTokenShares), ids start from 1
+    """
+
+    def __init__(self, cap):
+        self.items = [(0, 0)] * cap
+        self.ids = [0] * cap
+        self.first = 0
+        self.size = 0
+        self.cap = cap
+        self.id = 0
+
+    def push(self, batch):
+        if self.size >= self.cap:
+            raise Revert("WithdrawalQueue: capacity exceeded")
+        last_index = (self.first + self.size) % self.cap
+        self.items[last_index] = batch
+        self.id += 1
+        self.ids[last_index] = self.id
+        self.size += 1
+        return self.id
+
+    def pop(self):
+        item, item_id = self.top()
+        self.first = (self.first + 1) % self.cap
+        self.size -= 1
+        return item, item_id
+
+    def top(self):
+        if self.size == 0:
+            raise Revert("WithdrawalQueue: queue is empty")
+        return self.items[self.first], self.ids[self.first]
+
+    def element(self, shift):
+        if self.size == 0:
+            raise Revert("WithdrawalQueue: queue is empty")
+        if shift >= self.size:
+            raise Revert("WithdrawalQueue: index outside queue")
+        index = (self.first + shift) % self.cap
+        return self.items[index], self.ids[index]
+
+    def find_batch(self, batch_id):
+        start_id = self.ids[self.first]
+        if batch_id >= start_id and batch_id - start_id < self.size:
+            return self.items[(self.first + (batch_id - start_id)) % self.cap]
+        return (0, 0)
+
+    def next_id(self):
+        return self.id + 1
+
+
+class PyWithdrawal(PyContract):
+    MAX_REQUESTS = 20
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.ntoken = None
+        self.xc_token = None
+        self.queue = None
+        self.batch_share_price = {}
+        # holder -> list of [share, batch id]
+        self.user_requests = {}
+        self.total_virtual_xc_token_amount = 0
+        self.total_xc_token_pool_shares = 0
+        self.batch_virtual_xc_token_amount = 0
+        self.batch_shares = 0
+        self.claimable_id = 0
+        self.pending_for_claiming = 0
+
+    @external
+    def initialize(self, cap, xc_token):
+        if cap == 0:
+            raise Revert("WITHDRAWAL: INCORRECT_CAP")
+        if self.queue is not None:
+            raise Revert("Initializable: contract is already initialized")
+        self.queue = _WithdrawalQueue(cap)
+        self.xc_token = self.world.at(xc_token)
+
+    @external
+    def setNTOKEN(self, ntoken):
+        if self.ntoken is not None:
+            raise Revert("WITHDRAWAL: NTOKEN_ALREADY_DEFINED")
+        self.ntoken = self.world.at(ntoken)
+
+    def totalVirtualXcTokenAmount(self):
+        return self.total_virtual_xc_token_amount
+
+    def totalXcTokenPoolShares(self):
+        return self.total_xc_token_pool_shares
+
+    def batchVirtualXcTokenAmount(self):
+        return self.batch_virtual_xc_token_amount
+
+    def batchShares(self):
+        return self.batch_shares
+
+    def claimableId(self):
+        return self.claimable_id
+
+    def pendingForClaiming(self):
+        return self.pending_for_claiming
+
+    def batchSharePrice(self, batch_id):
+        return self.batch_share_price.get(batch_id, 0)
+
+    def userRequests(self, holder, index):
+        return tuple(self.user_requests[_address(holder)][index])
+
+    def totalBalanceForLosses(self):
+        return self.total_virtual_xc_token_amount + self.batch_virtual_xc_token_amount
+
+    def getXcTokenBalanceForBatch(self, batch_shift):
+        batch, _ = self.queue.element(batch_shift)
+        return batch[0] * self._batch_share_price(batch) // 10**self.ntoken.decimals()
+
+    def getQueueBatch(self, batch_shift):
+        batch, _ = self.queue.element(batch_shift)
+        return batch
+
+    def _only_nimbus(self):
+        if self.msg_sender != self.ntoken.address:
+            raise Revert("WITHDRAWAL: CALLER_NOT_NIMBUS")
+
+    @external
+    def newEra(self):
+        self._only_nimbus()
+        new_xc_token_amount = _sub(self.xc_token.balanceOf(self), self.pending_for_claiming)
+        if new_xc_token_amount > 0 and self.queue.size > 0:
+            top_batch, top_id = self.queue.top()
+            share_price = self._batch_share_price(top_batch)
+            xc_token_for_batch = top_batch[0] * share_price // 10**self.ntoken.decimals()
+            if new_xc_token_amount >= xc_token_for_batch:
+                self.batch_share_price[top_id] = share_price
+                self.total_xc_token_pool_shares = _sub(self.total_xc_token_pool_shares, top_batch[1])
+                self.total_virtual_xc_token_amount = _sub(self.total_virtual_xc_token_amount, xc_token_for_batch)
+                if self.total_xc_token_pool_shares == 0:
+                    self.total_virtual_xc_token_amount = 0
+                self.claimable_id = top_id
+                self.pending_for_claiming += xc_token_for_batch
+                self.queue.pop()
+                self._emit('ElementRemoved', elementId=top_id)
+
+        if self.batch_virtual_xc_token_amount > 0 and self.queue.size < self.queue.cap:
+            batch_pool_shares = self._token_pool_shares(self.batch_virtual_xc_token_amount)
+            new_id = self.queue.push((self.batch_shares, batch_pool_shares))
+            self.total_virtual_xc_token_amount += self.batch_virtual_xc_token_amount
+            self.total_xc_token_pool_shares += batch_pool_shares
+            self.batch_virtual_xc_token_amount = 0
+            self.batch_shares = 0
+            self._emit('ElementAdded', elementId=new_id)
+
+    @external
+    def redeem(self, holder, amount):
+        self._only_nimbus()
+        holder = _address(holder)
+        requests = self.user_requests.setdefault(holder, [])
+        if len(requests) >= self.MAX_REQUESTS:
+            raise Revert("WITHDRAWAL: REQUEST_CAP_EXCEEDED")
+        user_shares = self._batch_shares(amount)
+        self.batch_shares += user_shares
+        self.batch_virtual_xc_token_amount += amount
+        requests.append([user_shares, self.queue.next_id()])
+        self._emit('RedeemRequestAdded', user=holder, shares=user_shares, batchId=self.queue.next_id())
+
+    @external
+    def claim(self, holder):
+        self._only_nimbus()
+        holder = _address(holder)
+        decimals = 10**self.ntoken.decimals()
+        ready_to_claim = 0
+        remaining = []
+        for share, batch_id in self.user_requests.get(holder, []):
+            if batch_id <= self.claimable_id:
+                ready_to_claim += share * self.batch_share_price.get(batch_id, 0) // decimals
+            else:
+                remaining.append([share, batch_id])
+        self.user_requests[holder] = remaining
+
+        if ready_to_claim > self.xc_token.balanceOf(self):
+            raise Revert("WITHDRAWAL: CLAIM_EXCEEDS_BALANCE")
+        self.xc_token.transfer(holder, ready_to_claim)
+        self.pending_for_claiming = _sub(self.pending_for_claiming, ready_to_claim)
+        self._emit('Claimed', user=holder, claimedAmount=ready_to_claim)
+        return ready_to_claim
+
+    @external
+    def ditributeLosses(self, losses):
+        self._only_nimbus()
+        if self.batch_virtual_xc_token_amount > 0:
+            xc_token_balance = self.xc_token.balanceOf(self)
+            virtual_balance = _sub(
+                self.total_virtual_xc_token_amount + self.batch_virtual_xc_token_amount,
+                _sub(xc_token_balance, self.pending_for_claiming)
+            )
+            if virtual_balance == 0:
+                raise Revert("division by zero")
+            losses_for_current_batch = losses * self.batch_virtual_xc_token_amount // virtual_balance
+            self.batch_virtual_xc_token_amount = _sub(self.batch_virtual_xc_token_amount, losses_for_current_batch)
+            losses = _sub(losses, losses_for_current_batch)
+        self.total_virtual_xc_token_amount = _sub(self.total_virtual_xc_token_amount, losses)
+        self._emit('LossesDistributed', losses=losses)
+
+    def getRedeemStatus(self, holder):
+        decimals = 10**self.ntoken.decimals()
+        waiting = 0
+        available = 0
+        for share, batch_id in self.user_requests.get(_address(holder), []):
+            if batch_id <= self.claimable_id:
+                available += share * self.batch_share_price.get(batch_id, 0) // decimals
+            else:
+                waiting += share * self._batch_share_price(self.queue.find_batch(batch_id)) // decimals
+        return waiting, available
+
+    def _batch_share_price(self, batch):
+        batch_total_shares, batch_xc_token_shares = batch
+        decimals = 10**self.ntoken.decimals()
+        if self.total_xc_token_pool_shares > 0 and batch_total_shares > 0:
+            return (decimals * batch_xc_token_shares * self.total_virtual_xc_token_amount) // \
+                (batch_total_shares * self.total_xc_token_pool_shares)
+        # the batch is not in the queue yet
+        if self.batch_virtual_xc_token_amount > 0:
+            return self.batch_virtual_xc_token_amount * decimals // self.batch_shares
+        return 0
+
+    def _token_pool_shares(self, amount):
+        if self.total_virtual_xc_token_amount > 0:
+            return amount * self.total_xc_token_pool_shares // self.total_virtual_xc_token_amount
+        return amount
+
+    def _batch_shares(self, amount):
+        if self.batch_virtual_xc_token_amount > 0:
+            return amount * self.batch_shares // self.batch_virtual_xc_token_amount
+        return amount
+
+
+class PyOracle(PyContract):
+    def __init__(self, world):
+        super().__init__(world)
+        self.is_pushed = False
+        # [report, votes], the report tuple itself stands for its keccak variant
+        self.report_variants = []
+        self.report_bitmask = 0
+        self.oracle_master = None
+        self.ledger = None
+
+    @external
+    def initialize(self, oracle_master, ledger):
+        if self.oracle_master is not None:
+            raise Revert("ORACLE: ALREADY_INITIALIZED")
+        self.oracle_master = _address(oracle_master)
+        self.ledger = _address(ledger)
+
+    def isPushed(self):
+        return self.is_pushed
+
+    def isReported(self, index):
+        return self.report_bitmask & (1 << index) != 0
+
+    def _only_oracle_master(self):
+        if self.msg_sender != self.oracle_master:
+            raise Revert("ORACLE: UNAUTHORIZED")
+
+    @external
+    def reportRelay(self, index, quorum, era_id, report):
+        self._only_oracle_master()
+        mask = 1 << index
+        if self.report_bitmask & mask != 0:
+            raise Revert("ORACLE: ALREADY_SUBMITTED")
+        self.report_bitmask |= mask
+
+        if self.is_pushed:
+            return
+
+        for variant in self.report_variants:
+            if variant[0] == report:
+                if variant[1] + 1 >= quorum:
+                    self._push(era_id, report)
+                else:
+                    variant[1] += 1
+                return
+        if quorum == 1:
+            self._push(era_id, report)
+        else:
+            self.report_variants.append([report, 1])
+
+    @external
+    def softenQuorum(self, quorum, era_id):
+        self._only_oracle_master()
+        is_quorum, report = self._quorum_report(quorum)
+        if is_quorum:
+            self._push(era_id, report)
+
+    @external
+    def clearReporting(self):
+        self._only_oracle_master()
+        self.report_bitmask = 0
+        self.is_pushed = False
+        self.report_variants = []
+
+    def _push(self, era_id, report):
+        self.world.at(self.ledger).pushData(era_id, report)
+        self.is_pushed = True
+
+    def _quorum_report(self, quorum):
+        if len(self.report_variants) == 0:
+            return False, None
+        if len(self.report_variants) == 1:
+            report, votes = self.report_variants[0]
+            return votes >= quorum, report
+
+        # the most frequent variant, ties are not a quorum
+        best = 0
+        repeat = 0
+        max_votes = 0
+        for i, (_, votes) in enumerate(self.report_variants):
+            if votes >= max_votes:
+                if votes == max_votes:
+                    repeat += 1
+                else:
+                    best = i
+                    max_votes = votes
+                    repeat = 0
+        return max_votes >= quorum and repeat == 0, self.report_variants[best][0]
+
+
+class PyOracleMaster(PyContract):
+    MAX_MEMBERS = 255
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.era_id = 0
+        self.members = []
+        self.oracle_for_ledger = {}
+        self.nimbus = None
+        self.quorum = 0
+        self.anchor_era_id = 0
+        self.anchor_timestamp = 0
+        self.seconds_per_era = 0
+        self.paused = False
+        self.initialized = False
+
+    @external
+    def initialize(self, quorum):
+        if self.initialized:
+            raise Revert("OM: ALREADY_INITIALIZED")
+        if not 0 < quorum < self.MAX_MEMBERS:
+            raise Revert("OM: INCORRECT_QUORUM")
+        self.initialized = True
+        self.quorum = quorum
+
+    @external
+    def setNimbus(self, nimbus):
+        if self.nimbus is not None:
+            raise Revert("OM: NIMBUS_ALREADY_DEFINED")
+        self.nimbus = self.world.at(nimbus)
+
+    def eraId(self):
+        return self.era_id
+
+    def QUORUM(self):
+        return self.quorum
+
+    def ANCHOR_ERA_ID(self):
+        return self.anchor_era_id
+
+    def ANCHOR_TIMESTAMP(self):
+        return self.anchor_timestamp
+
+    def SECONDS_PER_ERA(self):
+        return self.seconds_per_era
+
+    def getOracle(self, ledger):
+        return self.oracle_for_ledger.get(_address(ledger), ZERO_ADDRESS)
+
+    def getCurrentEraId(self):
+        return self.anchor_era_id + (self.world.timestamp - self.anchor_timestamp) // self.seconds_per_era
+
+    def getStashAccounts(self):
+        return self.nimbus.getStashAccounts()
+
+    def isReportedLastEra(self, member, stash):
+        member_index = self._member_id(member)
+        if member_index is None:
+            return self.era_id, False
+        ledger = self.nimbus.findLedger(stash)
+        if ledger == ZERO_ADDRESS:
+            return self.era_id, False
+        return self.era_id, self.world.at(self.oracle_for_ledger[ledger]).isReported(member_index)
+
+    def _auth(self, role):
+        if not self.world.at(self.nimbus.AUTH_MANAGER()).has(role, self.msg_sender):
+            raise Revert("OM: UNAUTHOROZED")
+
+    def _only_nimbus(self):
+        if self.msg_sender != self.nimbus.address:
+            raise Revert("OM: CALLER_NOT_NIMBUS")
+
+    def _member_id(self, member):
+        member = _address(member)
+        return self.members.index(member) if member in self.members else None
+
+    @external
+    def pause(self):
+        self._auth('ROLE_PAUSE_MANAGER')
+        self.paused = True
+
+    @external
+    def resume(self):
+        self._auth('ROLE_PAUSE_MANAGER')
+        self.paused = False
+
+    @external
+    def setQuorum(self, quorum):
+        self._auth('ROLE_ORACLE_QUORUM_MANAGER')
+        if not 0 < quorum < self.MAX_MEMBERS:
+            raise Revert("OM: QUORUM_WONT_BE_MADE")
+        old_quorum = self.quorum
+        self.quorum = quorum
+        if old_quorum > quorum:
+            for ledger in self.nimbus.getLedgerAddresses():
+                oracle = self.oracle_for_ledger.get(ledger)
+                if oracle is not None:
+                    self.world.at(oracle).softenQuorum(quorum, self.era_id)
+        self._emit('QuorumChanged', quorum=quorum)
+
+    @external
+    def addOracleMember(self, member):
+        self._auth('ROLE_ORACLE_MEMBERS_MANAGER')
+        member = _address(member)
+        if member == ZERO_ADDRESS:
+            raise Revert("OM: BAD_ARGUMENT")
+        if member in self.members:
+            raise Revert("OM: MEMBER_EXISTS")
+        if len(self.members) >= self.MAX_MEMBERS:
+            raise Revert("OM: MEMBERS_TOO_MANY")
+        self.members.append(member)
+        self._emit('MemberAdded', member=member)
+
+    @external
+    def removeOracleMember(self, member):
+        self._auth('ROLE_ORACLE_MEMBERS_MANAGER')
+        index = self._member_id(member)
+        if index is None:
+            raise Revert("OM: MEMBER_NOT_FOUND")
+        self.members[index] = self.members[-1]
+        self.members.pop()
+        self._emit('MemberRemoved', member=_address(member))
+        self._clear_reporting()
+
+    @external
+    def addLedger(self, ledger):
+        self._only_nimbus()
+        oracle = PyOracle(self.world)
+        oracle.initialize(self, ledger)
+        self.oracle_for_ledger[_address(ledger)] = oracle.address
+
+    @external
+    def removeLedger(self, ledger):
+        self._only_nimbus()
+        self.oracle_for_ledger.pop(_address(ledger), None)
+
+    @external
+    def reportRelay(self, era_id, report):
+        if self.paused:
+            raise Revert("Pausable: paused")
+        report = _report(report)
+        if not _is_consistent(report):
+            raise Revert("OM: INCORRECT_REPORT")
+        member_index = self._member_id(self.msg_sender)
+        if member_index is None:
+            raise Revert("OM: MEMBER_NOT_FOUND")
+        oracle = self.oracle_for_ledger.get(self.nimbus.findLedger(report.stash_account))
+        if oracle is None:
+            raise Revert("OM: ORACLE_FOR_LEDGER_NOT_FOUND")
+        if era_id < self.era_id:
+            raise Revert("OM: ERA_TOO_OLD")
+
+        if era_id > self.era_id:
+            if era_id > self.getCurrentEraId():
+                raise Revert("OM: UNEXPECTED_NEW_ERA")
+            self.era_id = era_id
+            self._clear_reporting()
+            self.nimbus.flushStakes()
+
+        self.world.at(oracle).reportRelay(member_index, self.quorum, era_id, report)
+
+    @external
+    def setAnchorEra(self, anchor_era_id, anchor_timestamp, seconds_per_era):
+        self._auth('ROLE_SPEC_MANAGER')
+        if seconds_per_era == 0:
+            raise Revert("OM: BAD_SECONDS_PER_ERA")
+        if self.world.timestamp < anchor_timestamp:
+            raise Revert("OM: BAD_TIMESTAMP")
+        if anchor_era_id + (self.world.timestamp - anchor_timestamp) // seconds_per_era < self.era_id:
+            raise Revert("OM: ERA_COLLISION")
+        self.anchor_era_id = anchor_era_id
+        self.anchor_timestamp = anchor_timestamp
+        self.seconds_per_era = seconds_per_era
+
+    def _clear_reporting(self):
+        for ledger in self.nimbus.getLedgerAddresses():
+            oracle = self.oracle_for_ledger.get(ledger)
+            if oracle is not None:
+                self.world.at(oracle).clearReporting()
+
+
+class PyLedger(PyContract):
+    def __init__(self, world):
+        super().__init__(world)
+        self.nimbus = None
+        self.xc_token = None
+        self.controller = None
+        self.stash_account = None
+        self.controller_account = None
+        self.total_balance = 0
+        self.locked_balance = 0
+        self.active_balance = 0
+        self.stake_status = NONE
+        self.cached_total_balance = 0
+        self.transfer_upward_balance = 0
+        self.transfer_downward_balance = 0
+        self.pending_bonds = 0
+        self.min_nominator_balance = 0
+        self.minimum_balance = 0
+        self.max_unlocking_chunks = 0
+
+    @external
+    def initialize(self, stash_account, controller_account, xc_token, controller, min_nominator_balance, nimbus,
+                   minimum_balance, max_unlocking_chunks):
+        if self.xc_token is not None:
+            raise Revert("LEDGER: ALREADY_INITIALIZED")
+        self.stash_account = _bytes32(stash_account)
+        self.controller_account = _bytes32(controller_account)
+        self.stake_status = NONE
+        self.nimbus = self.world.at(nimbus)
+        self.xc_token = self.world.at(xc_token)
+        self.controller = self.world.at(controller)
+        self.min_nominator_balance = min_nominator_balance
+        self.minimum_balance = minimum_balance
+        self.max_unlocking_chunks = max_unlocking_chunks
+        self._refresh_allowances()
+
+    def stashAccount(self):
+        return self.stash_account
+
+    def controllerAccount(self):
+        return self.controller_account
+
+    def totalBalance(self):
+        return self.total_balance
+
+    def lockedBalance(self):
+        return self.locked_balance
+
+    def activeBalance(self):
+        return self.active_balance
+
+    def status(self):
+        return self.stake_status
+
+    def cachedTotalBalance(self):
+        return self.cached_total_balance
+
+    def transferUpwardBalance(self):
+        return self.transfer_upward_balance
+
+    def transferDownwardBalance(self):
+        return self.transfer_downward_balance
+
+    def pendingBonds(self):
+        return self.pending_bonds
+
+    def MIN_NOMINATOR_BALANCE(self):
+        return self.min_nominator_balance
+
+    def MINIMUM_BALANCE(self):
+        return self.minimum_balance
+
+    def MAX_UNLOCKING_CHUNKS(self):
+        return self.max_unlocking_chunks
+
+    def ledgerStake(self):
+        return self.nimbus.ledgerStake(self)
+
+    def isEmpty(self):
+        return self.total_balance == 0 and self.transfer_upward_balance == 0 and self.transfer_downward_balance == 0
+
+    def _only_nimbus(self):
+        if self.msg_sender != self.nimbus.address:
+            raise Revert("LEDGER: NOT_NIMBUS")
+
+    @external
+    def setRelaySpecs(self, min_nominator_balance, minimum_balance, max_unlocking_chunks):
+        self._only_nimbus()
+        self.min_nominator_balance = min_nominator_balance
+        self.minimum_balance = minimum_balance
+        self.max_unlocking_chunks = max_unlocking_chunks
+
+    @external
+    def refreshAllowances(self):
+        if not self.world.at(self.nimbus.AUTH_MANAGER()).has('ROLE_LEDGER_MANAGER', self.msg_sender):
+            raise Revert("LEDGER: UNAUTHOROZED")
+        self._refresh_allowances()
+
+    @external
+    def nominate(self, validators):
+        self._only_nimbus()
+        if self.active_balance < self.min_nominator_balance:
+            raise Revert("LEDGER: NOT_ENOUGH_STAKE")
+        self.controller.nominate(validators)
+
+    @external
+    def pushData(self, era_id, report):
+        if self.msg_sender != self.world.at(self.nimbus.ORACLE_MASTER()).getOracle(self):
+            raise Revert("LEDGER: NOT_ORACLE")
+        if self.stash_account != report.stash_account:
+            raise Revert("LEDGER: STASH_ACCOUNT_MISMATCH")
+        self.stake_status = report.stake_status
+        self.active_balance = report.active_balance
+
+        unlocking_balance, withdrawable_balance = _total_unlocking(report, era_id)
+
+        if not self._process_relay_transfers(report):
+            return
+
+        cached_total_balance = self.cached_total_balance
+        total_supply = self.nimbus.totalSupply()
+        if total_supply > 0:
+            relative_difference = abs(report.stash_balance - cached_total_balance) * 10000 // total_supply
+            if relative_difference >= self.nimbus.MAX_ALLOWABLE_DIFFERENCE():
+                raise Revert("LEDGER: DIFFERENCE_EXCEEDS_BALANCE")
+
+        if cached_total_balance < report.stash_balance:
+            reward = report.stash_balance - cached_total_balance
+            self.nimbus.distributeRewards(reward, report.stash_balance)
+            self._emit('Rewards', amount=reward, balance=report.stash_balance)
+        elif cached_total_balance > report.stash_balance:
+            slash = cached_total_balance - report.stash_balance
+            self.nimbus.distributeLosses(slash, report.stash_balance)
+            self._emit('Slash', amount=slash, balance=report.stash_balance)
+
+        ledger_stake = _to_uint128(self.ledgerStake())
+
+        # always transfer deficit to relay chain
+        if report.stash_balance < ledger_stake:
+            deficit = ledger_stake - report.stash_balance
+            if self.xc_token.balanceOf(self.nimbus) < deficit:
+                raise Revert("LEDGER: TRANSFER_EXCEEDS_BALANCE")
+            self.nimbus.transferToLedger(deficit)
+            self.controller.transferToRelaychain(deficit)
+            self.transfer_upward_balance += deficit
+
+        relay_free_balance = _sub(report.stash_balance, report.total_balance)
+        self.pending_bonds = 0
+
+        if self.active_balance < ledger_stake:
+            diff = ledger_stake - self.active_balance
+            diff_to_rebond = min(diff, unlocking_balance)
+            if diff_to_rebond > 0:
+                self.controller.rebond(diff_to_rebond, self.max_unlocking_chunks)
+                diff -= diff_to_rebond
+
+            if self.transfer_upward_balance > 0 and relay_free_balance == self.transfer_upward_balance:
+                # bond of the whole upward transfer is indistinguishable from two failed messages
+                relay_free_balance -= 1
+
+            if diff > 0 and relay_free_balance > 0:
+                diff_to_bond = min(diff, relay_free_balance)
+                if report.stake_status in (NOMINATOR, IDLE):
+                    self.controller.bondExtra(diff_to_bond)
+                    self.pending_bonds = diff_to_bond
+                elif report.stake_status == NONE and diff_to_bond >= self.min_nominator_balance:
+                    self.controller.bond(self.controller_account, diff_to_bond)
+                    self.pending_bonds = diff_to_bond
+                relay_free_balance -= diff_to_bond
+        else:
+            if ledger_stake < self.min_nominator_balance and self.stake_status != IDLE and self.active_balance > 0:
+                self.controller.chill()
+
+            diff = self.active_balance - ledger_stake
+            if diff > 0:
+                self.controller.unbond(diff)
+
+            if withdrawable_balance > 0:
+                slashing_spans = 0
+                if len(report.unlocking) == 0 and report.active_balance <= self.minimum_balance:
+                    slashing_spans = report.slashing_spans
+                self.controller.withdrawUnbonded(slashing_spans)
+
+        # always transfer all free balance to parachain
+        if relay_free_balance > 0:
+            self.controller.transferToParachain(relay_free_balance)
+            self.transfer_downward_balance += relay_free_balance
+
+        self.cached_total_balance = report.stash_balance
+
+    def _process_relay_transfers(self, report):
+        transfer_downward_balance = self.transfer_downward_balance
+        if transfer_downward_balance > 0:
+            total_downward_transferred = self.xc_token.balanceOf(self)
+            if total_downward_transferred >= transfer_downward_balance:
+                self.nimbus.transferFromLedger(
+                    transfer_downward_balance, total_downward_transferred - transfer_downward_balance
+                )
+                self.cached_total_balance = _sub(self.cached_total_balance, transfer_downward_balance)
+                self.transfer_downward_balance = 0
+                self._emit('DownwardComplete', amount=transfer_downward_balance)
+                transfer_downward_balance = 0
+
+        transfer_upward_balance = self.transfer_upward_balance
+        if transfer_upward_balance > 0:
+            ledger_free_balance = _sub(self.total_balance, self.locked_balance)
+            free_balance_diff = _sub(report.stash_balance, report.total_balance) - ledger_free_balance
+            if free_balance_diff >= transfer_upward_balance - self.pending_bonds:
+                self.cached_total_balance += transfer_upward_balance
+                self.transfer_upward_balance = 0
+                self._emit('UpwardComplete', amount=transfer_upward_balance)
+                transfer_upward_balance = 0
+
+        if transfer_downward_balance == 0 and transfer_upward_balance == 0:
+            self.total_balance = report.stash_balance
+            self.locked_balance = report.total_balance
+            return True
+        return False
+
+    def _refresh_allowances(self):
+        self.xc_token.approve(self.nimbus, UINT256_MAX)
+        self.xc_token.approve(self.controller, UINT256_MAX)
+
+
+class _Accounting(NimbusModel):
+    """
+    Stake accounting of `PyNimbus`. xcTOKEN balances are read from the token before every flush
+    and transfers to Withdrawal are executed on it.
+    """
+
+    def __init__(self, nimbus):
+        super().__init__()
+        self.nimbus = nimbus
+
+    def _transfer_to_withdrawal(self, amount):
+        super()._transfer_to_withdrawal(amount)
+        self.nimbus.xc_token.transfer(self.nimbus.withdrawal, amount)
+
+
+class PyNimbus(PyContract):
+    DEFAULT_DEVELOPERS_FEE = 200
+    DEFAULT_TREASURY_FEE = 800
+    MAX_LEDGERS_AMOUNT = 200
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.accounting = _Accounting(self)
+        self._shares = {}
+        self._allowances = {}
+        self._total_supply = 0
+        self.paused = False
+        self.initialized = False
+
+        self.xc_token = None
+        self.controller = None
+        self.auth_manager = None
+        self.oracle_master = None
+        self.withdrawal = None
+        self.developers = None
+        self.treasury = None
+        self.fee_developers = 0
+        self.fee_treasury = 0
+        self.relay_spec = (0, 0, 0, 0)
+        self.max_allowable_difference = 0
+        self._name = None
+        self._symbol = None
+        self._decimals = 0
+        self.ledger_by_stash = {}
+
+    @external
+    def initialize(self, auth_manager, xc_token, controller, developers, treasury, oracle_master, withdrawal,
+                   deposit_cap, max_allowable_difference, name, symbol, decimals):
+        if self.initialized:
+            raise Revert("Initializable: contract is already initialized")
+        if not name:
+            raise Revert("NIMBUS: EMPTY_NAME")
+        if not symbol:
+            raise Revert("NIMBUS: EMPTY_SYMBOL")
+        if decimals == 0:
+            raise Revert("NIMBUS: ZERO_DECIMALS")
+        if deposit_cap == 0:
+            raise Revert("NIMBUS: ZERO_CAP")
+        self.initialized = True
+        self.xc_token = self.world.at(xc_token)
+        self.controller = self.world.at(controller)
+        self.auth_manager = self.world.at(auth_manager)
+        self.accounting.deposit_cap = deposit_cap
+        self.fee_developers = self.DEFAULT_DEVELOPERS_FEE
+        self.fee_treasury = self.DEFAULT_TREASURY_FEE
+        self.treasury = _address(treasury)
+        self.developers = _address(developers)
+        self._name = name
+        self._symbol = symbol
+        self._decimals = decimals
+        self.oracle_master = self.world.at(oracle_master)
+        self.oracle_master.setNimbus(self)
+        self.withdrawal = self.world.at(withdrawal)
+        self.withdrawal.setNTOKEN(self)
+        self.max_allowable_difference = max_allowable_difference
+
+    # nTOKEN
+
+    def name(self):
+        return self._name
+
+    def symbol(self):
+        return self._symbol
+
+    def decimals(self):
+        return self._decimals
+
+    def totalSupply(self):
+        return self._total_supply
+
+    def getTotalPooledToken(self):
+        return self.accounting.fund_raised_balance
+
+    def balanceOf(self, account):
+        return self._shares.get(_address(account), 0)
+
+    def allowance(self, owner, spender):
+        return self._allowances.get((_address(owner), _address(spender)), 0)
+
+    def getSharesByPooledToken(self, amount):
+        total_pooled_token = self.getTotalPooledToken()
+        if total_pooled_token == 0:
+            return 0
+        return amount * self._total_supply // total_pooled_token
+
+    def getPooledTokenByShares(self, shares_amount):
+        if self._total_supply == 0:
+            return 0
+        return shares_amount * self.getTotalPooledToken() // self._total_supply
+
+    @external
+    def transfer(self, recipient, amount):
+        self._transfer(self.msg_sender, _address(recipient), amount)
+        return True
+
+    @external
+    def approve(self, spender, amount):
+        self._approve(self.msg_sender, _address(spender), amount)
+        return True
+
+    @external
+    def transferFrom(self, sender, recipient, amount):
+        sender = _address(sender)
+        current_allowance = self.allowance(sender, self.msg_sender)
+        if current_allowance < amount:
+            raise Revert("TRANSFER_AMOUNT_EXCEEDS_ALLOWANCE")
+        self._transfer(sender, _address(recipient), amount)
+        self._approve(sender, self.msg_sender, current_allowance - amount)
+        return True
+
+    def _when_not_paused(self):
+        if self.paused:
+            raise Revert("Pausable: paused")
+
+    def _transfer(self, sender, recipient, amount):
+        self._when_not_paused()
+        sender_balance = self._shares.get(sender, 0)
+        if amount > sender_balance:
+            raise Revert("TRANSFER_AMOUNT_EXCEEDS_BALANCE")
+        self._shares[sender] = sender_balance - amount
+        self._shares[recipient] = self._shares.get(recipient, 0) + amount
+        self._emit('Transfer', **{'from': sender, 'to': recipient, 'value': amount})
+
+    def _approve(self, owner, spender, amount):
+        self._when_not_paused()
+        self._allowances[(owner, spender)] = amount
+        self._emit('Approval', owner=owner, spender=spender, value=amount)
+
+    def _mint_shares(self, recipient, amount):
+        self._when_not_paused()
+        self._total_supply += amount
+        self._shares[recipient] = self._shares.get(recipient, 0) + amount
+        self._emit('Transfer', **{'from': ZERO_ADDRESS, 'to': recipient, 'value': amount})
+
+    def _burn_shares(self, account, amount):
+        self._when_not_paused()
+        account_balance = self._shares.get(account, 0)
+        if amount > account_balance:
+            raise Revert("BURN_AMOUNT_EXCEEDS_BALANCE")
+        self._total_supply -= amount
+        self._shares[account] = account_balance - amount
+        self._emit('Transfer', **{'from': account, 'to': ZERO_ADDRESS, 'value': amount})
+
+    # Nimbus views
+
+    def fundRaisedBalance(self):
+        return self.accounting.fund_raised_balance
+
+    def bufferedDeposits(self):
+        return self.accounting.buffered_deposits
+
+    def bufferedRedeems(self):
+        return self.accounting.buffered_redeems
+
+    def ledgerStake(self, ledger):
+        return self.accounting.ledger_stake.get(_address(ledger), 0)
+
+    def ledgerBorrow(self, ledger):
+        return self.accounting.ledger_borrow.get(_address(ledger), 0)
+
+    def depositCap(self):
+        return self.accounting.deposit_cap
+
+    def MAX_ALLOWABLE_DIFFERENCE(self):
+        return self.max_allowable_difference
+
+    def AUTH_MANAGER(self):
+        return self.auth_manager.address
+
+    def ORACLE_MASTER(self):
+        return self.oracle_master.address
+
+    def getUnbonded(self, holder):
+        return self.withdrawal.getRedeemStatus(holder)
+
+    def getLedgerAddresses(self):
+        return self.accounting.enabled_ledgers + self.accounting.disabled_ledgers
+
+    def getStashAccounts(self):
+        return [self.world.at(ledger).stashAccount() for ledger in self.getLedgerAddresses()]
+
+    def findLedger(self, stash_account):
+        return self.ledger_by_stash.get(_bytes32(stash_account), ZERO_ADDRESS)
+
+    # Nimbus management
+
+    def _auth(self, role):
+        if not self.auth_manager.has(role, self.msg_sender):
+            raise Revert("NIMBUS: UNAUTHORIZED")
+
+    def _only_ledger(self):
+        if self.msg_sender not in self.accounting.ledger_stake:
+            raise Revert("NIMBUS: NOT_FROM_LEDGER")
+
+    @external
+    def pause(self):
+        self._auth('ROLE_PAUSE_MANAGER')
+        self.paused = True
+
+    @external
+    def resume(self):
+        self._auth('ROLE_PAUSE_MANAGER')
+        self.paused = False
+
+    @external
+    def setDevelopersTreasury(self, treasury, developers):
+        self._auth('ROLE_SET_TREASURY')
+        self.treasury = _address(treasury)
+        self.developers = _address(developers)
+
+    @external
+    def setDepositCap(self, deposit_cap):
+        self._auth('ROLE_PAUSE_MANAGER')
+        if deposit_cap == 0:
+            raise Revert("NIMBUS: INCORRECT_NEW_CAP")
+        self.accounting.deposit_cap = deposit_cap
+
+    @external
+    def setMaxAllowableDifference(self, max_allowable_difference):
+        self._auth('ROLE_BEACON_MANAGER')
+        if max_allowable_difference == 0:
+            raise Revert("NIMBUS: INCORRECT_MAX_ALLOWABLE_DIFFERENCE")
+        self.max_allowable_difference = max_allowable_difference
+
+    @external
+    def setRelaySpec(self, relay_spec):
+        self._auth('ROLE_SPEC_MANAGER')
+        max_validators, min_nominator_balance, minimum_balance, max_unlocking_chunks = relay_spec
+        if max_validators == 0:
+            raise Revert("NIMBUS: BAD_MAX_VALIDATORS_PER_LEDGER")
+        if max_unlocking_chunks == 0:
+            raise Revert("NIMBUS: BAD_MAX_UNLOCKING_CHUNKS")
+        self.relay_spec = tuple(relay_spec)
+        for ledger in self.getLedgerAddresses():
+            self.world.at(ledger).setRelaySpecs(min_nominator_balance, minimum_balance, max_unlocking_chunks)
+
+    @external
+    def setFee(self, fee_treasury, fee_developers):
+        self._auth('ROLE_FEE_MANAGER')
+        total = fee_treasury + fee_developers
+        if total > 10000 or (fee_treasury == 0 and fee_developers == 0):
+            raise Revert("NIMBUS: FEE_DONT_ADD_UP")
+        self._emit('FeeSet', fee=total, feeTreasuryBP=fee_treasury, feeDevelopersBP=fee_developers)
+        self.fee_developers = fee_developers
+        self.fee_treasury = fee_treasury
+
+    @external
+    def addLedger(self, stash_account, controller_account, index):
+        self._auth('ROLE_LEDGER_MANAGER')
+        stash_account = _bytes32(stash_account)
+        if len(self.getLedgerAddresses()) >= self.MAX_LEDGERS_AMOUNT:
+            raise Revert("NIMBUS: LEDGERS_POOL_LIMIT")
+        if stash_account in self.ledger_by_stash:
+            raise Revert("NIMBUS: STASH_ALREADY_EXISTS")
+
+        _, min_nominator_balance, minimum_balance, max_unlocking_chunks = self.relay_spec
+        ledger = PyLedger(self.world)
+        ledger.initialize(
+            stash_account, controller_account, self.xc_token, self.controller, min_nominator_balance, self,
+            minimum_balance, max_unlocking_chunks
+        )
+        self.accounting.add_ledger(ledger.address)
+        self.ledger_by_stash[stash_account] = ledger.address
+        self.oracle_master.addLedger(ledger)
+        self.controller.newSubAccount(index, stash_account, ledger)
+        self._emit(
+            'LedgerAdd', addr=ledger.address, stashAccount=stash_account,
+            controllerAccount=_bytes32(controller_account)
+        )
+        return ledger.address
+
+    def _check_ledger(self, ledger):
+        if ledger not in self.accounting.ledger_stake:
+            raise Revert("NIMBUS: LEDGER_NOT_FOUND")
+
+    @external
+    def disableLedger(self, ledger):
+        self._auth('ROLE_LEDGER_MANAGER')
+        ledger = _address(ledger)
+        self._check_ledger(ledger)
+        self.accounting.disable_ledger(ledger)
+        self._emit('LedgerDisable', addr=ledger)
+
+    @external
+    def emergencyPauseLedger(self, ledger):
+        self._auth('ROLE_LEDGER_MANAGER')
+        ledger = _address(ledger)
+        self._check_ledger(ledger)
+        self.accounting.disable_ledger(ledger)
+        self._emit('LedgerDisable', addr=ledger)
+        self.accounting.paused_ledgers.add(ledger)
+        self._emit('LedgerPaused', addr=ledger)
+
+    @external
+    def resumeLedger(self, ledger):
+        self._auth('ROLE_LEDGER_MANAGER')
+        ledger = _address(ledger)
+        self.accounting.resume_ledger(ledger)
+        self._emit('LedgerResumed', addr=ledger)
+
+    @external
+    def removeLedger(self, ledger):
+        self._auth('ROLE_LEDGER_MANAGER')
+        ledger = _address(ledger)
+        self._check_ledger(ledger)
+        ledger_contract = self.world.at(ledger)
+        self.accounting.remove_ledger(ledger)
+        if not ledger_contract.isEmpty():
+            raise Revert("NIMBUS: LEDGER_IS_NOT_EMPTY")
+        del self.ledger_by_stash[ledger_contract.stashAccount()]
+        self.oracle_master.removeLedger(ledger)
+        self.controller.deleteSubAccount(ledger)
+        self._emit('LedgerRemove', addr=ledger)
+
+    @external
+    def nominateBatch(self, stash_accounts, validators):
+        self._auth('ROLE_STAKE_MANAGER')
+        if len(stash_accounts) != len(validators):
+            raise Revert("NIMBUS: INCORRECT_INPUT")
+        for stash_account, ledger_validators in zip(stash_accounts, validators):
+            ledger = self.ledger_by_stash.get(_bytes32(stash_account))
+            if ledger is None:
+                raise Revert("NIMBUS: UNKNOWN_STASH_ACCOUNT")
+            if len(ledger_validators) > self.relay_spec[0]:
+                raise Revert("NIMBUS: VALIDATORS_AMOUNT_TOO_BIG")
+            self.world.at(ledger).nominate(ledger_validators)
+
+    # user calls
+
+    @external
+    def deposit(self, amount, referral=ZERO_ADDRESS):
+        self._when_not_paused()
+        shares = self.getSharesByPooledToken(amount)
+        self.accounting.deposit(amount)
+        self.xc_token.transferFrom(self.msg_sender, self, amount)
+        if shares == 0:
+            # the first deposit or complete slashing, shares correspond to xcTOKEN 1:1
+            shares = amount
+        self._mint_shares(self.msg_sender, shares)
+        self._emit('Deposited', sender=self.msg_sender, amount=amount, shares=shares)
+        self._emit('Referral', userAddr=self.msg_sender, referralAddr=_address(referral), amount=amount, shares=shares)
+        return shares
+
+    @external
+    def redeem(self, amount):
+        self._when_not_paused()
+        token_amount = self.getPooledTokenByShares(amount)
+        if token_amount == 0:
+            raise Revert("NIMBUS: AMOUNT_TOO_LOW")
+        if amount > self.balanceOf(self.msg_sender):
+            raise Revert("NIMBUS: REDEEM_AMOUNT_EXCEEDS_BALANCE")
+        self._burn_shares(self.msg_sender, amount)
+        self.accounting.redeem(token_amount)
+        self.withdrawal.redeem(self.msg_sender, token_amount)
+        self._emit('Redeemed', receiver=self.msg_sender, amount=token_amount, shares=amount)
+
+    @external
+    def claimUnbonded(self):
+        self._when_not_paused()
+        amount = self.withdrawal.claim(self.msg_sender)
+        self._emit('Claimed', receiver=self.msg_sender, amount=amount)
+
+    # ledger and oracle calls
+
+    @external
+    def distributeRewards(self, total_rewards, ledger_balance):
+        self._only_ledger()
+        fee_dev_treasury = self.fee_developers + self.fee_treasury
+        if fee_dev_treasury == 0:
+            raise Revert("NIMBUS: ZERO_FEES")
+        self.accounting.distribute_rewards(self.msg_sender, total_rewards)
+
+        # lido formula of fee shares
+        share_prev = self._total_supply
+        pooled = self.getTotalPooledToken()
+        nominator = total_rewards * fee_dev_treasury * share_prev
+        denom = _sub(10000 * pooled, total_rewards * fee_dev_treasury)
+        shares_to_mint = pooled
+        if share_prev > 0 and denom > 0:
+            shares_to_mint = nominator // denom
+        self._mint_shares(self.treasury, shares_to_mint)
+        self._transfer(self.treasury, self.developers, shares_to_mint * self.fee_developers // fee_dev_treasury)
+        self._emit('Rewards', ledger=self.msg_sender, rewards=total_rewards, balance=ledger_balance)
+
+    @external
+    def distributeLosses(self, total_losses, ledger_balance):
+        self._only_ledger()
+        batch_xc_token_balance = self.withdrawal.batchVirtualXcTokenAmount()
+        withdrawal_balance = self.withdrawal.totalBalanceForLosses()
+        withdrawal_pending_for_claiming = self.withdrawal.pendingForClaiming()
+        withdrawal_xc_token_balance = self.xc_token.balanceOf(self.withdrawal)
+
+        # xcTOKEN fast tracked to Withdrawal can't be slashed
+        virtual_withdrawal_balance = 0
+        if withdrawal_balance + withdrawal_pending_for_claiming > withdrawal_xc_token_balance:
+            virtual_withdrawal_balance = _sub(
+                withdrawal_balance, _sub(withdrawal_xc_token_balance, withdrawal_pending_for_claiming)
+            )
+
+        fund_raised_balance = self.accounting.fund_raised_balance
+        self.accounting.distribute_losses(
+            self.msg_sender, total_losses, virtual_withdrawal_balance, batch_xc_token_balance
+        )
+        withdrawal_losses = total_losses - (fund_raised_balance - self.accounting.fund_raised_balance)
+        if withdrawal_losses > 0:
+            self.withdrawal.ditributeLosses(withdrawal_losses)
+        self._emit('Losses', ledger=self.msg_sender, losses=total_losses, balance=ledger_balance)
+
+    @external
+    def transferFromLedger(self, amount, excess):
+        self._only_ledger()
+        self.accounting.transfer_from_ledger(self.msg_sender, amount, excess)
+        if excess > 0:
+            self.xc_token.transferFrom(self.msg_sender, self, excess)
+        self.xc_token.transferFrom(self.msg_sender, self.withdrawal, amount)
+
+    @external
+    def transferToLedger(self, amount):
+        self._only_ledger()
+        self.accounting.transfer_to_ledger(self.msg_sender, amount)
+        self.xc_token.transfer(self.msg_sender, amount)
+
+    @external
+    def flushStakes(self):
+        if self.msg_sender != self.oracle_master.address:
+            raise Revert("NIMBUS: NOT_FROM_ORACLE_MASTER")
+        self.withdrawal.newEra()
+
+        accounting = self.accounting
+        accounting.xc_balance = self.xc_token.balanceOf(self)
+        accounting.withdrawal_balance = self.xc_token.balanceOf(self.withdrawal)
+        for ledger in self.getLedgerAddresses():
+            accounting.transfer_downward_balance[ledger] = self.world.at(ledger).transferDownwardBalance()
+        accounting.soft_rebalance_stakes()
+
+
+class PyBackend:
+    """
+    In-memory deployment equal to the `nimbus` fixture of conftest:
+    ledgers, oracles and the relay controller mock behind the brownie call surface `RelayChain` uses.
+    Ledger beacon, factory and proxies are not modelled, uint128 overflows are not checked.
+    """
+
+    ERA_SECONDS = 6 * 60 * 60
+
+    def __init__(self, accounts_amount=10, timestamp=1640995200):
+        self.world = PyWorld(timestamp)
+        self.chain = PyChain(self.world)
+        self.accounts = [self.world.new_address() for _ in range(accounts_amount)]
+        self.world.default_sender = admin = self.accounts[0]
+        self.developers = self.world.new_address()
+        self.treasury = self.world.new_address()
+
+        self.xcTOKEN = PyXcToken(self.world)
+        self.xcTOKEN.initialize({'from': admin})
+
+        self.auth_manager = PyAuthManager(self.world)
+        self.auth_manager.initialize(admin, {'from': admin})
+        for role in ('ROLE_SPEC_MANAGER', 'ROLE_BEACON_MANAGER', 'ROLE_PAUSE_MANAGER', 'ROLE_FEE_MANAGER',
+                     'ROLE_LEDGER_MANAGER', 'ROLE_STAKE_MANAGER', 'ROLE_ORACLE_MEMBERS_MANAGER',
+                     'ROLE_ORACLE_QUORUM_MANAGER', 'ROLE_SET_TREASURY', 'ROLE_SET_DEVELOPERS'):
+            self.auth_manager.addByString(role, admin, {'from': admin})
+
+        self.oracle_master = PyOracleMaster(self.world)
+        self.oracle_master.initialize(1, {'from': admin})
+        self.withdrawal = PyWithdrawal(self.world)
+        self.withdrawal.initialize(35, self.xcTOKEN, {'from': admin})
+        self.controller = PyController(self.world)
+
+        self.nimbus = PyNimbus(self.world)
+        self.nimbus.initialize(
+            self.auth_manager, self.xcTOKEN, self.controller, self.developers, self.treasury, self.oracle_master,
+            self.withdrawal, 50000 * 10**18, 3000, "TST", "TST", 12, {'from': admin}
+        )
+        self.nimbus.setRelaySpec((16, 1, 0, 32), {'from': admin})
+        self.oracle_master.setAnchorEra(0, self.chain.time(), self.ERA_SECONDS, {'from': admin})
+
+    def at(self, address):
+        return self.world.at(address)
@@ -0,0 +1,203 @@
+import random
+
+import pytest
+from brownie import chain, Ledger
+from brownie.exceptions import VirtualMachineError
+from helpers import RelayChain, distribute_initial_tokens
+from pybackend import PyBackend
+from relay_trace import random_era
+from scripts.nimbus_model import Revert
+
+
+def call_both(evm_call, py_call):
+    """
+    Both backends revert or none does. Require messages must match, the in-memory backend
+    names checked arithmetic failures differently from the EVM panic codes.
+    """
+    try:
+        evm_call()
+        evm_error = None
+    except VirtualMachineError as e:
+        evm_error = e.revert_msg or 'revert'
+    try:
+        py_call()
+        py_error = None
+    except Revert as e:
+        py_error = str(e)
+    assert (evm_error is None) == (py_error is None), (evm_error, py_error)
+    if py_error is not None and not py_error.startswith(('underflow', 'overflow', 'division')):
+        assert evm_error == py_error
+
+
+def backend_state(nimbus, xcTOKEN, withdrawal, relay, holders, ledger_at):
+    """
+    Everything a scenario can observe, ledgers are listed in `relay.ledgers` order
+    """
+    ledgers = []
+    for relay_ledger in relay.ledgers:
+        ledger = ledger_at(relay_ledger.ledger_address)
+        ledgers.append((
+            nimbus.ledgerStake(ledger), nimbus.ledgerBorrow(ledger), xcTOKEN.balanceOf(ledger),
+            ledger.cachedTotalBalance(), ledger.transferUpwardBalance(), ledger.transferDownwardBalance(),
+            ledger.pendingBonds(), ledger.status(),
+            relay_ledger.active_balance, relay_ledger.free_balance, list(relay_ledger.unlocking_chunks),
+            relay_ledger.status,
+        ))
+    return {
+        'nimbus': (
+            nimbus.fundRaisedBalance(), nimbus.bufferedDeposits(), nimbus.bufferedRedeems(), nimbus.totalSupply(),
+            xcTOKEN.balanceOf(nimbus),
+        ),
+        'withdrawal': (
+            withdrawal.totalVirtualXcTokenAmount(), withdrawal.totalXcTokenPoolShares(),
+            withdrawal.batchVirtualXcTokenAmount(), withdrawal.claimableId(), withdrawal.pendingForClaiming(),
+            xcTOKEN.balanceOf(withdrawal),
+        ),
+        'holders': [
+            (nimbus.balanceOf(holder), xcTOKEN.balanceOf(holder), tuple(nimbus.getUnbonded(holder)))
+            for holder in holders
+        ],
+        'ledgers': ledgers,
+    }
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_pybackend_matches_evm(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, developers, treasury,
+                               pybackend, seed):
+    py = pybackend
+    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+    distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+
+    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
+    py_relay = RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+    for stash, controller in (("0x10", "0x11"), ("0x20", "0x21"), ("0x30", "0x31")):
+        relay.new_ledger(stash, controller)
+        py_relay.new_ledger(stash, controller)
+
+    def compare():
+        evm_state = backend_state(
+            nimbus, xcTOKEN, withdrawal, relay, list(accounts[:5]) + [developers, treasury], Ledger.at
+        )
+        py_state = backend_state(
+            py.nimbus, py.xcTOKEN, py.withdrawal, py_relay, py.accounts[:5] + [py.developers, py.treasury], py.at
+        )
+        assert evm_state == py_state
+
+    rng = random.Random(seed)
+    for era in range(30):
+        calls, rewards = random_era(rng, py.nimbus, py_relay, py.accounts)
+        for name, account, *args in calls:
+            call_both(
+                lambda: getattr(nimbus, name)(*args, {'from': accounts[account]}),
+                lambda: getattr(py.nimbus, name)(*args, {'from': py.accounts[account]}),
+            )
+        if era == 10:
+            relay.timetravel(28)
+            py_relay.timetravel(28)
+        # a report may revert, e.g. when a slash leaves a deficit Nimbus can't cover
+        call_both(lambda: relay.new_era(list(rewards)), lambda: py_relay.new_era(list(rewards)))
+        compare()
+
+
+def test_pybackend_redeem_claim(pybackend):
+    py = pybackend
+    distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+    relay = RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+    relay.new_ledger("0x10", "0x11")
+
+    deposit = 20 * 10**12
+    for i in range(5):
+        py.nimbus.deposit(deposit, {'from': py.accounts[i]})
+    relay.new_era()
+    relay.new_era()
+    assert relay.ledgers[0].active_balance == deposit * 5
+
+    for i in range(5):
+        py.nimbus.redeem(deposit, {'from': py.accounts[i]})
+    relay.new_era()
+    assert relay.ledgers[0].active_balance == 0
+    assert py.withdrawal.totalVirtualXcTokenAmount() == deposit * 5
+
+    relay.timetravel(28)
+    relay.new_era()  # should send 'withdraw'
+    relay.new_era()  # should downward transfer
+    relay.new_era()  # should downward transfer got completed
+    relay.new_era()  # update era in withdrawal
+
+    for i in range(5):
+        balance_before_claim = py.xcTOKEN.balanceOf(py.accounts[i])
+        tx = py.nimbus.claimUnbonded({'from': py.accounts[i]})
+        assert tx.events['Claimed'][0]['claimedAmount'] == deposit
+        assert py.xcTOKEN.balanceOf(py.accounts[i]) == balance_before_claim + deposit
+    assert py.xcTOKEN.balanceOf(py.withdrawal) == 0
+
+
+def test_pybackend_revert_restores_entered_contracts():
+    py = PyBackend()
+    distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+    relay = RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+    relay.new_ledger("0x10", "0x11")
+    py.nimbus.deposit(20 * 10**12, {'from': py.accounts[1]})
+    relay.new_era()
+    relay.new_era()
+
+    ledger = py.at(relay.ledgers[0].ledger_address)
+    oracle = py.at(py.oracle_master.getOracle(ledger))
+    contracts = dict(py.world.contracts)
+    active_balance = ledger.active_balance
+    # the stash balance jump makes `Ledger.pushData` revert after the oracles and the ledger changed their state
+    report = list(relay.ledgers[0].get_report_data())
+    report[3] -= 10**12
+    report[4] -= 10**12
+    report[7] += 10**18
+    py.chain.sleep(py.ERA_SECONDS)
+    py.oracle_master.reportRelay(relay.era + 1, report, {'from': py.accounts[0]})
+    variants = [(report, votes) for report, votes in oracle.report_variants]
+
+    with pytest.raises(Revert, match='LEDGER: DIFFERENCE_EXCEEDS_BALANCE'):
+        py.oracle_master.reportRelay(relay.era + 1, report, {'from': py.accounts[1]})
+    assert [(report, votes) for report, votes in oracle.report_variants] == variants
+    assert py.oracle_master.isReportedLastEra(py.accounts[1], relay.ledgers[0].stash_account)[1] is False
+    assert ledger.active_balance == active_balance
+    assert py.world.contracts == contracts
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_fast_forward_matches_new_era(seed):
+    backends = [PyBackend(), PyBackend()]
+    relays = []
+    for py in backends:
+        distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+        relay = RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+        for stash, controller in (("0x10", "0x11"), ("0x20", "0x21"), ("0x30", "0x31")):
+            relay.new_ledger(stash, controller)
+        relays.append(relay)
+    (stepped, forwarded), (step_relay, forward_relay) = backends, relays
+
+    def schedule(era):
+        return [10**6, 0, 2 * 10**6] if seed == 3 and era % 7 == 0 else None
+
+    rng = random.Random(seed)
+    eras = reported = 0
+    for _ in range(5):
+        calls, _ = random_era(rng, stepped.nimbus, step_relay, stepped.accounts)
+        for name, account, *args in calls:
+            call_both(
+                lambda: getattr(stepped.nimbus, name)(*args, {'from': stepped.accounts[account]}),
+                lambda: getattr(forwarded.nimbus, name)(*args, {'from': forwarded.accounts[account]}),
+            )
+        k = rng.randrange(1, 40)
+        for _ in range(k):
+            step_relay.new_era(list(schedule(step_relay.era + 1) or []))
+        reported += forward_relay.fast_forward(k, schedule)
+        eras += k
+
+        assert forward_relay.era == step_relay.era
+        assert forwarded.chain.time() == stepped.chain.time()
+        assert backend_state(
+            stepped.nimbus, stepped.xcTOKEN, stepped.withdrawal, step_relay, stepped.accounts[:5], stepped.at
+        ) == backend_state(
+            forwarded.nimbus, forwarded.xcTOKEN, forwarded.withdrawal, forward_relay, forwarded.accounts[:5],
+            forwarded.at
+        )
+    assert reported < eras
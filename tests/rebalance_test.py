@@ -1,13 +1,8 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
+import pytest
 
-def test_equal_deposit_bond(nimbus, Ledger, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
 
+@pytest.mark.scenario('2 ledgers')
+def test_equal_deposit_bond(nimbus, Ledger, oracle_master, xcTOKEN, accounts, relay):
     ledger_1 = relay.ledgers[0]
     ledger_2 = relay.ledgers[1]
 
@@ -46,11 +41,8 @@ def test_equal_deposit_bond(nimbus, Ledger, oracle_master, xcTOKEN, accounts):
         assert ledger_2.total_balance() + ledgerContract_2.transferUpwardBalance() + ledgerContract_2.transferDownwardBalance() == nimbus.ledgerBorrow(ledger_2.ledger_address)
 
 
-def test_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
+@pytest.mark.scenario('1 ledger')
+def test_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts, relay):
     ledger_1 = relay.ledgers[0]
 
     deposit = 100 * 10**18
@@ -63,8 +55,7 @@ def test_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
     redeem = 50 * 10**18
     nimbus.redeem(nimbus.getSharesByPooledToken(redeem), {'from': accounts[0]})
 
-    for i in range(31):
-        relay.new_era()
+    relay.fast_forward(31)
 
     assert nimbus.ledgerBorrow(ledger_1.ledger_address) == deposit
 
@@ -77,22 +68,16 @@ def test_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
     # second redeem
     nimbus.redeem(nimbus.getSharesByPooledToken(redeem), {'from': accounts[0]})
 
-    for i in range(32):
-        relay.new_era()
+    relay.fast_forward(32)
 
     assert nimbus.getTotalPooledToken() == direct_transfer + 1 # NOTE: +1 beacause of the rounding on redeem
     assert nimbus.ledgerBorrow(ledger_1.ledger_address) == direct_transfer + 1 # NOTE: +1 beacause of the rounding on redeem
 
 
-def test_deposit_reward(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
+@pytest.mark.scenario('3 ledgers')
+def test_deposit_reward(nimbus, oracle_master, xcTOKEN, accounts, relay):
     nimbus.setMaxAllowableDifference(5100, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
     ledger_1 = relay.ledgers[0]
     ledger_2 = relay.ledgers[1]
     ledger_3 = relay.ledgers[2]
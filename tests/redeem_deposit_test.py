@@ -1,15 +1,8 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
+import pytest
 
 
-def test_redeem_right_after_deposit_equal(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
+@pytest.mark.scenario('3 ledgers')
+def test_redeem_right_after_deposit_equal(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -23,8 +16,7 @@ def test_redeem_right_after_deposit_equal(nimbus, oracle_master, xcTOKEN, accoun
     assert relay.ledgers[1].active_balance == 0
     assert relay.ledgers[2].active_balance == 0
 
-    for i in range(20):
-        relay.new_era()
+    relay.fast_forward(20)
 
     # 0. Save ledger stakes before actions
     led1_stake = nimbus.ledgerStake(relay.ledgers[0].ledger_address)
@@ -66,12 +58,8 @@ def test_redeem_right_after_deposit_equal(nimbus, oracle_master, xcTOKEN, accoun
     assert xcTOKEN.balanceOf(accounts[1]) == (deposit_2 + balance_before_claim)
 
 
-def test_redeem_right_after_deposit_less(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem_right_after_deposit_less(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -113,12 +101,8 @@ def test_redeem_right_after_deposit_less(nimbus, oracle_master, xcTOKEN, account
     assert xcTOKEN.balanceOf(accounts[1]) == (redeem + balance_before_claim)
 
 
-def test_redeem_right_after_deposit_greater(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem_right_after_deposit_greater(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -147,8 +131,7 @@ def test_redeem_right_after_deposit_greater(nimbus, oracle_master, xcTOKEN, acco
     assert readyToClaim == 0
 
     # 5. wait for unbonding
-    for i in range(33):
-        relay.new_era()
+    relay.fast_forward(33)
 
     balance_before_claim = xcTOKEN.balanceOf(accounts[0])
     nimbus.claimUnbonded({'from': accounts[0]})
@@ -156,13 +139,8 @@ def test_redeem_right_after_deposit_greater(nimbus, oracle_master, xcTOKEN, acco
     assert xcTOKEN.balanceOf(accounts[0]) == (redeem + balance_before_claim)
 
 
-def test_deposit_after_redeem_in_new_era(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-
+@pytest.mark.scenario('2 ledgers')
+def test_deposit_after_redeem_in_new_era(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -193,12 +171,8 @@ def test_deposit_after_redeem_in_new_era(nimbus, oracle_master, xcTOKEN, account
     assert xcTOKEN.balanceOf(accounts[0]) == (redeem + balance_before_claim)
 
 
-def test_deposit_after_redeem_in_new_era_less(nimbus, oracle_master, xcTOKEN, Ledger, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_deposit_after_redeem_in_new_era_less(nimbus, oracle_master, xcTOKEN, Ledger, accounts, relay):
     deposit = 20 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -234,12 +208,8 @@ def test_deposit_after_redeem_in_new_era_less(nimbus, oracle_master, xcTOKEN, Le
     assert xcTOKEN.balanceOf(accounts[0]) == (redeem + balance_before_claim)
 
 
-def test_deposit_after_redeem_in_new_era_greater(nimbus, oracle_master, xcTOKEN, Ledger, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_deposit_after_redeem_in_new_era_greater(nimbus, oracle_master, xcTOKEN, Ledger, accounts, relay):
     deposit = 20 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -268,8 +238,7 @@ def test_deposit_after_redeem_in_new_era_greater(nimbus, oracle_master, xcTOKEN,
     assert waitingToUnbonding == redeem
     assert readyToClaim == 0
 
-    for i in range(32):
-        relay.new_era()
+    relay.fast_forward(32)
 
     balance_before_claim = xcTOKEN.balanceOf(accounts[0])
     nimbus.claimUnbonded({'from': accounts[0]})
@@ -0,0 +1,271 @@
+"""
+Local stand-in of a relay chain node for the oracle. Answers the reads of `SubstrateRelay` in
+`scripts/oracle_reports.py` over JSON-RPC, with the staking state of thousands of `RelayLedger`s.
+Run from the repository root:
+
+    PYTHONPATH=. python tests/relay_server.py --stashes 5000 --latency 0.05 --era-seconds 60
+    PYTHONPATH=. python tests/relay_server.py --bench --stashes 100 1000 5000 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+from helpers import RelayLedger
+
+
+STATUSES = ['Nominator'] * 8 + ['Validator', 'Chill']
+
+
+def account(i, controller=False):
+    return '0x' + ((1 << 255 if controller else 0) | (i + 1)).to_bytes(32, 'big').hex()
+
+
+class StandInRelay:
+    """
+    Staking state of the relay, every era is one finalized block. Reads take a block hash and see the state of
+    that block, the last `history` blocks are kept
+    """
+    history = 8
+
+    def __init__(self, stashes, seed=0):
+        self.rng = random.Random(seed)
+        self.era = 0
+        self.ledgers = []
+        for i in range(stashes):
+            ledger = RelayLedger(self, None, account(i), account(i, True))
+            ledger.active_balance = self.rng.randrange(100, 10**4) * 10**12
+            ledger.free_balance = self.rng.randrange(0, 10) * 10**12
+            ledger.status = self.rng.choice(STATUSES)
+            self.ledgers.append(ledger)
+        self.blocks = {}
+        self.block_hashes = []
+        self._finalize()
+
+    def _finalize(self):
+        state = {}
+        for ledger in self.ledgers:
+            stash, controller, _, active, total, unlocking, claimed, stash_balance, spans = ledger.get_report_data()
+            state[stash] = {
+                'controller': controller,
+                'ledger': {'total': total, 'active': active, 'unlocking': unlocking, 'claimed_rewards': claimed},
+                'free': stash_balance,
+                'spans': spans,
+                'status': ledger.status,
+            }
+        block_hash = '0x' + (len(self.block_hashes) + 1).to_bytes(32, 'big').hex()
+        self.blocks[block_hash] = {
+            'era': self.era,
+            'stashes': state,
+            'controllers': {value['controller']: value['ledger'] for value in state.values()},
+            'validators': [stash for stash, value in state.items() if value['status'] == 'Validator'],
+        }
+        self.block_hashes.append(block_hash)
+        if len(self.block_hashes) > self.history:
+            del self.blocks[self.block_hashes[-self.history - 1]]
+
+    def new_era(self, reward_rate=0.0005, unbond_probability=0.05):
+        """
+        Start an era: rewards on active stake, matured unlocking chunks withdrawn and random unbonds
+        """
+        self.era += 1
+        for ledger in self.ledgers:
+            ledger.withdraw()
+            if ledger.status != 'Chill':
+                ledger.active_balance += int(ledger.active_balance * reward_rate)
+            if self.rng.random() < unbond_probability and len(ledger.unlocking_chunks) < 31:
+                ledger.unbond(ledger.active_balance // 100)
+        self._finalize()
+        return self.era
+
+    # JSON-RPC methods, the same as reads of `SubstrateRelay`, storage maps are read for a list of keys at once
+
+    def head(self):
+        return self.block_hashes[-1]
+
+    def _block(self, block_hash):
+        assert block_hash in self.blocks, f"unknown block {block_hash}"
+        return self.blocks[block_hash]
+
+    def active_era(self, block_hash):
+        return self._block(block_hash)['era']
+
+    def validators(self, block_hash):
+        return self._block(block_hash)['validators']
+
+    def bonded(self, stashes, block_hash):
+        state = self._block(block_hash)['stashes']
+        return [state[stash]['controller'] if stash in state else None for stash in stashes]
+
+    def staking_ledgers(self, controllers, block_hash):
+        state = self._block(block_hash)['controllers']
+        return [state.get(controller) for controller in controllers]
+
+    def free_balances(self, stashes, block_hash):
+        state = self._block(block_hash)['stashes']
+        return [state[stash]['free'] if stash in state else 0 for stash in stashes]
+
+    def slashing_spans(self, stashes, block_hash):
+        state = self._block(block_hash)['stashes']
+        return [state[stash]['spans'] if stash in state else 0 for stash in stashes]
+
+    def nominating(self, stashes, block_hash):
+        state = self._block(block_hash)['stashes']
+        return [stash in state and state[stash]['status'] == 'Nominator' for stash in stashes]
+
+    def stash_accounts(self):
+        return [ledger.stash_account for ledger in self.ledgers]
+
+
+READ_METHODS = frozenset((
+    'head', 'active_era', 'validators', 'bonded', 'staking_ledgers', 'free_balances', 'slashing_spans', 'nominating',
+    'stash_accounts',
+))
+
+
+class RelayServer:
+    """
+    HTTP JSON-RPC server of a `StandInRelay` with keep-alive connections. Every request is answered after
+    `latency` seconds without blocking the others, `new_era` advances the relay
+    """
+
+    def __init__(self, relay, latency=0.0):
+        self.relay = relay
+        self.latency = latency
+        self.requests = 0
+        self.server = None
+
+    def _dispatch(self, request):
+        method, params = request['method'], request.get('params', [])
+        try:
+            if method == 'new_era':
+                result = self.relay.new_era(*params)
+            elif method in READ_METHODS:
+                result = getattr(self.relay, method)(*params)
+            else:
+                return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32601, 'message': method}}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32000, 'message': str(e)}}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode().partition(':')
+                    if name.strip().lower() == 'content-length':
+                        length = int(value)
+                request = json.loads(await reader.readexactly(length))
+
+                self.requests += 1
+                if self.latency > 0:
+                    await asyncio.sleep(self.latency)
+                body = json.dumps(self._dispatch(request)).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        @return port the server listens on
+        """
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def run_eras(self, era_seconds):
+        while True:
+            await asyncio.sleep(era_seconds)
+            print(f'era {self.relay.new_era()}')
+
+
+def start_in_thread(server, host='127.0.0.1', port=0):
+    """
+    Run the server on an event loop of a daemon thread, for tests and benchmarks
+    @return url of the server
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    port = asyncio.run_coroutine_threadsafe(server.start(host, port), loop).result()
+    return f'http://{host}:{port}'
+
+
+async def era_latency(relay, poll_seconds):
+    """
+    Start an era and play the oracle side of it: poll the active era until it changes, then read all stashes
+    @return seconds from the era start to all reports read
+    """
+    from scripts.oracle_reports import collect_reports
+
+    stashes = await relay.call('stash_accounts')
+    era = await relay.active_era(await relay.head())
+    started = time.time()
+    await relay.call('new_era')
+    block_hash = await relay.head()
+    while await relay.active_era(block_hash) == era:
+        await asyncio.sleep(poll_seconds)
+        block_hash = await relay.head()
+    _, reports = await collect_reports(relay, stashes, block_hash)
+    assert len(reports) == len(stashes)
+    return time.time() - started
+
+
+def bench(stash_counts, pool_sizes, latency, poll_seconds, seed):
+    from scripts.oracle_reports import JsonRpcRelay
+
+    print(f"{'stashes':>8} {'pool':>5} {'requests':>9} {'era latency s':>14} {'stashes/s':>10}")
+    for stashes in stash_counts:
+        server = RelayServer(StandInRelay(stashes, seed), latency)
+        url = start_in_thread(server)
+        for pool_size in pool_sizes:
+            relay = JsonRpcRelay(url, pool_size)
+            requests = server.requests
+            seconds = asyncio.run(era_latency(relay, poll_seconds))
+            relay.close()
+            print(f'{stashes:>8} {pool_size:>5} {server.requests - requests:>9} {seconds:>14.2f} {stashes / seconds:>10.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stashes', type=int, nargs='+', default=[1000])
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before every answer')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=9933)
+    parser.add_argument('--era-seconds', type=float, default=0, help='start eras periodically, 0 to start them only by `new_era` calls')
+    parser.add_argument('--bench', action='store_true', help='measure oracle reads of an era instead of serving')
+    parser.add_argument('--pool', type=int, nargs='+', default=[1, 16, 64], help='oracle connections for --bench')
+    parser.add_argument('--poll-seconds', type=float, default=0.1, help='oracle era polling for --bench')
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.stashes, args.pool, args.latency, args.poll_seconds, args.seed)
+        return
+
+    async def serve():
+        server = RelayServer(StandInRelay(args.stashes[0], args.seed), args.latency)
+        await server.start(port=args.port)
+        print(f'relay stand-in with {args.stashes[0]} stashes on port {args.port}')
+        if args.era_seconds > 0:
+            await server.run_eras(args.era_seconds)
+        else:
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+
+from relay_server import RelayServer, StandInRelay, start_in_thread
+from scripts.oracle_reports import JsonRpcRelay, collect_reports, VALIDATOR
+
+
+def test_reports_match_relay_ledgers():
+    model = StandInRelay(40, seed=1)
+    for _ in range(30):
+        model.new_era()
+    relay = JsonRpcRelay(start_in_thread(RelayServer(model, latency=0.001)), pool_size=8)
+
+    era, reports = asyncio.run(collect_reports(relay, model.stash_accounts()))
+    assert era == 30
+    assert any(len(report[5]) > 0 for report in reports)
+    for ledger, report in zip(model.ledgers, reports):
+        expected = ledger.get_report_data()
+        if ledger.status == 'Validator':
+            expected = expected[:2] + (VALIDATOR,) + expected[3:]
+        assert report == expected
+    relay.close()
+
+
+def test_reads_at_block():
+    model = StandInRelay(3)
+    server = RelayServer(model)
+    relay = JsonRpcRelay(start_in_thread(server), pool_size=2)
+
+    async def read():
+        block = await relay.head()
+        _, before = await collect_reports(relay, model.stash_accounts())
+        await relay.call('new_era')
+        active = model.ledgers[0].active_balance
+        assert await relay.active_era(await relay.head()) == 1
+        controllers = [model.ledgers[0].controller_account]
+        assert (await relay.staking_ledgers(controllers, block))[0]['active'] == before[0][3]
+        assert (await relay.staking_ledgers(controllers, await relay.head()))[0]['active'] == active
+        _, reports = await collect_reports(relay, model.stash_accounts(), block)
+        assert reports == before
+
+    asyncio.run(read())
+    assert server.requests > 0
+    relay.close()
+
+
+def test_requests_independent_of_stashes():
+    for stashes in [10, 500]:
+        server = RelayServer(StandInRelay(stashes))
+        relay = JsonRpcRelay(start_in_thread(server), pool_size=8)
+        _, reports = asyncio.run(collect_reports(relay, server.relay.stash_accounts()))
+        assert len(reports) == stashes
+        # head, era, validators, then bonded, balances, spans and nominations of all stashes, then their ledgers
+        assert server.requests == 8
+        relay.close()
@@ -0,0 +1,168 @@
+"""
+Recorded `RelayChain` sessions: steps with the relay state after each, replayed on any backend until the first
+divergence. Recordings in `tests/traces` are generated on the in-memory backend from a seed, run from the
+repository root to regenerate them:
+
+    PYTHONPATH=.:tests python tests/relay_trace.py --seed 4 --ledgers 4 --eras 80
+"""
+import argparse
+import json
+import os
+import random
+from collections import namedtuple
+
+
+ERA_SECONDS = 6 * 60 * 60
+
+# first step whose relay state or failure differs from the recording, `expected` and `actual` are [state, error]
+Divergence = namedtuple('Divergence', ['index', 'step', 'expected', 'actual'])
+
+
+def save(trace, path):
+    with open(path, 'w') as file:
+        json.dump({'steps': trace}, file, separators=(',', ':'))
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)['steps']
+
+
+def _set_flags(relay, flags):
+    relay.bond_enabled, relay.transfer_enabled, relay.block_xcm_messages = flags
+
+
+def _era(relay, era, rewards, blocked_quorum, flags):
+    # eras skipped by `fast_forward` were not reported, only the clock moved
+    if era - 1 > relay.era:
+        relay.chain.sleep(ERA_SECONDS * (era - 1 - relay.era))
+        relay.era = era - 1
+    _set_flags(relay, flags)
+    relay.new_era(list(rewards), list(blocked_quorum))
+
+
+def _finalize_quorum(relay, ledger_index, flags):
+    _set_flags(relay, flags)
+    relay.finalize_quorum(ledger_index)
+
+
+def _call(relay, method, sender, args):
+    relay.call(method, *[relay.decode_arg(arg) for arg in args], sender=sender)
+
+
+STEPS = {
+    'new_ledger': lambda relay, stash, controller: relay.new_ledger(stash, controller),
+    'remove_ledger': lambda relay, index: relay.remove_ledger(relay.ledgers[index].ledger_address),
+    'era': _era,
+    'finalize_quorum': _finalize_quorum,
+    'timetravel': lambda relay, eras: relay.timetravel(eras),
+    'call': _call,
+}
+
+
+def replay(trace, relay, start=0):
+    """
+    Drive `relay` through recorded steps and compare its state after every step. The relay has to be where the
+    recording started, usually right after `distribute_initial_tokens` and `RelayChain` creation on a fresh
+    deployment, so a trace recorded on brownie can be replayed on `PyBackend` and the other way around
+    @param start - index of the first step to replay, the relay has to be in the state before it
+    @return first Divergence or None if the whole trace matched
+    """
+    for index in range(start, len(trace)):
+        action, args, expected = trace[index][:3]
+        expected_error = trace[index][3] if len(trace[index]) > 3 else None
+        error = None
+        try:
+            STEPS[action](relay, *args)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        actual = relay.state()
+        # error texts differ between backends, only failing or not has to match
+        if actual != expected or (error is None) != (expected_error is None):
+            return Divergence(index, trace[index], [expected, expected_error], [actual, error])
+    return None
+
+
+def random_era(rng, nimbus, relay, accounts):
+    """
+    Calls of one era drawn from the in-memory backend state, so both backends get the same arguments
+    """
+    calls = []
+    for i in range(1, 5):
+        roll = rng.random()
+        if roll < 0.4:
+            calls.append(('deposit', i, rng.randrange(1, 100) * 10**12))
+        elif roll < 0.6 and nimbus.balanceOf(accounts[i]) > 0:
+            shares = nimbus.balanceOf(accounts[i]) * rng.randrange(1, 50) // 100
+            if nimbus.getPooledTokenByShares(shares) > 0:
+                calls.append(('redeem', i, shares))
+        elif roll < 0.7:
+            calls.append(('claimUnbonded', i))
+
+    rewards = []
+    for ledger in relay.ledgers:
+        roll = rng.random()
+        if roll < 0.1:
+            rewards.append(-(ledger.active_balance // 200))
+        elif roll < 0.6:
+            rewards.append(ledger.active_balance // rng.randrange(100, 1000))
+        else:
+            rewards.append(0)
+    return calls, rewards
+
+
+def record_random(relay, seed, ledgers, eras, unbonding_era):
+    """
+    Record random deposits, redeems, claims, rewards and slashes of `eras` eras with `ledgers` ledgers. Reverted
+    calls and eras stay in the recording with their error
+    @param unbonding_era - era after which the clock moves by an unbonding period, so claims can succeed
+    @return trace
+    """
+    from scripts.nimbus_model import Revert
+
+    trace = relay.record()
+    for i in range(1, ledgers + 1):
+        relay.new_ledger(hex(0x10 * i), hex(0x10 * i + 1))
+    rng = random.Random(seed)
+    for era in range(eras):
+        calls, rewards = random_era(rng, relay.nimbus, relay, relay.accounts)
+        for name, account, *args in calls:
+            try:
+                relay.call(name, *args, sender=account)
+            except Revert:
+                pass
+        if era == unbonding_era:
+            relay.timetravel(28)
+        try:
+            relay.new_era(list(rewards))
+        except Revert:
+            pass
+    return trace
+
+
+def main():
+    from helpers import RelayChain, distribute_initial_tokens
+    from pybackend import PyBackend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, required=True)
+    parser.add_argument('--ledgers', type=int, default=4)
+    parser.add_argument('--eras', type=int, default=80)
+    parser.add_argument('--unbonding-era', type=int, default=30)
+    parser.add_argument('--output', help='default is tests/traces/random_<ledgers>_ledgers_<eras>_eras.json')
+    args = parser.parse_args()
+
+    py = PyBackend()
+    distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+    relay = RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+    trace = record_random(relay, args.seed, args.ledgers, args.eras, args.unbonding_era)
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), 'traces', f'random_{args.ledgers}_ledgers_{args.eras}_eras.json'
+    )
+    save(trace, output)
+    print(f'{len(trace)} steps written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import copy
+import glob
+import os
+
+import pytest
+from brownie import chain
+from helpers import RelayChain, distribute_initial_tokens
+from pybackend import PyBackend
+import relay_trace
+
+
+TRACES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'traces', '*.json')))
+
+
+def py_relay():
+    py = PyBackend()
+    distribute_initial_tokens(py.xcTOKEN, py.nimbus, py.accounts)
+    return RelayChain(py.nimbus, py.xcTOKEN, py.oracle_master, py.accounts, py.chain, ledger_at=py.at)
+
+
+def run_scenario(relay):
+    for stash, controller in (("0x10", "0x11"), ("0x20", "0x21"), ("0x30", "0x31")):
+        relay.new_ledger(stash, controller)
+
+    relay.deposit(1, 100 * 10**12)
+    relay.deposit(2, 50 * 10**12)
+    relay.new_era()
+    relay.new_era([10**9, 0, 2 * 10**9])
+
+    relay.redeem(1, 20 * 10**12)
+    relay.new_era([0, -10**9], blocked_quorum=[False, True])
+    relay.finalize_quorum(1)
+
+    relay.call('disableLedger', relay.ledgers[2].ledger_address)
+    relay.disable_bond()
+    relay.new_era()
+    relay.enable_bond()
+    relay.fast_forward(35)
+    relay.claim_unbonded(1)
+
+
+def test_evm_trace_replays_on_pybackend(nimbus, oracle_master, xcTOKEN, accounts):
+    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
+    trace = relay.record()
+    run_scenario(relay)
+
+    assert relay_trace.replay(trace, py_relay()) is None
+
+
+def test_replay_stops_at_divergence():
+    relay = py_relay()
+    trace = relay.record()
+    run_scenario(relay)
+
+    tampered = copy.deepcopy(trace)
+    index = next(i for i, (action, args, _) in enumerate(tampered) if action == 'era' and any(args[1]))
+    tampered[index][1][1][0] += 10**6
+    divergence = relay_trace.replay(tampered, py_relay())
+    assert divergence.index == index
+    assert divergence.expected != divergence.actual
+
+
+@pytest.mark.parametrize('path', TRACES, ids=os.path.basename)
+def test_recorded_trace(path):
+    assert relay_trace.replay(relay_trace.load(path), py_relay()) is None
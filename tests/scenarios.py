@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+from brownie import chain
+from helpers import RelayChain, distribute_initial_tokens
+
+
+BASE = 'base'
+
+Deployment = namedtuple('Deployment', ['nimbus', 'xcTOKEN', 'oracle_master', 'withdrawal', 'accounts'])
+
+
+def _tokens_distributed(env, relay):
+    distribute_initial_tokens(env.xcTOKEN, env.nimbus, env.accounts)
+    return RelayChain(env.nimbus, env.xcTOKEN, env.oracle_master, env.accounts, chain)
+
+
+def _ledgers(amount):
+    """
+    Ledgers with stash accounts 0x10, 0x20, ... and controllers 0x11, 0x21, ...
+    """
+    def build(env, relay):
+        for i in range(1, amount + 1):
+            relay.new_ledger(hex(0x10 * i), hex(0x10 * i + 1))
+        return relay
+    return build
+
+
+def _bonded(env, relay):
+    env.nimbus.deposit(100 * 10**12, {'from': env.accounts[0]})
+    relay.new_era()  # transfer to relay
+    relay.new_era()  # bond
+    return relay
+
+
+def _deposits(env, relay):
+    for acc in env.accounts[:4]:
+        env.nimbus.deposit(20 * 10**12, {'from': acc})
+    return relay
+
+
+# name: (parent, build(env, relay) -> relay)
+SCENARIOS = {
+    'tokens distributed': (BASE, _tokens_distributed),
+    '1 ledger': ('tokens distributed', _ledgers(1)),
+    '2 ledgers': ('tokens distributed', _ledgers(2)),
+    '3 ledgers': ('tokens distributed', _ledgers(3)),
+    '4 ledgers': ('tokens distributed', _ledgers(4)),
+    # 100 * 10**12 from accounts[0] bonded by the ledger
+    '1 ledger bonded': ('1 ledger', _bonded),
+    # 20 * 10**12 from each of accounts[0..3], buffered and not flushed yet
+    '4 ledgers with deposits': ('4 ledgers', _deposits),
+}
+
+
+class ScenarioLibrary:
+    """
+    Named chain snapshots on top of the session deployment. A scenario is built once from its parent and
+    later tests revert to it. Reverting invalidates every snapshot taken after the target one, so the
+    snapshots are kept as a stack: entering a scenario drops the entries which are not its ancestors and
+    rebuilds the missing part of its path. Tests of one scenario should be kept together to reuse it.
+    """
+
+    def __init__(self, env, scenarios=SCENARIOS):
+        self.env = env
+        self.scenarios = scenarios
+        # [name, snapshot id, relay state], base first
+        self.stack = [[BASE, self._snapshot(), None]]
+
+    def _snapshot(self):
+        chain.snapshot()
+        return chain._snapshot_id
+
+    def _path(self, name):
+        path = []
+        while name != BASE:
+            assert name in self.scenarios, f"unknown scenario {name}"
+            path.append(name)
+            name = self.scenarios[name][0]
+        path.append(BASE)
+        return path[::-1]
+
+    def enter(self, name):
+        """
+        Revert the chain to the named scenario, building it first if needed
+        @return own copy of the scenario relay, None for the base state
+        """
+        path = self._path(name)
+        depth = 1
+        while depth < min(len(path), len(self.stack)) and self.stack[depth][0] == path[depth]:
+            depth += 1
+        del self.stack[depth:]
+
+        top = self.stack[-1]
+        # ganache drops the snapshot it reverts to, `_revert` takes a new one of the same state
+        top[1] = chain._revert(top[1])
+        relay = top[2].copy() if top[2] is not None else None
+
+        for step in path[depth:]:
+            relay = self.scenarios[step][1](self.env, relay)
+            self.stack.append([step, self._snapshot(), relay.copy()])
+        return relay
@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.mark.scenario('1 ledger bonded')
+def test_bonded_scenario_changes(nimbus, accounts, relay):
+    assert relay.ledgers[0].active_balance == 100 * 10**12
+    assert nimbus.ledgerStake(relay.ledgers[0].ledger_address) == 100 * 10**12
+
+    nimbus.redeem(50 * 10**12, {'from': accounts[0]})
+    relay.new_era()
+    assert relay.ledgers[0].active_balance == 50 * 10**12
+
+
+@pytest.mark.scenario('1 ledger bonded')
+def test_bonded_scenario_restored(nimbus, accounts, relay):
+    assert relay.era == 2
+    assert relay.ledgers[0].active_balance == 100 * 10**12
+    assert relay.ledgers[0].unlocking_balance == 0
+    assert nimbus.ledgerStake(relay.ledgers[0].ledger_address) == 100 * 10**12
+    assert nimbus.bufferedRedeems() == 0
+
+
+@pytest.mark.scenario('4 ledgers with deposits')
+def test_deposits_scenario(nimbus, accounts, relay):
+    assert len(nimbus.getLedgerAddresses()) == 4
+    assert len(relay.ledgers) == 4
+    assert nimbus.bufferedDeposits() == 4 * 20 * 10**12
+
+    relay.new_era()
+    relay.new_era()
+    for ledger in relay.ledgers:
+        assert ledger.active_balance == 20 * 10**12
+
+
+def test_base_state(nimbus, xcTOKEN, accounts):
+    assert len(nimbus.getLedgerAddresses()) == 0
+    assert nimbus.getTotalPooledToken() == 0
+    assert xcTOKEN.balanceOf(accounts[1]) == 0
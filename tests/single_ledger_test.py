@@ -1,7 +1,4 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
-
-
+import pytest
 
 
 def test_add_stash(nimbus, oracle_master, xcTOKEN, Ledger, accounts):
@@ -12,10 +9,8 @@ def test_add_stash(nimbus, oracle_master, xcTOKEN, Ledger, accounts):
     assert ledger.controllerAccount() == "0x20"
 
 
-def test_relay_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_relay_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts, relay):
     relay.new_era()
 
     assert relay.ledgers[0].free_balance == 0
@@ -29,12 +24,8 @@ def test_relay_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
     assert nimbus.getTotalPooledToken() == reward
 
 
-def test_losse_underflow(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    # create ledger
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_losse_underflow(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # deposit, wait to active balance
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -56,8 +47,7 @@ def test_losse_underflow(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
     relay.new_era()
 
     # wait unbonding period
-    for i in range(32):
-        relay.new_era()
+    relay.fast_forward(32)
 
     nimbus.setMaxAllowableDifference(100000000, {'from': accounts[0]})
 
@@ -70,12 +60,8 @@ def test_losse_underflow(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
     relay.new_era([-first_redeem])
 
 
-def test_direct_ledger_transfer(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    # create ledger
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_direct_ledger_transfer(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # deposit, wait to active balance
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -97,8 +83,7 @@ def test_direct_ledger_transfer(nimbus, oracle_master, xcTOKEN, withdrawal, acco
     relay.new_era()
 
     # wait unbonding period
-    for i in range(32):
-        relay.new_era()
+    relay.fast_forward(32)
 
     # make sure that some tokens locked on Withdrawal
     assert xcTOKEN.balanceOf(withdrawal) == first_redeem
@@ -111,8 +96,7 @@ def test_direct_ledger_transfer(nimbus, oracle_master, xcTOKEN, withdrawal, acco
     relay.new_era()
 
     # wait unbonding period
-    for i in range(32):
-        relay.new_era()
+    relay.fast_forward(32)
 
     # check how it work with excess
     assert xcTOKEN.balanceOf(withdrawal) == second_redeem + direct_transfer
@@ -121,14 +105,8 @@ def test_direct_ledger_transfer(nimbus, oracle_master, xcTOKEN, withdrawal, acco
     assert nimbus.fundRaisedBalance() == 0
 
 
-def test_nominate_batch_ledger(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
+@pytest.mark.scenario('3 ledgers')
+def test_nominate_batch_ledger(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 30 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -147,11 +125,8 @@ def test_nominate_batch_ledger(nimbus, oracle_master, xcTOKEN, accounts):
     nimbus.nominateBatch([relay.ledgers[0].stash_account, relay.ledgers[1].stash_account, relay.ledgers[2].stash_account], [['0x123', '0x333', '0x131'], ['0x213'], ['0x321']])
 
 
-def test_deposit_bond_disable(nimbus, Ledger, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
+@pytest.mark.scenario('1 ledger')
+def test_deposit_bond_disable(nimbus, Ledger, oracle_master, xcTOKEN, accounts, relay):
     relay.disable_bond()
 
     deposit = 20 * 10**18
@@ -192,11 +167,8 @@ def test_deposit_bond_disable(nimbus, Ledger, oracle_master, xcTOKEN, accounts):
     assert nimbus.getTotalPooledToken() == deposit + deposit2 + deposit3
 
 
-def test_deposit_bond_disable_enable(nimbus, Ledger, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
+@pytest.mark.scenario('1 ledger')
+def test_deposit_bond_disable_enable(nimbus, Ledger, oracle_master, xcTOKEN, accounts, relay):
     relay.disable_bond()
 
     deposit = 20 * 10**18
@@ -252,12 +224,8 @@ def test_deposit_bond_disable_enable(nimbus, Ledger, oracle_master, xcTOKEN, acc
     assert nimbus.getTotalPooledToken() == deposit + deposit2 + deposit3
 
 
-def test_equal_deposit_bond(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_equal_deposit_bond(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -282,11 +250,9 @@ def test_equal_deposit_bond(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[0].free_balance == deposit3
     assert nimbus.getTotalPooledToken() == 2 * deposit + deposit3
 
-def test_deposit_transfer_disable(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
+@pytest.mark.scenario('1 ledger')
+def test_deposit_transfer_disable(nimbus, oracle_master, xcTOKEN, accounts, relay):
     relay.disable_transfer()
 
     deposit = 20 * 10**18
@@ -306,12 +272,9 @@ def test_deposit_transfer_disable(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[0].free_balance == 0
     assert nimbus.getTotalPooledToken() == deposit + deposit2
 
-def test_double_deposit(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
 
+@pytest.mark.scenario('1 ledger')
+def test_double_deposit(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -337,12 +300,9 @@ def test_double_deposit(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[0].free_balance == deposit3
     assert nimbus.getTotalPooledToken() == deposit + deposit2 + deposit3
 
-def test_deposit_with_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
 
+@pytest.mark.scenario('1 ledger')
+def test_deposit_with_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -370,12 +330,9 @@ def test_deposit_with_direct_transfer(nimbus, oracle_master, xcTOKEN, accounts):
     assert relay.ledgers[0].free_balance == deposit3
     assert nimbus.getTotalPooledToken() == deposit + deposit2 + deposit3 + direct_transfer # direct transfer work as rewards
 
-def test_single_deposit(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
 
+@pytest.mark.scenario('1 ledger')
+def test_single_deposit(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -390,12 +347,8 @@ def test_single_deposit(nimbus, oracle_master, xcTOKEN, accounts):
     assert nimbus.getTotalPooledToken() == deposit + reward
 
 
-def test_multi_deposit(nimbus, oracle_master, xcTOKEN, accounts, developers, treasury):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_multi_deposit(nimbus, oracle_master, xcTOKEN, accounts, developers, treasury, relay):
     deposit1 = 20 * 10**18
     deposit2 = 5 * 10**18
     deposit3 = 100 * 10**18
@@ -441,12 +394,8 @@ def test_multi_deposit(nimbus, oracle_master, xcTOKEN, accounts, developers, tre
     ) <= 1000
 
 
-def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit1 = 20 * 10**18
     deposit2 = 5 * 10**18
     deposit3 = 100 * 10**18
@@ -496,12 +445,8 @@ def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
     assert nimbus.getTotalPooledToken() == deposit1 + deposit2 + deposit3 + 5*reward - withdrawal_balance_start
 
 
-def test_multi_redeem(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_multi_redeem(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[1]})
 
@@ -565,12 +510,8 @@ def test_multi_redeem(nimbus, oracle_master, xcTOKEN, accounts):
     assert xcTOKEN.balanceOf(accounts[1]) == redeem_3_xcToken + redeem_2_xcToken + redeem_1_xcToken + balance_before_claim
 
 
-def test_multi_redeem_order_removal(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_multi_redeem_order_removal(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[1]})
 
@@ -629,12 +570,8 @@ def test_multi_redeem_order_removal(nimbus, oracle_master, xcTOKEN, accounts):
     assert nimbus.getUnbonded(accounts[1]) == (redeem_2_xcToken + redeem_3_xcToken, 0)
 
 
-def test_is_reported_indicator(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_is_reported_indicator(nimbus, oracle_master, xcTOKEN, accounts, relay):
     deposit = 20 * 10**18
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -644,11 +581,8 @@ def test_is_reported_indicator(nimbus, oracle_master, xcTOKEN, accounts):
     assert oracle_master.isReportedLastEra(accounts[0], relay.ledgers[0].stash_account) == (relay.era, True)
 
 
-def test_soften_quorum(nimbus, oracle_master, xcTOKEN, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
+@pytest.mark.scenario('1 ledger')
+def test_soften_quorum(nimbus, oracle_master, xcTOKEN, accounts, relay):
     ledger_1 = relay.ledgers[0]
 
     oracle_master.setQuorum(3, {'from': accounts[0]})
@@ -1,22 +1,11 @@
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
 import pytest
 
 
-def test_deposit_distribution_1(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
+@pytest.mark.scenario('4 ledgers')
+def test_deposit_distribution_1(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts, relay):
     nimbus_balance = 100 * 10**12
     xcTOKEN.transfer(nimbus, nimbus_balance, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-
-    stashes = [0x10, 0x20, 0x30, 0x40]
-
-    for i in range(len(stashes)):
-        stash = stashes[i]
-        relay.new_ledger(hex(stash), hex(stash + 1))
-
     relay.new_era()
 
     # working system for 4 ledgers
@@ -77,20 +66,11 @@ def test_deposit_distribution_1(nimbus, oracle_master, xcTOKEN, Ledger, withdraw
     assert xcTOKEN.balanceOf(nimbus) == nimbus_balance
 
 
-def test_deposit_distribution_2(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
+@pytest.mark.scenario('4 ledgers')
+def test_deposit_distribution_2(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts, relay):
     nimbus_balance = 100 * 10**12
     xcTOKEN.transfer(nimbus, nimbus_balance, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-
-    stashes = [0x10, 0x20, 0x30, 0x40]
-
-    for i in range(len(stashes)):
-        stash = stashes[i]
-        relay.new_ledger(hex(stash), hex(stash + 1))
-
     relay.new_era()
 
     # working system for 4 ledgers
@@ -151,20 +131,11 @@ def test_deposit_distribution_2(nimbus, oracle_master, xcTOKEN, Ledger, withdraw
     assert xcTOKEN.balanceOf(nimbus) == nimbus_balance
 
 
-def test_deposit_distribution_3(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
+@pytest.mark.scenario('4 ledgers')
+def test_deposit_distribution_3(nimbus, oracle_master, xcTOKEN, Ledger, withdrawal, accounts, relay):
     nimbus_balance = 100 * 10**12
     xcTOKEN.transfer(nimbus, nimbus_balance, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-
-    stashes = [0x10, 0x20, 0x30, 0x40]
-
-    for i in range(len(stashes)):
-        stash = stashes[i]
-        relay.new_ledger(hex(stash), hex(stash + 1))
-
     relay.new_era()
 
     # working system for 4 ledgers
@@ -1,15 +1,9 @@
 from black import assert_equivalent
-from brownie import chain
-from helpers import RelayChain, distribute_initial_tokens
 import pytest
 
 
-def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit1 = 20 * 10**12
     deposit2 = 5 * 10**12
     deposit3 = 100 * 10**12
@@ -49,12 +43,8 @@ def test_redeem(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
 
 
 @pytest.mark.skip_coverage
-def test_check_queue(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_check_queue(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     deposit = 20 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
     nimbus.deposit(deposit, {'from': accounts[1]})
@@ -95,13 +85,10 @@ def test_check_queue(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
         assert xcTOKEN.balanceOf(accounts[i]) == (deposit + balance_before_claim)
 
 
-def test_losses_distribution(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('1 ledger')
+def test_losses_distribution(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     nimbus.setMaxAllowableDifference(51000, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -167,12 +154,8 @@ def test_losses_distribution(nimbus, oracle_master, xcTOKEN, withdrawal, account
 
 
 @pytest.mark.skip_coverage
-def test_relay_block(nimbus, oracle_master, xcTOKEN, withdrawal, Ledger, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_relay_block(nimbus, oracle_master, xcTOKEN, withdrawal, Ledger, accounts, relay):
     deposit = 20 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -227,13 +210,10 @@ def test_relay_block(nimbus, oracle_master, xcTOKEN, withdrawal, Ledger, account
     assert xcTOKEN.balanceOf(accounts[0]) == (deposit + balance_before_claim)
 
 
-def test_losses_distribution_with_fast_track(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('1 ledger')
+def test_losses_distribution_with_fast_track(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     nimbus.setMaxAllowableDifference(51000, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -309,15 +289,10 @@ def test_losses_distribution_with_fast_track(nimbus, oracle_master, xcTOKEN, wit
     assert relay.ledgers[0].active_balance == nimbus.fundRaisedBalance()
 
 
-def test_losses_distribution_with_fast_track_2_ledgers(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
+@pytest.mark.scenario('3 ledgers')
+def test_losses_distribution_with_fast_track_2_ledgers(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     nimbus.setMaxAllowableDifference(51000, {'from': accounts[0]})
 
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-    relay.new_ledger("0x30", "0x31")
-
     deposit = 1500 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
 
@@ -389,12 +364,8 @@ def test_losses_distribution_with_fast_track_2_ledgers(nimbus, oracle_master, xc
     assert relay.ledgers[0].active_balance == nimbus.totalSupply()
 
 
-def test_redeem_before_losses(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem_before_losses(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # 1. deposit tokens
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -488,12 +459,8 @@ def test_redeem_before_losses(nimbus, oracle_master, xcTOKEN, withdrawal, accoun
     assert xcTOKEN.balanceOf(withdrawal) == 0
 
 
-def test_redeem_before_losses_second_type(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem_before_losses_second_type(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # 1. deposit tokens
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -571,13 +538,8 @@ def test_redeem_before_losses_second_type(nimbus, oracle_master, xcTOKEN, withdr
     assert xcTOKEN.balanceOf(withdrawal) == 0
 
 
-def test_redeem_before_losses_two_ledgers(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-    relay.new_ledger("0x20", "0x21")
-
+@pytest.mark.scenario('2 ledgers')
+def test_redeem_before_losses_two_ledgers(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # 1. deposit tokens
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})
@@ -673,12 +635,8 @@ def test_redeem_before_losses_two_ledgers(nimbus, oracle_master, xcTOKEN, withdr
     assert xcTOKEN.balanceOf(withdrawal) == 0
 
 
-def test_redeem_before_losses_fasttracked(nimbus, oracle_master, xcTOKEN, withdrawal, accounts):
-    distribute_initial_tokens(xcTOKEN, nimbus, accounts)
-
-    relay = RelayChain(nimbus, xcTOKEN, oracle_master, accounts, chain)
-    relay.new_ledger("0x10", "0x11")
-
+@pytest.mark.scenario('1 ledger')
+def test_redeem_before_losses_fasttracked(nimbus, oracle_master, xcTOKEN, withdrawal, accounts, relay):
     # 1. deposit tokens
     deposit = 100 * 10**12
     nimbus.deposit(deposit, {'from': accounts[0]})